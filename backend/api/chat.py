@@ -11,7 +11,6 @@ import os
 import json
 from datetime import datetime
 import asyncio
-import asyncpg
 
 from openai import AsyncOpenAI
 from anthropic import AsyncAnthropic
@@ -21,6 +20,10 @@ from core.smart_routing import SmartQueryRouter
 from core.conversation_memory import ConversationMemory
 from core.fuzzy_search import FuzzySearchEngine
 from core.cross_context_reasoning import CrossContextReasoner
+from core.pipeline import StagedPipeline, Stage
+from core.projections import CHUNK_COLUMNS
+from core.database import db_pool
+from core.telemetry import traced, span, record_tokens, current_trace
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -31,11 +34,43 @@ router = APIRouter()
 # Initialize clients
 openai_client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 anthropic_client = AsyncAnthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
-retriever = HybridRetriever(os.getenv("DATABASE_URL"))
-smart_router = SmartQueryRouter(os.getenv("DATABASE_URL"))
+retriever = HybridRetriever(db_pool)
+smart_router = SmartQueryRouter(db_pool)
 conversation_memory = ConversationMemory()
-fuzzy_search = FuzzySearchEngine(os.getenv("DATABASE_URL"))
-cross_context = CrossContextReasoner(os.getenv("DATABASE_URL"))
+fuzzy_search = FuzzySearchEngine(db_pool)
+cross_context = CrossContextReasoner(db_pool)
+
+# Per-stage timeouts (seconds) for the retrieval pipeline
+STAGE_TIMEOUTS = {
+    'fuzzy': float(os.getenv("STAGE_TIMEOUT_FUZZY", "3")),
+    'routing': float(os.getenv("STAGE_TIMEOUT_ROUTING", "5")),
+    'dense': float(os.getenv("STAGE_TIMEOUT_DENSE", "10")),
+    'cross_context': float(os.getenv("STAGE_TIMEOUT_CROSS_CONTEXT", "5"))
+}
+
+# Streamed characters after which the quality check starts on the partial answer
+QUALITY_CHECK_PARTIAL_CHARS = int(os.getenv("QUALITY_CHECK_PARTIAL_CHARS", "600"))
+
+# Model names - Updated July 2025
+CLAUDE_MODEL_MAP = {
+    "claude-sonnet-4-20250514": "claude-sonnet-4-20250514",
+    "claude-opus-4-20250514": "claude-opus-4-20250514",
+    "claude-3-sonnet-20240229": "claude-3-sonnet-20240229"  # Fallback
+}
+
+OPENAI_MODEL_MAP = {
+    "gpt-4o": "gpt-4o",  # Omni model
+    "gpt-4.1": "gpt-4.1",  # Latest GPT-4.1
+    "gpt-4.1-mini": "gpt-4.1-mini",  # Fast & cheap quality checker
+    "gpt-4.1-nano": "gpt-4.1-nano",  # Cheapest model
+    "o3": "o3-2025-04-16",  # O3 reasoning model with specific version
+    "o3-pro": "o3-pro",  # Extended reasoning (if available)
+    "o3-mini": "o3-mini",  # Lightweight O3
+    "o1-preview": "o1-preview",  # O1 preview model
+    "o1-mini": "o1-mini",  # Lightweight O1
+    "gpt-4-turbo": "gpt-4-turbo",  # Fallback
+    "gpt-4": "gpt-4"  # Legacy
+}
 
 
 # Pydantic models
@@ -106,11 +141,13 @@ async def intelligent_chat_pipeline(
         for msg in conversation_history[-5:]:  # Last 5 messages
             conv_context += f"{msg['role'].upper()}: {msg['content'][:200]}...\n"
     
-    # 2. Try fuzzy search first if regular search might fail
-    fuzzy_docs = await fuzzy_search.fuzzy_search_documents(query)
+    # 2./3. Fuzzy matching, smart routing, dense retrieval and the query
+    # embedding are independent, so they start together
+    pipeline = build_retrieval_pipeline(query, conversation_history)
+    stage_results = await pipeline.run()
     
-    # 3. Smart routing based on query type
-    routing_result = await smart_router.route_query(query, conversation_history)
+    fuzzy_docs = stage_results['fuzzy'] or []
+    routing_result = stage_results['routing'] or {'strategy': 'general'}
     
     # Track search attempt
     conversation_memory.track_search_attempt(
@@ -128,12 +165,11 @@ async def intelligent_chat_pipeline(
         # Use fuzzy search results
         print(f"Fuzzy search found {len(fuzzy_docs)} documents")
         # Get chunks from fuzzy matched documents
-        conn = await asyncpg.connect(os.getenv("DATABASE_URL"), statement_cache_size=0)
-        try:
+        async with db_pool.acquire() as conn:
             all_chunks = []
             for doc in fuzzy_docs[:3]:  # Top 3 fuzzy matches
-                chunks = await conn.fetch("""
-                    SELECT c.*, d.title as document_title
+                chunks = await conn.fetch(f"""
+                    SELECT {CHUNK_COLUMNS}
                     FROM chunks c
                     JOIN documents d ON d.id = c.document_id
                     WHERE c.document_id = $1
@@ -150,53 +186,43 @@ async def intelligent_chat_pipeline(
                     all_chunks.append(chunk_dict)
             
             unique_chunks = all_chunks
-        finally:
-            await conn.close()
     else:
-        # Fallback to parallel search
-        search_tasks = [
-            retriever.search(query=query, top_k=10, use_colbert_rerank=False),
-            retriever.search(query=query, top_k=5, use_colbert_rerank=True)
-        ]
-        
-        search_results = await asyncio.gather(*search_tasks, return_exceptions=True)
-        
-        # Merge results
-        all_chunks = []
-        for result in search_results:
-            if isinstance(result, list):
-                all_chunks.extend(result)
-        
-        # Deduplicate by content hash
-        seen = set()
-        unique_chunks = []
-        for chunk in all_chunks:
-            chunk_hash = hash(chunk.get('content', ''))
-            if chunk_hash not in seen:
-                seen.add(chunk_hash)
-                unique_chunks.append(chunk)
+        # Fallback: fused dense retrieval that already ran alongside routing
+        unique_chunks = stage_results['dense'] or []
     
     # 4. Check for cross-context insights
     cross_context_insight = None
     if unique_chunks:
-        try:
-            cross_context_insight = await cross_context.find_cross_context_insights(
+        primary_results = unique_chunks[:10]
+        cross_context_insight = await pipeline.run_stage(Stage(
+            name='cross_context',
+            fn=lambda _: cross_context.find_cross_context_insights(
                 query=query,
-                primary_results=unique_chunks[:10],
+                primary_results=primary_results,
                 conversation_history=conversation_history
-            )
-            
-            # If we found meaningful cross-context insights, enrich the chunks
-            if cross_context_insight and cross_context_insight.insights:
-                # Add cross-context information to the context
-                cross_context_info = {
-                    'content': f"Cross-Context Insights:\n" + "\n".join(cross_context_insight.insights),
-                    'chunk_type': 'cross_context',
-                    'importance_score': 0.9
-                }
-                unique_chunks.insert(0, cross_context_info)
-        except Exception as e:
-            print(f"Cross-context reasoning failed: {e}")
+            ),
+            timeout=STAGE_TIMEOUTS['cross_context']
+        ))
+        
+        # If we found meaningful cross-context insights, enrich the chunks
+        if cross_context_insight and cross_context_insight.insights:
+            # Add cross-context information to the context
+            cross_context_info = {
+                'content': f"Cross-Context Insights:\n" + "\n".join(cross_context_insight.insights),
+                'chunk_type': 'cross_context',
+                'importance_score': 0.9
+            }
+            unique_chunks.insert(0, cross_context_info)
+    
+    # Streaming: forward provider tokens at once, grade concurrently
+    if stream:
+        return stream_answer_with_quality_check(
+            query=query,
+            context_chunks=unique_chunks,
+            preferred_model=preferred_model,
+            conversation_history=conv_context,
+            debug_info={'stage_timings': pipeline.timings_dict()} if debug else None
+        )
     
     # 5. Generate initial response
     initial_response = await route_to_model(
@@ -239,64 +265,108 @@ async def intelligent_chat_pipeline(
         if should_remind:
             final_response += conversation_memory.format_reminder()
         
-        if stream:
-            return create_streaming_response(final_response, fallback_response['model_used'])
-        else:
-            return ChatResponse(
-                response=final_response,
-                sources=format_sources(unique_chunks),
-                model_used=fallback_response['model_used'],
-                tokens_used=fallback_response.get('tokens_used')
-            )
+        return ChatResponse(
+            response=final_response,
+            sources=format_sources(unique_chunks),
+            model_used=fallback_response['model_used'],
+            tokens_used=fallback_response.get('tokens_used')
+        )
     
     # Return original response if quality is good
     final_response = initial_response['response']
     if should_remind:
         final_response += conversation_memory.format_reminder()
     
-    if stream:
-        return create_streaming_response(final_response, initial_response['model_used'])
-    else:
-        debug_info = None
-        if debug:
-            debug_info = {
-                'routing_strategy': routing_result.get('strategy', 'unknown'),
-                'chunks_found': len(unique_chunks),
-                'quality_score': quality_score,
-                'used_fallback': False,
-                'fuzzy_matches': len(fuzzy_docs) if fuzzy_docs else 0,
-                'original_intent': conversation_memory.current_intent.original_question if conversation_memory.current_intent else None
-            }
-            if routing_result.get('strategy') == 'document_ref':
-                debug_info['matched_documents'] = [d['title'] for d in routing_result.get('documents', [])]
-            if fuzzy_docs:
-                debug_info['fuzzy_matched_docs'] = [{'title': d['title'], 'score': d['relevance_score']} for d in fuzzy_docs[:3]]
-            if cross_context_insight and cross_context_insight.insights:
-                debug_info['cross_context_insights'] = cross_context_insight.insights
-                debug_info['related_contexts'] = [{'title': ctx.get('title', 'Unknown')} for ctx in cross_context_insight.related_contexts]
-        
-        return ChatResponse(
-            response=final_response,
-            sources=format_sources(unique_chunks),
-            model_used=initial_response['model_used'],
-            tokens_used=initial_response.get('tokens_used'),
-            debug_info=debug_info
+    debug_info = None
+    if debug:
+        debug_info = {
+            'routing_strategy': routing_result.get('strategy', 'unknown'),
+            'chunks_found': len(unique_chunks),
+            'quality_score': quality_score,
+            'used_fallback': False,
+            'fuzzy_matches': len(fuzzy_docs) if fuzzy_docs else 0,
+            'original_intent': conversation_memory.current_intent.original_question if conversation_memory.current_intent else None,
+            'stage_timings': pipeline.timings_dict()
+        }
+        trace = current_trace()
+        if trace is not None:
+            debug_info['trace'] = trace.summary()
+        if routing_result.get('strategy') == 'document_ref':
+            debug_info['matched_documents'] = [d['title'] for d in routing_result.get('documents', [])]
+        if fuzzy_docs:
+            debug_info['fuzzy_matched_docs'] = [{'title': d['title'], 'score': d['relevance_score']} for d in fuzzy_docs[:3]]
+        if cross_context_insight and cross_context_insight.insights:
+            debug_info['cross_context_insights'] = cross_context_insight.insights
+            debug_info['related_contexts'] = [{'title': ctx.get('title', 'Unknown')} for ctx in cross_context_insight.related_contexts]
+    
+    return ChatResponse(
+        response=final_response,
+        sources=format_sources(unique_chunks),
+        model_used=initial_response['model_used'],
+        tokens_used=initial_response.get('tokens_used'),
+        debug_info=debug_info
+    )
+
+
+def build_retrieval_pipeline(query: str, conversation_history: List[Dict]) -> StagedPipeline:
+    """
+    Pre-retrieval stages as a DAG
+    
+    All three stages start at once. Dense retrieval and routing embed the query
+    themselves; the embedding cache coalesces them into one API call that
+    survives either stage being cancelled. Once routing finds a referenced
+    document, fuzzy matching and dense retrieval can no longer win and are
+    cancelled; likewise dense retrieval once fuzzy matching has hits and routing
+    did not find a document.
+    """
+    def on_complete(pipeline: StagedPipeline, name: str, result):
+        if name == 'routing' and result and result.get('strategy') == 'document_ref' and result.get('chunks'):
+            pipeline.cancel('fuzzy', 'dense')
+        elif name in ('routing', 'fuzzy') and pipeline.results.get('fuzzy') and 'routing' in pipeline.timings:
+            pipeline.cancel('dense')
+    
+    return StagedPipeline([
+        Stage(
+            name='fuzzy',
+            fn=lambda _: fuzzy_search.fuzzy_search_documents(query),
+            timeout=STAGE_TIMEOUTS['fuzzy'],
+            default=[]
+        ),
+        Stage(
+            name='routing',
+            fn=lambda _: smart_router.route_query(query, conversation_history),
+            timeout=STAGE_TIMEOUTS['routing']
+        ),
+        Stage(
+            name='dense',
+            fn=lambda _: retriever.search(
+                query=query, top_k=10, use_colbert_rerank=True, fusion='rrf'
+            ),
+            timeout=STAGE_TIMEOUTS['dense'],
+            default=[]
         )
+    ], on_complete=on_complete)
 
 
+@traced('llm.quality_check')
 async def check_answer_quality(
     query: str,
     context: List[Dict],
     answer: str,
-    conversation_history: str = ""
+    conversation_history: str = "",
+    partial: bool = False
 ) -> float:
-    """Check answer quality using GPT-4.1-mini"""
+    """Check answer quality using GPT-4.1-mini (partial: grade the beginning of a streamed answer)"""
     
     # Prepare context summary
     context_summary = "\n".join([chunk['content'][:100] + "..." for chunk in context[:5]])
     
+    partial_note = ""
+    if partial:
+        partial_note = "\nHinweis: Die Antwort wird noch generiert. Bewerte nur, ob der Anfang auf dem richtigen Weg ist, nicht ihre Vollständigkeit.\n"
+    
     prompt = f"""Bewerte ob diese Antwort die Frage angemessen beantwortet.
-
+{partial_note}
 {conversation_history}
 
 Frage: {query}
@@ -332,6 +402,9 @@ Antworte NUR mit einer Zahl zwischen 0 und 1, z.B.: 0.85"""
             temperature=0
         )
         
+        if response.usage:
+            record_tokens(response.model, response.usage.prompt_tokens, response.usage.completion_tokens)
+        
         score_text = response.choices[0].message.content.strip()
         return float(score_text)
         
@@ -345,9 +418,13 @@ async def generate_with_model_knowledge(
     failed_context: List[Dict],
     previous_attempt: str,
     conversation_history: str,
-    model: str
-) -> Dict:
-    """Generate response using model knowledge when context is insufficient"""
+    model: str,
+    stream: bool = False
+):
+    """Generate response using model knowledge when context is insufficient
+    
+    Returns a response dict, or with stream=True an async iterator of text deltas.
+    """
     
     system_prompt = """Du bist ein intelligenter Assistent. 
 Die Datenbank-Suche war nicht erfolgreich genug, um die Frage vollständig zu beantworten.
@@ -369,6 +446,11 @@ Bitte beantworte die Frage vollständig und präzise mit deinem Wissen."""
     else:
         selected_model = "o3"  # For complex reasoning
     
+    if stream:
+        if selected_model.startswith("claude"):
+            return stream_claude_text(system_prompt, user_message, selected_model)
+        return stream_openai_text(system_prompt, user_message, selected_model)
+    
     if selected_model.startswith("claude"):
         return await generate_claude_response(
             system_prompt, user_message, selected_model, False
@@ -379,21 +461,108 @@ Bitte beantworte die Frage vollständig und präzise mit deinem Wissen."""
         )
 
 
-def create_streaming_response(content: str, model_used: str):
-    """Create a streaming response from complete content"""
-    async def stream():
-        # Split content into chunks for streaming effect
-        words = content.split()
-        chunk_size = 5
+def sse_event(payload: Dict) -> str:
+    """Format one server-sent event (datetimes, UUIDs etc. are sent as strings)"""
+    return f"data: {json.dumps(payload, default=str)}\n\n"
+
+
+async def stream_answer_with_quality_check(
+    query: str,
+    context_chunks: List[Dict],
+    preferred_model: str,
+    conversation_history: str,
+    debug_info: Optional[Dict] = None
+) -> AsyncGenerator[str, None]:
+    """
+    Forward the provider stream as it arrives and grade the answer alongside
+    
+    The quality check starts on the partial answer once QUALITY_CHECK_PARTIAL_CHARS
+    have been streamed, so it usually finishes together with the answer. A low
+    grade appends a fallback event and the fallback answer; it never delays the
+    first token.
+    """
+    selected_model, text_stream = route_to_model_text_stream(
+        message=query,
+        context_chunks=context_chunks[:10],  # Top 10 unique chunks
+        preferred_model=preferred_model
+    )
+    
+    answer_parts = []
+    answer_length = 0
+    quality_task = None
+    
+    def start_quality_check(partial: bool):
+        return asyncio.create_task(check_answer_quality(
+            query=query,
+            context=context_chunks,
+            answer="".join(answer_parts),
+            conversation_history=conversation_history,
+            partial=partial
+        ))
+    
+    try:
+        async for text in text_stream:
+            answer_parts.append(text)
+            answer_length += len(text)
+            yield sse_event({'text': text})
+            
+            if quality_task is None and answer_length >= QUALITY_CHECK_PARTIAL_CHARS:
+                quality_task = start_quality_check(partial=True)
+        
+        if quality_task is None:
+            quality_task = start_quality_check(partial=False)
+        
+        answer = "".join(answer_parts)
+        should_remind = conversation_memory.should_remind_original_question(answer)
+        used_fallback = False
         
-        for i in range(0, len(words), chunk_size):
-            chunk = ' '.join(words[i:i+chunk_size]) + ' '
-            yield f"data: {json.dumps({'text': chunk})}\n\n"
-            await asyncio.sleep(0.05)  # Small delay for streaming effect
+        quality_score = await quality_task
+        if quality_score < 0.7:
+            print(f"Quality score {quality_score} too low, appending fallback with model knowledge")
             
-        yield f"data: {json.dumps({'done': True, 'model_used': model_used})}\n\n"
-    
-    return stream()  # Return the generator directly, not call it
+            original_context = ""
+            if conversation_memory.current_intent:
+                original_context = f"\n\nUrsprüngliche Frage des Nutzers: {conversation_memory.current_intent.original_question}\n"
+            
+            fallback_stream = await generate_with_model_knowledge(
+                query=query,
+                failed_context=context_chunks,
+                previous_attempt=answer,
+                conversation_history=conversation_history + original_context,
+                model=preferred_model,
+                stream=True
+            )
+            
+            yield sse_event({'fallback': True, 'quality_score': quality_score})
+            yield sse_event({'text': "\n\n---\n\n", 'fallback': True})
+            async for text in fallback_stream:
+                yield sse_event({'text': text, 'fallback': True})
+            used_fallback = True
+        
+        if should_remind:
+            yield sse_event({'text': conversation_memory.format_reminder()})
+        
+        done_event = {
+            'done': True,
+            'model_used': selected_model,
+            'quality_score': quality_score,
+            'used_fallback': used_fallback,
+            'sources': format_sources(context_chunks)
+        }
+        if debug_info is not None:
+            trace = current_trace()
+            if trace is not None:
+                debug_info['trace'] = trace.summary()
+            done_event['debug_info'] = debug_info
+        yield sse_event(done_event)
+    except Exception as e:
+        # Tell the client why the answer stopped instead of just closing the stream
+        print(f"Streaming error: {str(e)}")
+        yield sse_event({'error': str(e), 'done': True, 'model_used': selected_model})
+    finally:
+        # Client went away mid-stream
+        if quality_task is not None and not quality_task.done():
+            quality_task.cancel()
 
 
 @router.post("/stream")
@@ -438,6 +607,27 @@ async def route_to_model(
         raise ValueError(f"Unknown model: {selected_model}")
 
 
+def route_to_model_text_stream(
+    message: str,
+    context_chunks: List[Dict],
+    preferred_model: str
+):
+    """Same routing as route_to_model, returning (selected_model, async iterator of text deltas)"""
+    context_text = "\n\n".join([chunk['content'] for chunk in context_chunks])
+    context_tokens = len(context_text) // 4  # Rough estimate
+    
+    selected_model = select_optimal_model(message, context_tokens, preferred_model)
+    system_prompt = create_system_prompt()
+    user_message = create_rag_prompt(message, context_chunks)
+    
+    if selected_model.startswith("claude"):
+        return selected_model, stream_claude_text(system_prompt, user_message, selected_model)
+    elif selected_model.startswith("gpt") or selected_model.startswith("o"):
+        return selected_model, stream_openai_text(system_prompt, user_message, selected_model)
+    else:
+        raise ValueError(f"Unknown model: {selected_model}")
+
+
 def select_optimal_model(query: str, context_tokens: int, preferred_model: str) -> str:
     """Select the best model based on query characteristics"""
     
@@ -498,6 +688,7 @@ def create_rag_prompt(query: str, context_chunks: List[Dict]) -> str:
     return prompt
 
 
+@traced('llm.claude')
 async def generate_claude_response(
     system_prompt: str,
     user_message: str,
@@ -505,27 +696,13 @@ async def generate_claude_response(
     stream: bool
 ) -> Dict:
     """Generate response using Claude"""
-    
-    # Map model names - Updated July 2025
-    model_map = {
-        "claude-sonnet-4-20250514": "claude-sonnet-4-20250514",
-        "claude-opus-4-20250514": "claude-opus-4-20250514",
-        "claude-3-sonnet-20240229": "claude-3-sonnet-20240229"  # Fallback
-    }
-    
-    actual_model = model_map.get(model, "claude-sonnet-4-20250514")
+    actual_model = CLAUDE_MODEL_MAP.get(model, "claude-sonnet-4-20250514")
     
     if stream:
         async def stream_response():
-            async with anthropic_client.messages.stream(
-                model=actual_model,
-                messages=[{"role": "user", "content": user_message}],
-                system=system_prompt,
-                max_tokens=4000
-            ) as stream:
-                async for text in stream.text_stream:
-                    yield f"data: {json.dumps({'text': text})}\n\n"
-                yield f"data: {json.dumps({'done': True})}\n\n"
+            async for text in stream_claude_text(system_prompt, user_message, model):
+                yield sse_event({'text': text})
+            yield sse_event({'done': True})
         
         return stream_response()
     else:
@@ -535,14 +712,16 @@ async def generate_claude_response(
             system=system_prompt,
             max_tokens=4000
         )
+        record_tokens(actual_model, response.usage.input_tokens, response.usage.output_tokens)
         
         return {
             "response": response.content[0].text,
             "model_used": actual_model,
-            "tokens_used": response.usage.total_tokens if hasattr(response.usage, 'total_tokens') else None
+            "tokens_used": response.usage.input_tokens + response.usage.output_tokens
         }
 
 
+@traced('llm.openai')
 async def generate_openai_response(
     system_prompt: str,
     user_message: str,
@@ -550,23 +729,7 @@ async def generate_openai_response(
     stream: bool
 ) -> Dict:
     """Generate response using OpenAI"""
-    
-    # Map model names - Updated July 2025
-    model_map = {
-        "gpt-4o": "gpt-4o",  # Omni model
-        "gpt-4.1": "gpt-4.1",  # Latest GPT-4.1
-        "gpt-4.1-mini": "gpt-4.1-mini",  # Fast & cheap quality checker
-        "gpt-4.1-nano": "gpt-4.1-nano",  # Cheapest model
-        "o3": "o3-2025-04-16",  # O3 reasoning model with specific version
-        "o3-pro": "o3-pro",  # Extended reasoning (if available)
-        "o3-mini": "o3-mini",  # Lightweight O3
-        "o1-preview": "o1-preview",  # O1 preview model
-        "o1-mini": "o1-mini",  # Lightweight O1
-        "gpt-4-turbo": "gpt-4-turbo",  # Fallback
-        "gpt-4": "gpt-4"  # Legacy
-    }
-    
-    actual_model = model_map.get(model, "gpt-4o")
+    actual_model = OPENAI_MODEL_MAP.get(model, "gpt-4o")
     
     messages = [
         {"role": "system", "content": system_prompt},
@@ -575,30 +738,9 @@ async def generate_openai_response(
     
     if stream:
         async def stream_response():
-            try:
-                stream = await openai_client.chat.completions.create(
-                    model=actual_model,
-                    messages=messages,
-                    stream=True,
-                    max_tokens=4000
-                )
-            except Exception as e:
-                # Fallback to gpt-4o if O3 models are not available
-                if "o3" in actual_model.lower():
-                    print(f"O3 model {actual_model} not available, falling back to gpt-4o")
-                    stream = await openai_client.chat.completions.create(
-                        model="gpt-4o",
-                        messages=messages,
-                        stream=True,
-                        max_tokens=4000
-                    )
-                else:
-                    raise e
-            
-            async for chunk in stream:
-                if chunk.choices[0].delta.content:
-                    yield f"data: {json.dumps({'text': chunk.choices[0].delta.content})}\n\n"
-            yield f"data: {json.dumps({'done': True})}\n\n"
+            async for text in stream_openai_text(system_prompt, user_message, model):
+                yield sse_event({'text': text})
+            yield sse_event({'done': True})
         
         return stream_response()
     else:
@@ -620,6 +762,9 @@ async def generate_openai_response(
             else:
                 raise e
         
+        if response.usage:
+            record_tokens(response.model, response.usage.prompt_tokens, response.usage.completion_tokens)
+        
         return {
             "response": response.choices[0].message.content,
             "model_used": actual_model,
@@ -627,6 +772,71 @@ async def generate_openai_response(
         }
 
 
+async def stream_claude_text(
+    system_prompt: str,
+    user_message: str,
+    model: str
+) -> AsyncGenerator[str, None]:
+    """Yield Claude's text deltas as the provider sends them"""
+    actual_model = CLAUDE_MODEL_MAP.get(model, "claude-sonnet-4-20250514")
+    
+    async with anthropic_client.messages.stream(
+        model=actual_model,
+        messages=[{"role": "user", "content": user_message}],
+        system=system_prompt,
+        max_tokens=4000
+    ) as stream:
+        with span('llm.claude_stream'):
+            async for text in stream.text_stream:
+                yield text
+        
+        final_message = await stream.get_final_message()
+        record_tokens(actual_model, final_message.usage.input_tokens, final_message.usage.output_tokens)
+
+
+async def stream_openai_text(
+    system_prompt: str,
+    user_message: str,
+    model: str
+) -> AsyncGenerator[str, None]:
+    """Yield OpenAI text deltas as the provider sends them"""
+    actual_model = OPENAI_MODEL_MAP.get(model, "gpt-4o")
+    
+    messages = [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_message}
+    ]
+    
+    try:
+        stream = await openai_client.chat.completions.create(
+            model=actual_model,
+            messages=messages,
+            stream=True,
+            max_tokens=4000
+        )
+    except Exception as e:
+        # Fallback to gpt-4o if O3 models are not available
+        if "o3" in actual_model.lower():
+            print(f"O3 model {actual_model} not available, falling back to gpt-4o")
+            stream = await openai_client.chat.completions.create(
+                model="gpt-4o",
+                messages=messages,
+                stream=True,
+                max_tokens=4000
+            )
+        else:
+            raise e
+    
+    with span('llm.openai_stream'):
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+            # Only present when the API is asked to include usage in streams
+            usage = getattr(chunk, 'usage', None)
+            if usage:
+                record_tokens(chunk.model, usage.prompt_tokens, usage.completion_tokens)
+
+
 def format_sources(context_chunks: List[Dict]) -> List[Dict]:
     """Format source citations for response"""
     sources = []
@@ -639,10 +849,11 @@ def format_sources(context_chunks: List[Dict]) -> List[Dict]:
         
         if chunk.get('document'):
             doc = chunk['document']
+            created_at = doc.get('created_at')
             source.update({
                 "title": doc.get('document_title'),
                 "type": doc.get('source_type'),
-                "date": doc.get('created_at')
+                "date": created_at.isoformat() if isinstance(created_at, datetime) else created_at
             })
             
         if chunk.get('speaker'):
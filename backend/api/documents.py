@@ -1,41 +1,33 @@
 from fastapi import APIRouter, HTTPException
 from typing import List, Optional
-import asyncpg
 from datetime import datetime
-import os
 
-router = APIRouter()
+from core.database import db_pool
+from core.entity_catalogue import entity_catalogue
+from core.projections import DOCUMENT_COLUMNS, DOCUMENT_DETAIL_COLUMNS
 
-async def get_db_connection():
-    """Create a database connection"""
-    return await asyncpg.connect(os.getenv("DATABASE_URL"))
+router = APIRouter()
 
 @router.get("/")
 async def get_documents():
     """Get all documents with metadata"""
-    conn = None
     try:
-        conn = await get_db_connection()
-        
         # Fetch all documents
-        query = """
+        query = f"""
             SELECT 
-                id,
-                title,
-                source_type,
-                source_url,
-                created_at,
-                metadata,
+                {DOCUMENT_COLUMNS},
+                d.metadata,
                 CASE 
-                    WHEN full_content IS NOT NULL 
-                    THEN LENGTH(full_content)
+                    WHEN d.full_content IS NOT NULL 
+                    THEN LENGTH(d.full_content)
                     ELSE 0
                 END as content_length
-            FROM documents
-            ORDER BY created_at DESC
+            FROM documents d
+            ORDER BY d.created_at DESC
         """
         
-        rows = await conn.fetch(query)
+        async with db_pool.acquire() as conn:
+            rows = await conn.fetch(query)
         
         # Convert to list of dicts
         documents = []
@@ -51,19 +43,13 @@ async def get_documents():
     except Exception as e:
         print(f"Error fetching documents: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        if conn:
-            await conn.close()
 
 @router.delete("/{document_id}")
 async def delete_document(document_id: str):
     """Delete a document and all its chunks"""
-    conn = None
     try:
-        conn = await get_db_connection()
-        
-        # Start a transaction
-        async with conn.transaction():
+        # Start a transaction on a pooled connection
+        async with db_pool.acquire() as conn, conn.transaction():
             # Delete chunks first (in case no cascade)
             await conn.execute(
                 "DELETE FROM chunks WHERE document_id = $1",
@@ -80,6 +66,8 @@ async def delete_document(document_id: str):
             if result.split()[-1] == '0':
                 raise HTTPException(status_code=404, detail="Document not found")
         
+        # Its title and speakers may be gone from the knowledge base
+        entity_catalogue.invalidate()
         return {"success": True, "message": "Document deleted successfully"}
         
     except HTTPException:
@@ -87,33 +75,20 @@ async def delete_document(document_id: str):
     except Exception as e:
         print(f"Error deleting document: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        if conn:
-            await conn.close()
 
 @router.get("/{document_id}")
 async def get_document(document_id: str):
     """Get a single document with its content"""
-    conn = None
     try:
-        conn = await get_db_connection()
-        
         # Fetch document with full content
-        query = """
-            SELECT 
-                id,
-                title,
-                source_type,
-                source_url,
-                created_at,
-                metadata,
-                full_content,
-                summary
-            FROM documents
-            WHERE id = $1
+        query = f"""
+            SELECT {DOCUMENT_DETAIL_COLUMNS}
+            FROM documents d
+            WHERE d.id = $1
         """
         
-        row = await conn.fetchrow(query, document_id)
+        async with db_pool.acquire() as conn:
+            row = await conn.fetchrow(query, document_id)
         
         if not row:
             raise HTTPException(status_code=404, detail="Document not found")
@@ -128,7 +103,4 @@ async def get_document(document_id: str):
         raise
     except Exception as e:
         print(f"Error fetching document: {str(e)}")
-        raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        if conn:
-            await conn.close()
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
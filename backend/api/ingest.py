@@ -6,7 +6,6 @@ Handles YouTube videos, audio files, and text input
 from fastapi import APIRouter, HTTPException, UploadFile, File, BackgroundTasks
 from pydantic import BaseModel, HttpUrl
 from typing import Optional, List, Dict
-import asyncpg
 import os
 from datetime import datetime
 import json
@@ -16,6 +15,11 @@ import asyncio
 from services.youtube import YouTubeService
 from services.whisper import WhisperService
 from core.chunking import smart_chunker
+from core.database import db_pool
+from core.entity_catalogue import entity_catalogue
+from core.cross_context_reasoning import cross_context_reasoner
+from core.colbert_storage import encode_token_embeddings
+from core.chunk_writer import copy_chunks
 try:
     from core.embeddings import embedding_service
 except ImportError:
@@ -144,6 +148,9 @@ async def ingest_text(request: TextIngestRequest):
         if len(request.content) > 1000:
             await generate_document_summary(document_id, request.content)
         
+        # Link the document into the relationship graph
+        await cross_context_reasoner.update_document_relationships(document_id)
+        
         return {
             "status": "success",
             "message": f"Text '{request.title}' ingested successfully",
@@ -185,9 +192,7 @@ async def create_document(title: str, source_type: str,
                          metadata: Dict = None,
                          full_content: str = None) -> str:
     """Create a document in the database"""
-    conn = await asyncpg.connect(os.getenv("DATABASE_URL"), statement_cache_size=0)
-    
-    try:
+    async with db_pool.acquire() as conn:
         document_id = await conn.fetchval(
             """
             INSERT INTO documents (title, source_type, source_url, duration_seconds, metadata, full_content)
@@ -201,82 +206,60 @@ async def create_document(title: str, source_type: str,
             json.dumps(metadata) if metadata else '{}',
             full_content
         )
-        
-        return document_id
-        
-    finally:
-        await conn.close()
+    
+    entity_catalogue.add_document(title=title, channel=(metadata or {}).get('channel'))
+    return document_id
 
 
 async def process_chunks(document_id: str, chunks: List):
     """Process chunks: generate embeddings and save to database"""
-    conn = await asyncpg.connect(os.getenv("DATABASE_URL"), statement_cache_size=0)
+    # Generate embeddings for all chunks before borrowing a connection
+    chunk_dicts = [chunk.to_dict() for chunk in chunks]
+    embeddings_result = await embedding_service.embed_document_hierarchical(
+        "", chunk_dicts
+    )
     
-    try:
-        # Generate embeddings for all chunks
-        chunk_dicts = [chunk.to_dict() for chunk in chunks]
-        embeddings_result = await embedding_service.embed_document_hierarchical(
-            "", chunk_dicts
+    # Prepare rows for the bulk writer
+    embeddings_by_index = {
+        emb['chunk_id']: emb['embedding'] for emb in embeddings_result['chunk_embeddings']
+    }
+    chunk_rows = []
+    
+    for i, chunk in enumerate(chunks):
+        chunk_rows.append({
+            'content': chunk.content,
+            'chunk_index': chunk.chunk_index,
+            'chunk_type': chunk.chunk_type,
+            'start_time': chunk.start_time,
+            'end_time': chunk.end_time,
+            'speaker': chunk.speaker,
+            'embedding': embeddings_by_index.get(i),  # Sent as binary float32 by the vector codec
+            'tokens': chunk.tokens,
+            'importance_score': chunk.importance_score,
+            'metadata': json.dumps(chunk.metadata) if chunk.metadata else '{}',
+            'language': chunk.language
+        })
+    
+    # ColBERT embeddings if available, as packed float16 matrices
+    colbert_rows = []
+    for colbert_data in embeddings_result.get('colbert_embeddings', []):
+        token_data, token_dtype, token_count, token_dim = encode_token_embeddings(
+            colbert_data['token_embeddings']
         )
-        
-        # Prepare batch insert data
-        chunk_records = []
-        colbert_records = []
-        
-        for i, chunk in enumerate(chunks):
-            # Get embedding for this chunk
-            embedding = None
-            for emb in embeddings_result['chunk_embeddings']:
-                if emb['chunk_id'] == i:
-                    embedding = emb['embedding']
-                    break
-            
-            chunk_records.append((
-                document_id,
-                chunk.content,
-                chunk.chunk_index,
-                chunk.chunk_type,
-                chunk.start_time,
-                chunk.end_time,
-                chunk.speaker,
-                f'[{",".join(map(str, embedding))}]' if embedding else None,  # Convert to vector format
-                chunk.tokens,
-                chunk.importance_score,
-                json.dumps(chunk.metadata) if chunk.metadata else '{}'
-            ))
-        
-        # Insert chunks one by one (batch insert with executemany has issues with UUIDs)
-        chunk_ids = []
-        for record in chunk_records:
-            chunk_id = await conn.fetchval(
-                """
-                INSERT INTO chunks 
-                (document_id, content, chunk_index, chunk_type, start_time, end_time, 
-                 speaker, embedding, tokens, importance_score, metadata)
-                VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11)
-                RETURNING id
-                """,
-                *record
-            )
-            chunk_ids.append({'id': chunk_id})
-        
-        # Insert ColBERT embeddings if available
-        for colbert_data in embeddings_result.get('colbert_embeddings', []):
-            chunk_idx = colbert_data.get('chunk_id')
-            if chunk_idx is not None and chunk_idx < len(chunk_ids):
-                chunk_id = chunk_ids[chunk_idx]['id']
-                await conn.execute(
-                    """
-                    INSERT INTO colbert_tokens (chunk_id, token_embeddings, token_texts)
-                    VALUES ($1, $2, $3)
-                    """,
-                    chunk_id,
-                    json.dumps(colbert_data['token_embeddings']),
-                    colbert_data['tokens']
-                )
-        
-    finally:
-        await conn.close()
+        colbert_rows.append({
+            'chunk_position': colbert_data.get('chunk_id'),
+            'token_data': token_data,
+            'token_dtype': token_dtype,
+            'token_count': token_count,
+            'token_dim': token_dim,
+            'token_texts': colbert_data['tokens']
+        })
+    
+    # Stream chunks and ColBERT rows with COPY in a single transaction
+    async with db_pool.acquire() as conn:
+        await copy_chunks(conn, document_id, chunk_rows, colbert_rows)
+    
+    entity_catalogue.add_document(speakers={chunk.speaker for chunk in chunks})
 
 
 async def process_youtube_video(video_data: Dict, language: str, generate_summary: bool):
@@ -309,6 +292,9 @@ async def process_youtube_video(video_data: Dict, language: str, generate_summar
         if generate_summary:
             await generate_document_summary(document_id, video_data['transcript'])
         
+        # Link the document into the relationship graph
+        await cross_context_reasoner.update_document_relationships(document_id)
+        
         print(f"Successfully processed YouTube video: {video_data['title']}")
         
     except Exception as e:
@@ -349,6 +335,9 @@ async def process_audio_transcript(transcript_data: Dict, title: str, speakers:
     # Process chunks
     await process_chunks(document_id, chunks)
     
+    # Link the document into the relationship graph
+    await cross_context_reasoner.update_document_relationships(document_id)
+    
     return document_id
 
 
@@ -405,14 +394,11 @@ async def generate_document_summary(document_id: str, full_text: str):
         summary = f"[Summary generation failed] {full_text[:1000]}..."
     
     # Generate embedding for summary
-    summary_embedding = await embedding_service.get_dense_embedding(summary)
+    # Document summaries are one-off texts, keep them out of the query cache
+    summary_embedding = await embedding_service.get_dense_embedding(summary, use_cache=False)
     
     # Update document
-    conn = await asyncpg.connect(os.getenv("DATABASE_URL"), statement_cache_size=0)
-    try:
-        # Convert embedding to vector format
-        embedding_str = f'[{",".join(map(str, summary_embedding))}]'
-        
+    async with db_pool.acquire() as conn:
         await conn.execute(
             """
             UPDATE documents 
@@ -420,11 +406,8 @@ async def generate_document_summary(document_id: str, full_text: str):
             WHERE id = $3
             """,
             summary,
-            embedding_str,
+            summary_embedding,  # Sent as binary float32 by the vector codec
             document_id
         )
-        
-        print(f"Generated comprehensive summary for document {document_id}")
-        
-    finally:
-        await conn.close()
\ No newline at end of file
+    
+    print(f"Generated comprehensive summary for document {document_id}")
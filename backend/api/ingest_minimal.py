@@ -6,7 +6,6 @@ Optimized for performance and small footprint
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 from typing import Optional, List, Dict
-import asyncpg
 import os
 from datetime import datetime
 import json
@@ -14,6 +13,10 @@ import asyncio
 
 # Import services
 from core.chunking import smart_chunker
+from core.database import db_pool
+from core.entity_catalogue import entity_catalogue
+from core.cross_context_reasoning import cross_context_reasoner
+from core.chunk_writer import copy_chunks
 try:
     from core.embeddings import embedding_service
 except ImportError:
@@ -57,6 +60,9 @@ async def ingest_text(request: TextIngestRequest):
         if len(request.content) > 1000:
             await generate_document_summary(document_id, request.content)
         
+        # Link the document into the relationship graph
+        await cross_context_reasoner.update_document_relationships(document_id)
+        
         return {
             "status": "success",
             "message": f"Text '{request.title}' ingested successfully",
@@ -76,9 +82,7 @@ async def create_document(title: str, source_type: str,
                          metadata: Dict = None,
                          full_content: str = None) -> str:
     """Create a document in the database"""
-    conn = await asyncpg.connect(os.getenv("DATABASE_URL"), statement_cache_size=0)
-    
-    try:
+    async with db_pool.acquire() as conn:
         document_id = await conn.fetchval(
             """
             INSERT INTO documents (title, source_type, metadata, full_content, created_at)
@@ -90,90 +94,74 @@ async def create_document(title: str, source_type: str,
             json.dumps(metadata) if metadata else '{}',
             full_content
         )
-        
-        return document_id
-        
-    finally:
-        await conn.close()
+    
+    entity_catalogue.add_document(title=title, channel=(metadata or {}).get('channel'))
+    return document_id
 
 
 async def process_chunks(document_id: str, chunks: List):
     """Process chunks: generate embeddings and save to database"""
-    conn = await asyncpg.connect(os.getenv("DATABASE_URL"), statement_cache_size=0)
+    import tiktoken
+    encoding = tiktoken.encoding_for_model("gpt-3.5-turbo")
     
-    try:
-        import tiktoken
-        encoding = tiktoken.encoding_for_model("gpt-3.5-turbo")
-        
-        # Process chunks and ensure they're not too large
-        processed_chunks = []
-        chunk_texts = []
-        
-        for chunk in chunks:
-            # Check token count
-            tokens = len(encoding.encode(chunk.content))
+    # Process chunks and ensure they're not too large
+    processed_chunks = []
+    chunk_texts = []
+    
+    for chunk in chunks:
+        # Check token count
+        tokens = len(encoding.encode(chunk.content))
+        
+        # If chunk is too large, split it
+        if tokens > 8000:
+            # Split into smaller pieces
+            text = chunk.content
+            words = text.split()
+            current_chunk = []
+            current_tokens = 0
             
-            # If chunk is too large, split it
-            if tokens > 8000:
-                # Split into smaller pieces
-                text = chunk.content
-                words = text.split()
-                current_chunk = []
-                current_tokens = 0
-                
-                for word in words:
-                    word_tokens = len(encoding.encode(word))
-                    if current_tokens + word_tokens > 7000:  # Leave some buffer
-                        # Save current chunk
-                        sub_content = ' '.join(current_chunk)
-                        processed_chunks.append(chunk)
-                        chunk_texts.append(sub_content)
-                        current_chunk = [word]
-                        current_tokens = word_tokens
-                    else:
-                        current_chunk.append(word)
-                        current_tokens += word_tokens
-                
-                # Don't forget the last piece
-                if current_chunk:
+            for word in words:
+                word_tokens = len(encoding.encode(word))
+                if current_tokens + word_tokens > 7000:  # Leave some buffer
+                    # Save current chunk
                     sub_content = ' '.join(current_chunk)
                     processed_chunks.append(chunk)
                     chunk_texts.append(sub_content)
-            else:
-                processed_chunks.append(chunk)
-                chunk_texts.append(chunk.content)
-        
-        # Generate embeddings using minimal service
-        embeddings = await embedding_service.encode(chunk_texts)
-        
-        # Insert chunks
-        for i, chunk in enumerate(processed_chunks if processed_chunks else chunks):
-            # Format embedding for pgvector
-            embedding_vector = None
-            if i < len(embeddings):
-                # Convert numpy array to pgvector format string: '[x,y,z]'
-                embedding_list = embeddings[i].tolist()
-                embedding_vector = f'[{",".join(map(str, embedding_list))}]'
-            
-            await conn.execute(
-                """
-                INSERT INTO chunks 
-                (document_id, content, chunk_index, chunk_type, 
-                 embedding, tokens, importance_score, metadata)
-                VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
-                """,
-                document_id,
-                chunk.content,
-                chunk.chunk_index,
-                chunk.chunk_type,
-                embedding_vector,  # Now properly formatted as string
-                chunk.tokens,
-                chunk.importance_score,
-                json.dumps(chunk.metadata) if chunk.metadata else '{}'
-            )
+                    current_chunk = [word]
+                    current_tokens = word_tokens
+                else:
+                    current_chunk.append(word)
+                    current_tokens += word_tokens
             
-    finally:
-        await conn.close()
+            # Don't forget the last piece
+            if current_chunk:
+                sub_content = ' '.join(current_chunk)
+                processed_chunks.append(chunk)
+                chunk_texts.append(sub_content)
+        else:
+            processed_chunks.append(chunk)
+            chunk_texts.append(chunk.content)
+    
+    # Generate embeddings using minimal service
+    embeddings = await embedding_service.encode(chunk_texts)
+    
+    # Prepare rows for the bulk writer
+    chunk_rows = []
+    for i, chunk in enumerate(processed_chunks if processed_chunks else chunks):
+        chunk_rows.append({
+            'content': chunk.content,
+            'chunk_index': chunk.chunk_index,
+            'chunk_type': chunk.chunk_type,
+            'embedding': embeddings[i] if i < len(embeddings) else None,  # numpy array, sent as binary float32
+            'tokens': chunk.tokens,
+            'importance_score': chunk.importance_score,
+            'metadata': json.dumps(chunk.metadata) if chunk.metadata else '{}',
+            'language': chunk.language
+        })
+    
+    # Stream all chunks with COPY in a single transaction
+    async with db_pool.acquire() as conn:
+        await copy_chunks(conn, document_id, chunk_rows)
 
 
 async def generate_document_summary(document_id: str, content: str):
@@ -205,14 +193,11 @@ async def generate_document_summary(document_id: str, content: str):
         summary = response.choices[0].message.content
         
         # Update document with summary
-        conn = await asyncpg.connect(os.getenv("DATABASE_URL"), statement_cache_size=0)
-        try:
+        async with db_pool.acquire() as conn:
             await conn.execute(
                 "UPDATE documents SET summary = $1 WHERE id = $2",
                 summary, document_id
             )
-        finally:
-            await conn.close()
             
     except Exception as e:
         print(f"Error generating summary: {e}")
@@ -9,13 +9,20 @@ from typing import Optional, List, Dict
 from datetime import datetime, timedelta
 import os
 
-from core.retrieval import HybridRetriever
+from core.retrieval import HybridRetriever, FUSION_MODES
+from core.search_filters import SearchFilters, CHUNK_TYPES
+from core.smart_routing import SmartQueryRouter, ROUTE_PAGE_SIZE, decode_cursor
+from core.database import db_pool
 
 
 router = APIRouter()
 
+# HNSW candidate list size for /quick: trades a little recall for latency
+QUICK_EF_SEARCH = int(os.getenv("QUICK_EF_SEARCH", "20"))
+
 # Initialize retriever
-retriever = HybridRetriever(os.getenv("DATABASE_URL"))
+retriever = HybridRetriever(db_pool)
+smart_router = SmartQueryRouter(db_pool)
 
 
 # Pydantic models
@@ -40,7 +47,12 @@ async def search(
     start_date: Optional[datetime] = None,
     end_date: Optional[datetime] = None,
     source_type: Optional[str] = None,
-    use_colbert: bool = True
+    document_ids: Optional[List[str]] = Query(None),
+    chunk_type: Optional[str] = None,
+    use_colbert: bool = True,
+    context_window: int = Query(1, ge=0, le=5),
+    ef_search: Optional[int] = Query(None, ge=10, le=1000),
+    fusion: str = Query("linear", description="linear, rrf or zscore")
 ):
     """
     Perform hybrid search across all documents
@@ -52,31 +64,42 @@ async def search(
     - start_date: Filter by start date
     - end_date: Filter by end date
     - source_type: Filter by source type (youtube, audio, text)
+    - document_ids: Restrict to these documents (repeat the parameter)
+    - chunk_type: Filter by chunk type (summary, topic, detail)
     - use_colbert: Whether to use ColBERT re-ranking
+    - context_window: Neighbouring chunks to include on each side of a hit
+    - ef_search: HNSW recall/latency knob (higher = better recall, slower)
+    - fusion: Score fusion (linear, rrf or zscore; rrf/zscore add recency and importance)
     """
+    if fusion not in FUSION_MODES:
+        raise HTTPException(status_code=400, detail=f"Unknown fusion mode: {fusion}")
+    if chunk_type and chunk_type not in CHUNK_TYPES:
+        raise HTTPException(status_code=400, detail=f"Unknown chunk type: {chunk_type}")
+    
     start_time = datetime.now()
     
     try:
-        # Build filters
-        filters = {}
-        if source_type:
-            filters['source_type'] = source_type
+        # Filters are applied inside the search query, so limit is honoured
+        filters = SearchFilters(
+            speaker=speaker,
+            start_date=start_date,
+            end_date=end_date,
+            source_type=source_type,
+            document_ids=document_ids,
+            chunk_type=chunk_type
+        )
         
         # Perform search
         results = await retriever.search(
             query=q,
             top_k=limit,
             use_colbert_rerank=use_colbert,
-            filters=filters if filters else None
+            filters=filters,
+            context_window=context_window,
+            ef_search=ef_search,
+            fusion=fusion
         )
         
-        # Apply additional filters if needed
-        if speaker:
-            results = [r for r in results if r.get('speaker', '').lower() == speaker.lower()]
-        
-        if start_date or end_date:
-            results = await filter_by_date_range(results, start_date, end_date)
-        
         # Calculate search time
         search_time_ms = (datetime.now() - start_time).total_seconds() * 1000
         
@@ -146,6 +169,40 @@ async def search_by_date(
         raise HTTPException(status_code=500, detail=f"Date range search error: {str(e)}")
 
 
+@router.get("/routed")
+async def routed_search(
+    q: str = Query(..., description="Search query"),
+    limit: int = Query(ROUTE_PAGE_SIZE, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page")
+):
+    """
+    Search the way chat routes a question, one page at a time
+    
+    Speaker questions ("was hat Sascha gesagt") and time references ("letzte
+    Woche") are ranked inside the speaker or time window. Pass next_cursor
+    back as cursor to get the following page; it is null on the last page.
+    """
+    if cursor and decode_cursor(cursor) is None:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    
+    try:
+        result = await smart_router.route_query(q, cursor=cursor, limit=limit)
+        chunks = result.get('chunks', [])
+        
+        return {
+            "query": q,
+            "strategy": result['strategy'],
+            "speaker": result.get('speaker'),
+            "since_date": result.get('since_date'),
+            "results": chunks,
+            "total_results": len(chunks),
+            "next_cursor": result.get('next_cursor')
+        }
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Routed search error: {str(e)}")
+
+
 @router.get("/similar/{document_id}")
 async def find_similar_documents(
     document_id: str,
@@ -179,7 +236,8 @@ async def quick_search(query: str):
         results = await retriever.search(
             query=query,
             top_k=3,
-            use_colbert_rerank=False  # Skip for speed
+            use_colbert_rerank=False,  # Skip for speed
+            ef_search=QUICK_EF_SEARCH
         )
         
         if not results:
@@ -248,27 +306,6 @@ async def search_recent(
 
 
 # Helper functions
-async def filter_by_date_range(results: List[Dict], 
-                             start_date: Optional[datetime],
-                             end_date: Optional[datetime]) -> List[Dict]:
-    """Filter results by date range"""
-    filtered = []
-    
-    for result in results:
-        doc_date = result.get('document', {}).get('created_at')
-        if doc_date:
-            doc_datetime = datetime.fromisoformat(doc_date.replace('Z', '+00:00'))
-            
-            if start_date and doc_datetime < start_date:
-                continue
-            if end_date and doc_datetime > end_date:
-                continue
-                
-            filtered.append(result)
-    
-    return filtered
-
-
 def format_for_voice(text: str, max_length: int = 200) -> str:
     """Format text for voice output"""
     # Remove special characters and URLs
@@ -0,0 +1,123 @@
+"""
+Content-addressed chunk embedding cache for MyBrain
+Persists embeddings in Postgres keyed by sha256(model + text) so ingestion only pays for new text
+"""
+
+import os
+import hashlib
+from typing import List, Dict, Optional, Callable, Awaitable
+import numpy as np
+from core.database import DatabasePool, db_pool
+
+
+class ChunkEmbeddingCache:
+    """Persistent embedding cache backed by the embedding_cache table"""
+
+    def __init__(self, pool: Optional[DatabasePool] = None):
+        self.pool = pool or db_pool
+        self.enabled = os.getenv("CHUNK_EMBEDDING_CACHE", "true").lower() not in ('0', 'false', 'no', 'off')
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'errors': 0
+        }
+
+    @staticmethod
+    def content_key(model: str, text: str) -> bytes:
+        """sha256 over model and exact text"""
+        return hashlib.sha256(f"{model}\x00{text}".encode('utf-8')).digest()
+
+    async def get_many(self, keys: List[bytes]) -> Dict[bytes, List[float]]:
+        """Look up all keys in one query"""
+        if not keys:
+            return {}
+
+        async with self.pool.acquire() as conn:
+            rows = await conn.fetch(
+                """
+                SELECT content_hash, embedding
+                FROM embedding_cache
+                WHERE content_hash = ANY($1::bytea[])
+                """,
+                keys
+            )
+
+        return {
+            bytes(row['content_hash']): np.frombuffer(row['embedding'], dtype='<f4').tolist()
+            for row in rows
+        }
+
+    async def put_many(self, model: str, items: Dict[bytes, List[float]]):
+        """Store new embeddings in one statement, ignoring keys that already exist"""
+        if not items:
+            return
+
+        keys = list(items.keys())
+        blobs = [np.asarray(items[k], dtype='<f4').tobytes() for k in keys]
+        dims = [len(items[k]) for k in keys]
+
+        async with self.pool.acquire() as conn:
+            await conn.execute(
+                """
+                INSERT INTO embedding_cache (content_hash, model, dims, embedding)
+                SELECT k, $2, d, e
+                FROM unnest($1::bytea[], $3::int[], $4::bytea[]) AS t(k, d, e)
+                ON CONFLICT (content_hash) DO NOTHING
+                """,
+                keys,
+                model,
+                dims,
+                blobs
+            )
+
+    async def embed(self,
+                    model: str,
+                    texts: List[str],
+                    compute: Callable[[List[str]], Awaitable[List[List[float]]]]) -> List[List[float]]:
+        """
+        Embed texts, sending only cache misses to compute()
+
+        Identical texts within the batch (e.g. shared overlap) are embedded once.
+        Cache failures fall back to computing everything.
+        """
+        if not texts:
+            return []
+
+        if not self.enabled:
+            return list(await compute(texts))
+
+        keys = [self.content_key(model, text) for text in texts]
+
+        try:
+            cached = await self.get_many(list(set(keys)))
+        except Exception as e:
+            self.stats['errors'] += 1
+            print(f"Chunk embedding cache lookup failed: {e}")
+            return list(await compute(texts))
+
+        # Unique misses, in first-seen order
+        miss_texts = {}
+        for key, text in zip(keys, texts):
+            if key not in cached and key not in miss_texts:
+                miss_texts[key] = text
+
+        self.stats['hits'] += len(texts) - sum(1 for key in keys if key in miss_texts)
+        self.stats['misses'] += len(miss_texts)
+
+        if miss_texts:
+            miss_keys = list(miss_texts.keys())
+            new_embeddings = await compute([miss_texts[k] for k in miss_keys])
+            fresh = {k: list(emb) for k, emb in zip(miss_keys, new_embeddings)}
+            cached.update(fresh)
+
+            try:
+                await self.put_many(model, fresh)
+            except Exception as e:
+                self.stats['errors'] += 1
+                print(f"Chunk embedding cache write failed: {e}")
+
+        return [cached[key] for key in keys]
+
+
+# Global instance
+chunk_embedding_cache = ChunkEmbeddingCache()
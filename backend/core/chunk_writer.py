@@ -0,0 +1,89 @@
+"""
+Bulk chunk writer for MyBrain
+Streams chunk and ColBERT rows with COPY instead of one INSERT round trip per row
+"""
+
+import uuid
+from typing import List, Dict, Optional
+import asyncpg
+
+
+CHUNK_COLUMNS = [
+    'id', 'document_id', 'content', 'chunk_index', 'chunk_type',
+    'start_time', 'end_time', 'speaker', 'embedding',
+    'tokens', 'importance_score', 'metadata', 'language'
+]
+
+COLBERT_COLUMNS = [
+    'id', 'chunk_id', 'token_data', 'token_dtype', 'token_count', 'token_dim', 'token_texts'
+]
+
+
+async def copy_chunks(conn: asyncpg.Connection,
+                      document_id,
+                      chunks: List[Dict],
+                      colbert_rows: Optional[List[Dict]] = None) -> List[uuid.UUID]:
+    """
+    Write all chunks of a document (and their ColBERT rows) in one transaction
+
+    Chunk ids are generated client-side so ColBERT rows can reference them
+    without reading anything back.
+
+    Args:
+        conn: Connection with the binary vector codec registered
+        document_id: Owning document
+        chunks: Dicts with the chunk columns (embedding as numpy array or float list,
+            metadata as JSON string)
+        colbert_rows: Dicts with 'chunk_position' (index into chunks) plus
+            token_data, token_dtype, token_count, token_dim and token_texts
+
+    Returns:
+        Generated chunk ids in the order of chunks
+    """
+    chunk_ids = [uuid.uuid4() for _ in chunks]
+
+    chunk_records = [
+        (
+            chunk_id,
+            document_id,
+            chunk['content'],
+            chunk['chunk_index'],
+            chunk.get('chunk_type', 'detail'),
+            chunk.get('start_time'),
+            chunk.get('end_time'),
+            chunk.get('speaker'),
+            chunk.get('embedding'),
+            chunk.get('tokens'),
+            chunk.get('importance_score', 0.5),
+            chunk.get('metadata') or '{}',
+            chunk.get('language')
+        )
+        for chunk_id, chunk in zip(chunk_ids, chunks)
+    ]
+
+    colbert_records = []
+    for row in colbert_rows or []:
+        position = row.get('chunk_position')
+        if position is None or not 0 <= position < len(chunk_ids):
+            continue
+        colbert_records.append((
+            uuid.uuid4(),
+            chunk_ids[position],
+            row['token_data'],
+            row['token_dtype'],
+            row['token_count'],
+            row['token_dim'],
+            row['token_texts']
+        ))
+
+    async with conn.transaction():
+        if chunk_records:
+            await conn.copy_records_to_table(
+                'chunks', records=chunk_records, columns=CHUNK_COLUMNS
+            )
+        if colbert_records:
+            await conn.copy_records_to_table(
+                'colbert_tokens', records=colbert_records, columns=COLBERT_COLUMNS
+            )
+
+    return chunk_ids
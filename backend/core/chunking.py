@@ -9,6 +9,20 @@ from dataclasses import dataclass
 import numpy as np
 from datetime import timedelta
 
+try:
+    from langdetect import detect as langdetect_detect, DetectorFactory
+    DetectorFactory.seed = 0  # Deterministic results
+except ImportError:
+    langdetect_detect = None
+
+
+# Languages with a full-text search configuration in the database
+SUPPORTED_LANGUAGES = ('de', 'en')
+
+# Frequent function words used when langdetect is not installed
+_GERMAN_MARKERS = {'und', 'der', 'die', 'das', 'ist', 'nicht', 'ich', 'wir', 'sie', 'mit', 'auf', 'für', 'auch', 'eine'}
+_ENGLISH_MARKERS = {'and', 'the', 'is', 'not', 'you', 'we', 'they', 'with', 'on', 'for', 'also', 'this', 'that', 'of'}
+
 
 @dataclass
 class Chunk:
@@ -22,6 +36,7 @@ class Chunk:
     tokens: int = 0
     importance_score: float = 0.5
     metadata: Dict = None
+    language: Optional[str] = None  # 'de' or 'en', selects the FTS configuration
     
     def to_dict(self) -> Dict:
         return {
@@ -33,10 +48,31 @@ class Chunk:
             "speaker": self.speaker,
             "tokens": self.tokens,
             "importance_score": self.importance_score,
-            "metadata": self.metadata or {}
+            "metadata": self.metadata or {},
+            "language": self.language
         }
 
 
+def detect_language(text: str, default: str = 'de') -> str:
+    """Detect whether text is German or English"""
+    if langdetect_detect is not None:
+        try:
+            language = langdetect_detect(text[:2000])
+            if language in SUPPORTED_LANGUAGES:
+                return language
+        except Exception:
+            pass
+    
+    # Heuristic fallback: umlauts and common function words
+    words = re.findall(r'\b\w+\b', text.lower())
+    german = sum(1 for w in words if w in _GERMAN_MARKERS) + 2 * len(re.findall(r'[äöüß]', text.lower()))
+    english = sum(1 for w in words if w in _ENGLISH_MARKERS)
+    
+    if german == english:
+        return default
+    return 'de' if german > english else 'en'
+
+
 class SmartChunker:
     """Hierarchical chunking system for long-form content"""
     
@@ -86,6 +122,10 @@ class SmartChunker:
         # Assign importance scores
         chunks = self._calculate_importance_scores(chunks)
         
+        # Detect language per chunk (mixed-language transcripts are common)
+        for chunk in chunks:
+            chunk.language = detect_language(chunk.content)
+        
         return chunks
     
     def chunk_youtube_video(self,
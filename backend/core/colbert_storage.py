@@ -0,0 +1,54 @@
+"""
+Binary storage format for ColBERT token embeddings
+Packs token matrices into bytea with shape metadata (see migration 005)
+"""
+
+from typing import Dict, Tuple, Union, List
+import numpy as np
+
+
+# New rows are stored as little-endian float16
+STORAGE_DTYPE = '<f2'
+
+
+def encode_token_embeddings(
+    token_embeddings: Union[np.ndarray, List[List[float]]],
+    dtype: str = STORAGE_DTYPE
+) -> Tuple[bytes, str, int, int]:
+    """
+    Pack a (tokens x dim) matrix for the colbert_tokens table
+
+    Returns:
+        (token_data, token_dtype, token_count, token_dim)
+    """
+    matrix = np.asarray(token_embeddings, dtype=np.dtype(dtype))
+    if matrix.ndim != 2:
+        raise ValueError(f"Expected a 2-D token matrix, got shape {matrix.shape}")
+
+    matrix = np.ascontiguousarray(matrix)
+    return matrix.tobytes(), matrix.dtype.str, matrix.shape[0], matrix.shape[1]
+
+
+def decode_token_embeddings(
+    token_data: bytes,
+    token_dtype: str,
+    token_count: int,
+    token_dim: int
+) -> np.ndarray:
+    """
+    Unpack a stored token matrix without copying the buffer
+
+    The returned array is a read-only view over token_data.
+    """
+    matrix = np.frombuffer(token_data, dtype=np.dtype(token_dtype))
+    return matrix.reshape(token_count, token_dim)
+
+
+def decode_token_row(row: Dict) -> np.ndarray:
+    """Unpack a colbert_tokens row (or dict with the same columns)"""
+    return decode_token_embeddings(
+        row['token_data'],
+        row['token_dtype'],
+        row['token_count'],
+        row['token_dim']
+    )
@@ -8,8 +8,34 @@ import asyncpg
 import asyncio
 from dataclasses import dataclass
 from datetime import datetime
+import os
 import re
 import json
+from core.database import DatabasePool, db_pool
+from core.telemetry import traced
+
+
+# Keywords profiled per document at ingest
+TECH_KEYWORDS = [
+    'api', 'integration', 'automation', 'tool', 'server', 'system',
+    'platform', 'framework', 'service', 'protocol', 'workflow'
+]
+# Technology pairs suggesting one document's tooling fits the other's
+COMPLEMENTARY_TECHNOLOGIES = [('api', 'integration'), ('server', 'automation')]
+
+PROBLEM_PATTERNS = ['%problem%', '%need%', '%challenge%', '%anforderung%']
+SOLUTION_PATTERNS = ['%solution%', '%lösung%', '%approach%', '%tool%']
+
+# Queries asking how something could be solved or used
+SOLUTION_QUERY_KEYWORDS = ['how', 'kann', 'könnte', 'solve', 'help', 'nutzen', 'einsetzen']
+
+# Relationship graph construction
+RELATIONSHIP_CANDIDATES = int(os.getenv("RELATIONSHIP_CANDIDATES", "200"))
+SIMILARITY_NEIGHBOURS = 5
+SIMILARITY_THRESHOLD = float(os.getenv("RELATIONSHIP_SIMILARITY_THRESHOLD", "0.8"))
+
+# Edges read per chat turn
+MAX_INSIGHT_EDGES = 200
 
 
 @dataclass
@@ -37,48 +63,56 @@ class CrossContextInsight:
 class CrossContextReasoner:
     """Handles reasoning across multiple documents and contexts"""
     
-    def __init__(self, database_url: str):
-        self.database_url = database_url
+    def __init__(self, pool: Optional[DatabasePool] = None):
+        self.pool = pool or db_pool
         self._relationship_cache = {}
         
+    @traced('cross_context')
     async def find_cross_context_insights(
         self, 
         query: str, 
         primary_results: List[Dict],
         conversation_history: List[Dict] = None
     ) -> CrossContextInsight:
-        """Find insights that span multiple documents/contexts"""
-        
-        conn = await asyncpg.connect(self.database_url, statement_cache_size=0)
-        try:
-            # Extract entities and concepts from query
-            entities = self._extract_entities(query)
-            concepts = self._extract_concepts(query)
-            
-            # Identify primary document context
-            primary_docs = self._get_unique_documents(primary_results)
-            
-            # Find related documents
-            related_docs = await self._find_related_documents(
-                conn, primary_docs, entities, concepts
-            )
-            
-            # Extract cross-context patterns
-            insights = await self._extract_insights(
-                conn, query, primary_docs, related_docs, conversation_history
-            )
-            
-            # Build comprehensive response
+        """
+        Find insights that span multiple documents/contexts
+        
+        Reads the edges of the primary documents from document_relationships
+        (built at ingest by update_document_relationships) in one query.
+        """
+        # Identify primary document context
+        primary_docs = self._get_unique_documents(primary_results)
+        if not primary_docs:
             return CrossContextInsight(
-                query=query,
-                primary_context=primary_docs[0] if primary_docs else {},
-                related_contexts=related_docs,
-                insights=insights,
-                confidence=self._calculate_confidence(insights, related_docs)
+                query=query, primary_context={}, related_contexts=[], insights=[], confidence=0.5
             )
-            
-        finally:
-            await conn.close()
+        
+        async with self.pool.acquire() as conn:
+            edges = await conn.fetch("""
+                SELECT
+                    r.source_id, s.title AS source_title, s.created_at AS source_created_at,
+                    r.target_id, t.title AS target_title, t.summary AS target_summary,
+                    t.source_type AS target_source_type, t.created_at AS target_created_at,
+                    r.relationship_type, r.confidence, r.evidence
+                FROM document_relationships r
+                JOIN documents s ON s.id = r.source_id
+                JOIN documents t ON t.id = r.target_id
+                WHERE r.source_id = ANY($1::uuid[])
+                ORDER BY r.confidence DESC
+                LIMIT $2
+            """, [doc['id'] for doc in primary_docs], MAX_INSIGHT_EDGES)
+        
+        related_docs = self._rank_related_documents(primary_docs, edges)
+        insights = self._edges_to_insights(query, primary_docs, related_docs, edges)
+        
+        # Build comprehensive response
+        return CrossContextInsight(
+            query=query,
+            primary_context=primary_docs[0],
+            related_contexts=related_docs,
+            insights=insights,
+            confidence=self._calculate_confidence(insights, related_docs)
+        )
     
     async def find_document_relationships(
         self, 
@@ -89,38 +123,58 @@ class CrossContextReasoner:
         if len(document_ids) < 2:
             return []
             
-        conn = await asyncpg.connect(self.database_url, statement_cache_size=0)
-        try:
-            relationships = []
-            
-            # Get document details
-            docs = await conn.fetch("""
-                SELECT id, title, summary, created_at
-                FROM documents 
-                WHERE id = ANY($1)
+        async with self.pool.acquire() as conn:
+            # Symmetric edges are stored twice; return each pair once
+            edges = await conn.fetch("""
+                SELECT r.source_id, s.title AS source_title, r.target_id, t.title AS target_title,
+                       r.relationship_type, r.confidence, r.evidence
+                FROM document_relationships r
+                JOIN documents s ON s.id = r.source_id
+                JOIN documents t ON t.id = r.target_id
+                WHERE r.source_id = ANY($1::uuid[])
+                AND r.target_id = ANY($1::uuid[])
+                AND (r.relationship_type = 'solution_match' OR r.source_id < r.target_id)
+                ORDER BY r.confidence DESC
             """, document_ids)
-            
-            doc_map = {doc['id']: doc for doc in docs}
-            
-            # Check each pair
-            for i in range(len(document_ids)):
-                for j in range(i + 1, len(document_ids)):
-                    doc1_id = document_ids[i]
-                    doc2_id = document_ids[j]
-                    
-                    if doc1_id not in doc_map or doc2_id not in doc_map:
-                        continue
-                    
-                    # Find relationships
-                    rels = await self._analyze_document_pair(
-                        conn, doc_map[doc1_id], doc_map[doc2_id]
-                    )
-                    relationships.extend(rels)
-            
-            return relationships
-            
-        finally:
-            await conn.close()
+        
+        evidence_labels = {
+            'people': 'Both involve',
+            'topic': 'Shared topics',
+            'temporal': 'Topic evolution',
+            'technology': 'Technologies',
+            'similarity': 'Similar summaries',
+            'solution_match': 'Need and solution'
+        }
+        return [
+            DocumentRelationship(
+                doc1_id=edge['source_id'],
+                doc1_title=edge['source_title'],
+                doc2_id=edge['target_id'],
+                doc2_title=edge['target_title'],
+                relationship_type=edge['relationship_type'],
+                confidence=edge['confidence'],
+                evidence=[f"{evidence_labels[edge['relationship_type']]}: {', '.join(edge['evidence'][:3])}"]
+                if edge['evidence'] else []
+            )
+            for edge in edges
+        ]
+    
+    async def update_document_relationships(self, document_id) -> int:
+        """
+        Profile a freshly ingested document and (re)build its edges
+        
+        Call once its chunks and summary are stored. Candidates come from GIN
+        overlaps on speakers and concepts plus the nearest summary embeddings,
+        so the cost does not grow with the number of documents. Returns the
+        number of edges written; failures are logged, never raised, so ingest
+        is not affected.
+        """
+        try:
+            async with self.pool.acquire() as conn:
+                return await self._build_document_relationships(conn, document_id)
+        except Exception as e:
+            print(f"Error building relationships for document {document_id}: {e}")
+            return 0
     
     async def suggest_connections(
         self,
@@ -129,8 +183,7 @@ class CrossContextReasoner:
     ) -> List[Dict]:
         """Suggest how insights from one document could apply to another context"""
         
-        conn = await asyncpg.connect(self.database_url, statement_cache_size=0)
-        try:
+        async with self.pool.acquire() as conn:
             suggestions = []
             
             # Extract key concepts from the document
@@ -161,314 +214,251 @@ class CrossContextReasoner:
                     suggestions.append(connection)
             
             return suggestions
-            
-        finally:
-            await conn.close()
     
-    async def _find_related_documents(
-        self,
-        conn: asyncpg.Connection,
-        primary_docs: List[Dict],
-        entities: List[str],
-        concepts: List[str]
-    ) -> List[Dict]:
-        """Find documents related by entities or concepts"""
-        
-        if not primary_docs:
-            return []
-        
-        primary_ids = [doc['id'] for doc in primary_docs]
-        
-        # Search for documents with shared entities or concepts
-        related = await conn.fetch("""
-            SELECT DISTINCT d.id, d.title, d.summary, d.source_type,
-                   COUNT(DISTINCT c.id) as relevance_count
-            FROM documents d
-            JOIN chunks c ON c.document_id = d.id
-            WHERE d.id != ALL($1)
-            AND (
-                -- Entity matches
-                c.speaker = ANY($2) OR
-                -- Concept matches
-                c.content ILIKE ANY($3) OR
-                -- Cross-references
-                c.content ILIKE ANY($4)
+    async def _build_document_relationships(self, conn: asyncpg.Connection, document_id) -> int:
+        concepts = await self._extract_document_concepts(conn, document_id)
+        
+        async with conn.transaction():
+            profile = await conn.fetchrow("""
+                INSERT INTO document_profiles
+                    (document_id, speakers, concepts, technologies, has_problems, has_solutions, updated_at)
+                SELECT
+                    $1,
+                    ARRAY(
+                        SELECT DISTINCT speaker FROM chunks
+                        WHERE document_id = $1 AND speaker IS NOT NULL
+                        ORDER BY 1
+                    ),
+                    $2::text[],
+                    ARRAY(
+                        SELECT DISTINCT m[1]
+                        FROM chunks c, regexp_matches(lower(c.content), '\\m(' || $3 || ')', 'g') m
+                        WHERE c.document_id = $1
+                        ORDER BY 1
+                    ),
+                    EXISTS (SELECT 1 FROM chunks WHERE document_id = $1 AND content ILIKE ANY($4::text[])),
+                    EXISTS (SELECT 1 FROM chunks WHERE document_id = $1 AND content ILIKE ANY($5::text[])),
+                    NOW()
+                ON CONFLICT (document_id) DO UPDATE SET
+                    speakers = EXCLUDED.speakers,
+                    concepts = EXCLUDED.concepts,
+                    technologies = EXCLUDED.technologies,
+                    has_problems = EXCLUDED.has_problems,
+                    has_solutions = EXCLUDED.has_solutions,
+                    updated_at = EXCLUDED.updated_at
+                RETURNING document_id, speakers, concepts, technologies, has_problems, has_solutions,
+                          (SELECT created_at FROM documents WHERE id = $1) AS created_at
+            """,
+            document_id,
+            concepts,
+            '|'.join(TECH_KEYWORDS),
+            PROBLEM_PATTERNS,
+            SOLUTION_PATTERNS
             )
-            GROUP BY d.id, d.title, d.summary, d.source_type
-            ORDER BY relevance_count DESC
-            LIMIT 5
-        """, 
-        primary_ids,
-        entities,
-        [f'%{concept}%' for concept in concepts],
-        [f'%{doc["title"]}%' for doc in primary_docs if doc.get("title")]
-        )
-        
-        return [dict(doc) for doc in related]
-    
-    async def _extract_insights(
-        self,
-        conn: asyncpg.Connection,
-        query: str,
-        primary_docs: List[Dict],
-        related_docs: List[Dict],
-        conversation_history: List[Dict] = None
-    ) -> List[str]:
-        """Extract cross-context insights"""
-        
-        insights = []
-        
-        # Pattern 1: People connections
-        people_insights = await self._find_people_connections(
-            conn, primary_docs, related_docs
-        )
-        insights.extend(people_insights)
-        
-        # Pattern 2: Solution-Problem matching
-        solution_insights = await self._find_solution_matches(
-            conn, query, primary_docs, related_docs
-        )
-        insights.extend(solution_insights)
-        
-        # Pattern 3: Temporal progression
-        temporal_insights = await self._find_temporal_patterns(
-            conn, primary_docs, related_docs
-        )
-        insights.extend(temporal_insights)
-        
-        # Pattern 4: Technology complementarity
-        tech_insights = await self._find_technology_synergies(
-            conn, primary_docs, related_docs
-        )
-        insights.extend(tech_insights)
-        
-        return insights
-    
-    async def _analyze_document_pair(
-        self,
-        conn: asyncpg.Connection,
-        doc1: Dict,
-        doc2: Dict
-    ) -> List[DocumentRelationship]:
-        """Analyze relationship between two documents"""
-        
-        relationships = []
-        
-        # Check for shared people
-        people1 = await conn.fetch("""
-            SELECT DISTINCT speaker FROM chunks 
-            WHERE document_id = $1 AND speaker IS NOT NULL
-        """, doc1['id'])
-        
-        people2 = await conn.fetch("""
-            SELECT DISTINCT speaker FROM chunks 
-            WHERE document_id = $1 AND speaker IS NOT NULL
-        """, doc2['id'])
-        
-        people1_set = {p['speaker'] for p in people1}
-        people2_set = {p['speaker'] for p in people2}
-        shared_people = people1_set & people2_set
-        
-        if shared_people:
-            relationships.append(DocumentRelationship(
-                doc1_id=doc1['id'],
-                doc1_title=doc1['title'],
-                doc2_id=doc2['id'],
-                doc2_title=doc2['title'],
-                relationship_type='people',
-                confidence=0.9,
-                evidence=[f"Both involve: {', '.join(shared_people)}"]
-            ))
-        
-        # Check for topic overlap
-        topics1 = await self._extract_document_concepts(conn, doc1['id'])
-        topics2 = await self._extract_document_concepts(conn, doc2['id'])
-        
-        topic_overlap = set(topics1) & set(topics2)
-        if len(topic_overlap) >= 2:
-            relationships.append(DocumentRelationship(
-                doc1_id=doc1['id'],
-                doc1_title=doc1['title'],
-                doc2_id=doc2['id'],
-                doc2_title=doc2['title'],
-                relationship_type='topic',
-                confidence=0.7 + (0.1 * min(len(topic_overlap), 3)),
-                evidence=[f"Shared topics: {', '.join(list(topic_overlap)[:3])}"]
-            ))
-        
-        return relationships
-    
-    async def _find_people_connections(
-        self,
-        conn: asyncpg.Connection,
-        primary_docs: List[Dict],
-        related_docs: List[Dict]
-    ) -> List[str]:
-        """Find insights about people across documents"""
-        
-        insights = []
-        
-        # Get all people mentioned
-        all_doc_ids = [d['id'] for d in primary_docs + related_docs]
-        people_mentions = await conn.fetch("""
-            SELECT speaker, document_id, COUNT(*) as mention_count
-            FROM chunks
-            WHERE document_id = ANY($1) AND speaker IS NOT NULL
-            GROUP BY speaker, document_id
-        """, all_doc_ids)
-        
-        # Group by person
-        person_docs = {}
-        for mention in people_mentions:
-            person = mention['speaker']
-            if person not in person_docs:
-                person_docs[person] = []
-            person_docs[person].append(mention['document_id'])
-        
-        # Find people in multiple contexts
-        for person, doc_ids in person_docs.items():
-            if len(doc_ids) > 1:
-                doc_titles = []
-                for doc_id in doc_ids:
-                    for doc in primary_docs + related_docs:
-                        if doc['id'] == doc_id:
-                            doc_titles.append(doc['title'])
-                            break
-                
-                if len(doc_titles) > 1:
-                    insights.append(
-                        f"{person} appears in multiple contexts: {', '.join(doc_titles[:3])}"
-                    )
-        
-        return insights
+            
+            # Candidate neighbours, each through an index
+            people_ids = await conn.fetch("""
+                SELECT document_id FROM document_profiles
+                WHERE speakers && $1::text[] AND document_id <> $2
+                LIMIT $3
+            """, profile['speakers'], document_id, RELATIONSHIP_CANDIDATES) if profile['speakers'] else []
+            
+            concept_ids = await conn.fetch("""
+                SELECT document_id FROM document_profiles
+                WHERE concepts && $1::text[] AND document_id <> $2
+                LIMIT $3
+            """, profile['concepts'], document_id, RELATIONSHIP_CANDIDATES) if profile['concepts'] else []
+            
+            similar = await conn.fetch("""
+                SELECT d.id, 1 - (d.summary_embedding <=> me.summary_embedding) AS similarity
+                FROM documents me
+                JOIN LATERAL (
+                    SELECT id, summary_embedding FROM documents
+                    WHERE summary_embedding IS NOT NULL AND id <> me.id
+                    ORDER BY summary_embedding <=> me.summary_embedding
+                    LIMIT $2
+                ) d ON TRUE
+                WHERE me.id = $1 AND me.summary_embedding IS NOT NULL
+            """, document_id, SIMILARITY_NEIGHBOURS)
+            similarity = {
+                row['id']: row['similarity'] for row in similar
+                if row['similarity'] >= SIMILARITY_THRESHOLD
+            }
+            
+            candidate_ids = {row['document_id'] for row in people_ids} \
+                | {row['document_id'] for row in concept_ids} | set(similarity)
+            others = await conn.fetch("""
+                SELECT p.document_id, p.speakers, p.concepts, p.technologies,
+                       p.has_problems, p.has_solutions, d.created_at
+                FROM document_profiles p
+                JOIN documents d ON d.id = p.document_id
+                WHERE p.document_id = ANY($1::uuid[])
+            """, list(candidate_ids)) if candidate_ids else []
+            
+            edges = self._relationship_edges(profile, others, similarity)
+            
+            # Withdraw this document's earlier claims; edges that other
+            # documents found against it stay
+            await conn.execute("""
+                UPDATE document_relationships
+                SET built_by = array_remove(built_by, $1)
+                WHERE (source_id = $1 OR target_id = $1) AND $1 = ANY(built_by)
+            """, document_id)
+            await conn.execute("""
+                DELETE FROM document_relationships
+                WHERE (source_id = $1 OR target_id = $1) AND built_by = '{}'
+            """, document_id)
+            if edges:
+                await conn.executemany("""
+                    INSERT INTO document_relationships
+                        (source_id, target_id, relationship_type, confidence, evidence, built_by)
+                    VALUES ($1, $2, $3, $4, $5, ARRAY[$6::uuid])
+                    ON CONFLICT (source_id, relationship_type, target_id) DO UPDATE SET
+                        confidence = EXCLUDED.confidence,
+                        evidence = EXCLUDED.evidence,
+                        built_by = array_append(array_remove(document_relationships.built_by, $6::uuid), $6::uuid)
+                """, [edge + (document_id,) for edge in edges])
+        
+        return len(edges)
     
-    async def _find_solution_matches(
-        self,
-        conn: asyncpg.Connection,
-        query: str,
-        primary_docs: List[Dict],
-        related_docs: List[Dict]
-    ) -> List[str]:
-        """Match solutions to problems across documents"""
-        
-        insights = []
-        
-        # Identify if query is about finding solutions
-        solution_keywords = ['how', 'kann', 'könnte', 'solve', 'help', 'nutzen', 'einsetzen']
-        is_solution_query = any(kw in query.lower() for kw in solution_keywords)
-        
-        if not is_solution_query:
-            return insights
-        
-        # Extract problems/needs from primary context
-        for primary in primary_docs:
-            problems = await conn.fetch("""
-                SELECT content FROM chunks
-                WHERE document_id = $1
-                AND (content ILIKE '%problem%' OR content ILIKE '%need%' OR 
-                     content ILIKE '%challenge%' OR content ILIKE '%anforderung%')
-                LIMIT 5
-            """, primary['id'])
+    def _relationship_edges(self,
+                            profile: Dict,
+                            others: List[Dict],
+                            similarity: Dict) -> List[Tuple]:
+        """Edge rows (source, target, type, confidence, evidence) between a document and its candidates"""
+        me = profile['document_id']
+        my_concepts = list(profile['concepts'])
+        edges = []
+        
+        def symmetric(other, kind, confidence, evidence):
+            edges.append((me, other, kind, confidence, evidence))
+            edges.append((other, me, kind, confidence, evidence))
+        
+        earlier, later = None, None
+        for other in others:
+            other_id = other['document_id']
+            edge_count = len(edges)
+            
+            shared_people = sorted(set(profile['speakers']) & set(other['speakers']))
+            if shared_people:
+                symmetric(other_id, 'people', 0.9, shared_people)
+            
+            # In the order of my concepts, i.e. most frequent first
+            shared_concepts = [c for c in my_concepts if c in set(other['concepts'])]
+            if len(shared_concepts) >= 2:
+                symmetric(other_id, 'topic', round(0.7 + 0.1 * min(len(shared_concepts), 3), 2), shared_concepts[:3])
             
-            # Find potential solutions in related docs
-            for related in related_docs:
-                solutions = await conn.fetch("""
-                    SELECT content FROM chunks
-                    WHERE document_id = $1
-                    AND (content ILIKE '%solution%' OR content ILIKE '%lösung%' OR
-                         content ILIKE '%approach%' OR content ILIKE '%tool%')
-                    LIMIT 5
-                """, related['id'])
+            if other_id in similarity:
+                symmetric(other_id, 'similarity', float(similarity[other_id]), [])
+            
+            # Nearest document on each side in time with a concept in common
+            if shared_concepts and other['created_at'] and profile['created_at']:
+                if other['created_at'] < profile['created_at']:
+                    if earlier is None or other['created_at'] > earlier[0]['created_at']:
+                        earlier = (other, shared_concepts)
+                elif later is None or other['created_at'] < later[0]['created_at']:
+                    later = (other, shared_concepts)
+            
+            # Needs and solutions, only between documents already related above
+            if len(edges) > edge_count:
+                if profile['has_problems'] and other['has_solutions']:
+                    edges.append((me, other_id, 'solution_match', 0.6, []))
+                if other['has_problems'] and profile['has_solutions']:
+                    edges.append((other_id, me, 'solution_match', 0.6, []))
                 
-                if problems and solutions:
-                    insights.append(
-                        f"Potential connection: {related['title']} might address needs from {primary['title']}"
-                    )
-        
-        return insights
+                mine, theirs = set(profile['technologies']), set(other['technologies'])
+                complementary = [
+                    [a, b] for a, b in COMPLEMENTARY_TECHNOLOGIES
+                    if (a in mine and b in theirs) or (a in theirs and b in mine)
+                ]
+                if complementary:
+                    symmetric(other_id, 'technology', 0.6, complementary[0])
+        
+        for neighbour in (earlier, later):
+            if neighbour:
+                other, shared_concepts = neighbour
+                symmetric(other['document_id'], 'temporal', 0.6, shared_concepts[:2])
+        
+        return edges
     
-    async def _find_temporal_patterns(
-        self,
-        conn: asyncpg.Connection,
-        primary_docs: List[Dict],
-        related_docs: List[Dict]
-    ) -> List[str]:
-        """Find temporal relationships between documents"""
-        
-        insights = []
-        all_docs = primary_docs + related_docs
-        
-        # Sort by creation date if available
-        dated_docs = [d for d in all_docs if d.get('created_at')]
-        dated_docs.sort(key=lambda x: x['created_at'])
-        
-        if len(dated_docs) >= 2:
-            # Check for evolution of topics
-            for i in range(len(dated_docs) - 1):
-                doc1 = dated_docs[i]
-                doc2 = dated_docs[i + 1]
-                
-                # Check if topics evolved
-                topics1 = await self._extract_document_concepts(conn, doc1['id'])
-                topics2 = await self._extract_document_concepts(conn, doc2['id'])
-                
-                common = set(topics1) & set(topics2)
-                if common:
-                    insights.append(
-                        f"Topic evolution: '{', '.join(list(common)[:2])}' discussed in both {doc1['title']} and later in {doc2['title']}"
-                    )
-        
-        return insights
+    def _rank_related_documents(self, primary_docs: List[Dict], edges: List) -> List[Dict]:
+        """Documents linked to the primary ones, strongest total evidence first"""
+        primary_ids = {str(doc['id']) for doc in primary_docs}
+        related = {}
+        
+        for edge in edges:
+            target_id = str(edge['target_id'])
+            if target_id in primary_ids:
+                continue
+            doc = related.setdefault(target_id, {
+                'id': edge['target_id'],
+                'title': edge['target_title'],
+                'summary': edge['target_summary'],
+                'source_type': edge['target_source_type'],
+                'created_at': edge['target_created_at'],
+                'relevance_count': 0,
+                'relationship_types': set(),
+                '_score': 0.0
+            })
+            doc['relevance_count'] += 1
+            doc['relationship_types'].add(edge['relationship_type'])
+            doc['_score'] += edge['confidence']
+        
+        ranked = sorted(related.values(), key=lambda d: d['_score'], reverse=True)[:5]
+        for doc in ranked:
+            del doc['_score']
+            doc['relationship_types'] = sorted(doc['relationship_types'])
+        return ranked
     
-    async def _find_technology_synergies(
-        self,
-        conn: asyncpg.Connection,
-        primary_docs: List[Dict],
-        related_docs: List[Dict]
-    ) -> List[str]:
-        """Find technology synergies across documents"""
-        
-        insights = []
-        
-        # Technology keywords
-        tech_keywords = [
-            'api', 'integration', 'automation', 'tool', 'server', 'system',
-            'platform', 'framework', 'service', 'protocol', 'workflow'
-        ]
-        
-        # Extract technologies from all documents
-        doc_technologies = {}
-        
-        for doc in primary_docs + related_docs:
-            techs = await conn.fetch("""
-                SELECT DISTINCT 
-                    regexp_matches(LOWER(content), '\\b(' || $2 || ')\\w*\\b', 'g') as tech
-                FROM chunks
-                WHERE document_id = $1
-            """, doc['id'], '|'.join(tech_keywords))
+    def _edges_to_insights(self,
+                           query: str,
+                           primary_docs: List[Dict],
+                           related_docs: List[Dict],
+                           edges: List) -> List[str]:
+        """Turn stored edges between the documents in context into insight sentences"""
+        in_context = {str(doc['id']) for doc in primary_docs + related_docs}
+        is_solution_query = any(kw in query.lower() for kw in SOLUTION_QUERY_KEYWORDS)
+        
+        person_docs: Dict[str, List[str]] = {}
+        solutions, temporal, technology = [], [], []
+        seen_pairs = set()
+        
+        for edge in edges:
+            if str(edge['target_id']) not in in_context:
+                continue
+            kind = edge['relationship_type']
+            pair = (kind, frozenset((str(edge['source_id']), str(edge['target_id']))))
             
-            doc_technologies[doc['id']] = {
-                'title': doc['title'],
-                'techs': [t['tech'][0] for t in techs if t['tech']]
-            }
-        
-        # Find complementary technologies
-        for doc1_id, doc1_info in doc_technologies.items():
-            for doc2_id, doc2_info in doc_technologies.items():
-                if doc1_id >= doc2_id:  # Avoid duplicates
-                    continue
-                
-                # Check for integration potential
-                doc1_techs = set(doc1_info['techs'])
-                doc2_techs = set(doc2_info['techs'])
-                
-                if ('api' in doc1_techs and 'integration' in doc2_techs) or \
-                   ('server' in doc1_techs and 'automation' in doc2_techs):
-                    insights.append(
-                        f"Integration opportunity: {doc1_info['title']} and {doc2_info['title']} could work together"
-                    )
+            if kind == 'people':
+                for person in edge['evidence']:
+                    titles = person_docs.setdefault(person, [])
+                    for title in (edge['source_title'], edge['target_title']):
+                        if title not in titles:
+                            titles.append(title)
+            elif kind == 'solution_match' and is_solution_query:
+                solutions.append(
+                    f"Potential connection: {edge['target_title']} might address needs from {edge['source_title']}"
+                )
+            elif kind == 'temporal' and pair not in seen_pairs:
+                seen_pairs.add(pair)
+                first, second = edge['source_title'], edge['target_title']
+                if (edge['source_created_at'] and edge['target_created_at']
+                        and edge['target_created_at'] < edge['source_created_at']):
+                    first, second = second, first
+                temporal.append(
+                    f"Topic evolution: '{', '.join(edge['evidence'][:2])}' discussed in both {first} and later in {second}"
+                )
+            elif kind == 'technology' and pair not in seen_pairs:
+                seen_pairs.add(pair)
+                technology.append(
+                    f"Integration opportunity: {edge['source_title']} and {edge['target_title']} could work together"
+                )
         
-        return insights
+        people = [
+            f"{person} appears in multiple contexts: {', '.join(titles[:3])}"
+            for person, titles in person_docs.items() if len(titles) > 1
+        ]
+        return people + solutions + temporal + technology
     
     async def _extract_document_concepts(
         self,
@@ -639,4 +629,8 @@ class CrossContextReasoner:
         if related_docs:
             base_score += min(len(related_docs) * 0.05, 0.2)
         
-        return min(base_score, 1.0)
\ No newline at end of file
+        return min(base_score, 1.0)
+
+
+# Global instance
+cross_context_reasoner = CrossContextReasoner()
@@ -0,0 +1,160 @@
+"""
+Shared database connection pool for MyBrain
+One asyncpg pool per process, created in the FastAPI lifespan and used by all routers and engines
+"""
+
+import os
+import time
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Dict, Optional, AsyncIterator
+import asyncpg
+from dotenv import load_dotenv
+from core.vector_codec import register_vector_codec
+from core.telemetry import current_trace, count_db_round_trip
+
+# Load environment variables
+load_dotenv()
+
+
+def _env_flag(name: str, default: Optional[bool] = None) -> Optional[bool]:
+    """Read a boolean flag from the environment"""
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+class DatabasePool:
+    """Process-wide asyncpg pool with acquire metrics"""
+
+    def __init__(self,
+                 database_url: Optional[str] = None,
+                 min_size: Optional[int] = None,
+                 max_size: Optional[int] = None,
+                 acquire_timeout: Optional[float] = None,
+                 pgbouncer: Optional[bool] = None):
+        """
+        Configure the pool (nothing is opened until connect() or the first acquire())
+
+        Args:
+            database_url: Postgres DSN, defaults to DATABASE_URL
+            min_size: Connections kept open, defaults to DB_POOL_MIN_SIZE (2)
+            max_size: Upper bound of connections, defaults to DB_POOL_MAX_SIZE (10)
+            acquire_timeout: Seconds to wait for a free connection, defaults to DB_POOL_ACQUIRE_TIMEOUT (10)
+            pgbouncer: Disable the named statement cache for pgbouncer transaction pooling.
+                Defaults to DB_PGBOUNCER, or auto-detects the Supabase pooler port 6543.
+        """
+        self.database_url = database_url or os.getenv("DATABASE_URL")
+        self.min_size = min_size if min_size is not None else int(os.getenv("DB_POOL_MIN_SIZE", "2"))
+        self.max_size = max_size if max_size is not None else int(os.getenv("DB_POOL_MAX_SIZE", "10"))
+        self.acquire_timeout = (
+            acquire_timeout if acquire_timeout is not None
+            else float(os.getenv("DB_POOL_ACQUIRE_TIMEOUT", "10"))
+        )
+
+        if pgbouncer is None:
+            pgbouncer = _env_flag("DB_PGBOUNCER")
+        if pgbouncer is None:
+            pgbouncer = bool(self.database_url and ':6543' in self.database_url)
+        self.pgbouncer = pgbouncer
+
+        self._pool: Optional[asyncpg.Pool] = None
+        self._lock = asyncio.Lock()
+        self.metrics = {
+            'acquisitions': 0,
+            'acquire_timeouts': 0,
+            'acquire_wait_ms_total': 0.0,
+            'acquire_wait_ms_max': 0.0
+        }
+
+    async def connect(self) -> asyncpg.Pool:
+        """Create the pool if it does not exist yet"""
+        if self._pool is not None:
+            return self._pool
+
+        async with self._lock:
+            if self._pool is None:
+                # pgbouncer in transaction mode cannot keep named prepared statements
+                # across transactions, so only unnamed statements are used there
+                statement_cache_size = 0 if self.pgbouncer else 100
+
+                self._pool = await asyncpg.create_pool(
+                    self.database_url,
+                    min_size=self.min_size,
+                    max_size=self.max_size,
+                    statement_cache_size=statement_cache_size,
+                    max_inactive_connection_lifetime=300,
+                    init=self._init_connection
+                )
+                print(f"Database pool ready (min={self.min_size}, max={self.max_size}, pgbouncer={self.pgbouncer})")
+
+        return self._pool
+
+    async def _init_connection(self, conn: asyncpg.Connection):
+        """Per-connection setup run once when the pool opens a connection"""
+        # Vectors travel as binary float32 instead of '[x,y,z]' text
+        await register_vector_codec(conn)
+
+    async def close(self):
+        """Close all pooled connections"""
+        if self._pool is not None:
+            await self._pool.close()
+            self._pool = None
+
+    @asynccontextmanager
+    async def acquire(self) -> AsyncIterator[asyncpg.Connection]:
+        """Borrow a connection from the pool and give it back afterwards"""
+        pool = await self.connect()
+
+        start = time.perf_counter()
+        try:
+            conn = await pool.acquire(timeout=self.acquire_timeout)
+        except asyncio.TimeoutError:
+            self.metrics['acquire_timeouts'] += 1
+            raise
+
+        wait_ms = (time.perf_counter() - start) * 1000
+        self.metrics['acquisitions'] += 1
+        self.metrics['acquire_wait_ms_total'] += wait_ms
+        self.metrics['acquire_wait_ms_max'] = max(self.metrics['acquire_wait_ms_max'], wait_ms)
+
+        # Attribute every statement on this connection to the current request
+        trace = current_trace()
+        query_logger = None
+        if trace is not None and hasattr(conn, 'add_query_logger'):
+            query_logger = lambda record: count_db_round_trip(trace)
+            conn.add_query_logger(query_logger)
+
+        try:
+            yield conn
+        finally:
+            if query_logger is not None:
+                conn.remove_query_logger(query_logger)
+            await pool.release(conn)
+
+    def stats(self) -> Dict:
+        """Current pool size and acquire metrics"""
+        acquisitions = self.metrics['acquisitions']
+        stats = {
+            'connected': self._pool is not None,
+            'min_size': self.min_size,
+            'max_size': self.max_size,
+            'pgbouncer': self.pgbouncer,
+            'acquisitions': acquisitions,
+            'acquire_timeouts': self.metrics['acquire_timeouts'],
+            'acquire_wait_ms_avg': (
+                self.metrics['acquire_wait_ms_total'] / acquisitions if acquisitions else 0.0
+            ),
+            'acquire_wait_ms_max': self.metrics['acquire_wait_ms_max']
+        }
+
+        if self._pool is not None:
+            stats['size'] = self._pool.get_size()
+            stats['idle'] = self._pool.get_idle_size()
+
+        return stats
+
+
+# Global instance
+db_pool = DatabasePool()
@@ -0,0 +1,406 @@
+"""
+Dense embedding backends for MyBrain
+OpenAI or a local sentence-transformers model behind one interface, with vectors
+sized for the vector(1536) columns either way
+"""
+
+import os
+import random
+import asyncio
+import threading
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import Awaitable, Callable, List, Optional, Tuple
+import numpy as np
+import openai
+from openai import AsyncOpenAI
+from dotenv import load_dotenv
+from core.telemetry import record_tokens
+
+# Load environment variables
+load_dotenv()
+
+# Width of chunks.embedding / documents.summary_embedding
+STORAGE_DIMENSIONS = 1536
+
+DEFAULT_LOCAL_MODEL = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
+
+# OpenAI embedding limits: tokens per input, inputs and tokens per request
+OPENAI_MAX_INPUT_TOKENS = 8191
+OPENAI_MAX_REQUEST_INPUTS = 2048
+OPENAI_MAX_REQUEST_TOKENS = 300000
+
+
+def fit_to_dimensions(vectors: np.ndarray, dimensions: int = STORAGE_DIMENSIONS) -> np.ndarray:
+    """
+    L2-normalise and zero-pad vectors to the storage width
+
+    Padding with zeros leaves dot products and cosine distances between padded
+    vectors unchanged, so the existing indexes and distance operator keep working.
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if vectors.ndim == 1:
+        vectors = vectors[None, :]
+    if vectors.shape[1] > dimensions:
+        raise ValueError(
+            f"Embedding width {vectors.shape[1]} exceeds the storage width {dimensions}"
+        )
+
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    vectors = vectors / np.where(norms == 0, 1.0, norms)
+
+    if vectors.shape[1] < dimensions:
+        padding = np.zeros((vectors.shape[0], dimensions - vectors.shape[1]), dtype=np.float32)
+        vectors = np.hstack([vectors, padding])
+    return vectors
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent embed calls into batches
+
+    The first waiting call opens a window of max_wait seconds; everything queued
+    within it (up to max_batch_size texts) is handed to process() as one list.
+    While max_concurrent_batches are running, new calls keep accumulating, so
+    batches grow with load instead of queueing up as single requests.
+    """
+
+    def __init__(self,
+                 process: Callable[[List[str]], Awaitable[List[List[float]]]],
+                 max_batch_size: int,
+                 max_wait: float,
+                 max_concurrent_batches: int = 1):
+        self.process = process
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.max_concurrent_batches = max_concurrent_batches
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._running = set()
+
+    async def submit(self, texts: List[str]) -> List[List[float]]:
+        loop = asyncio.get_running_loop()
+        if self._worker is None or self._worker.done() or self._worker.get_loop() is not loop:
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._run(self._queue))
+
+        future = loop.create_future()
+        await self._queue.put((texts, future))
+        return await future
+
+    async def _run(self, queue: asyncio.Queue):
+        loop = asyncio.get_running_loop()
+        slots = asyncio.Semaphore(self.max_concurrent_batches)
+
+        while True:
+            batch: List[Tuple[List[str], asyncio.Future]] = [await queue.get()]
+            size = len(batch[0][0])
+
+            # Collect whatever else arrives within the wait window
+            deadline = loop.time() + self.max_wait
+            while size < self.max_batch_size:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(queue.get(), timeout=remaining)
+                except asyncio.TimeoutError:
+                    break
+                batch.append(item)
+                size += len(item[0])
+
+            await slots.acquire()
+            task = loop.create_task(self._dispatch(batch, slots))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _dispatch(self, batch: List[Tuple[List[str], asyncio.Future]], slots: asyncio.Semaphore):
+        flat = [text for texts, _ in batch for text in texts]
+        try:
+            vectors = await self.process(flat)
+        except Exception as e:
+            print(f"Embedding batch of {len(flat)} failed: {e}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        finally:
+            slots.release()
+
+        offset = 0
+        for texts, future in batch:
+            if not future.done():
+                future.set_result(vectors[offset:offset + len(texts)])
+            offset += len(texts)
+
+
+class EmbeddingBackend(ABC):
+    """
+    Produces dense embeddings of STORAGE_DIMENSIONS floats
+
+    name identifies the model in cache keys; vectors from different backends
+    are not comparable, so switching backends means re-ingesting.
+    """
+
+    name: str
+    dimensions: int = STORAGE_DIMENSIONS
+
+    @abstractmethod
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        """Embed texts in order"""
+
+    async def embed_one(self, text: str) -> List[float]:
+        return (await self.embed([text]))[0]
+
+
+class OpenAIEmbeddingBackend(EmbeddingBackend):
+    """
+    OpenAI embeddings API behind a dispatcher
+
+    Single-query calls are coalesced into micro-batches, large batches are split
+    into requests that stay within the per-request token budget, at most
+    max_in_flight requests run at once and 429/5xx responses are retried with
+    jittered exponential backoff.
+    """
+
+    def __init__(self,
+                 model: str = "text-embedding-3-small",
+                 client: Optional[AsyncOpenAI] = None,
+                 max_in_flight: Optional[int] = None,
+                 max_request_tokens: Optional[int] = None,
+                 max_request_inputs: Optional[int] = None,
+                 max_wait_ms: Optional[float] = None,
+                 max_retries: Optional[int] = None):
+        self.model = model
+        self.name = model
+        # Retries are handled here, with backoff shared across the whole dispatcher
+        self.client = client or AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"), max_retries=0)
+        self.max_in_flight = max_in_flight or int(os.getenv("EMBEDDING_MAX_IN_FLIGHT", "4"))
+        self.max_request_tokens = min(
+            max_request_tokens or int(os.getenv("EMBEDDING_MAX_REQUEST_TOKENS", "100000")),
+            OPENAI_MAX_REQUEST_TOKENS
+        )
+        self.max_request_inputs = min(
+            max_request_inputs or int(os.getenv("EMBEDDING_MAX_REQUEST_INPUTS", "512")),
+            OPENAI_MAX_REQUEST_INPUTS
+        )
+        self.max_retries = max_retries if max_retries is not None else int(os.getenv("EMBEDDING_MAX_RETRIES", "5"))
+        self.backoff_base = 0.5
+        self.backoff_cap = 20.0
+
+        wait = max_wait_ms if max_wait_ms is not None else float(os.getenv("EMBEDDING_BATCH_MAX_WAIT_MS", "5"))
+        self.batcher = MicroBatcher(
+            self._send,
+            max_batch_size=self.max_request_inputs,
+            max_wait=wait / 1000,
+            max_concurrent_batches=self.max_in_flight
+        )
+
+        self._encoder = None
+        self._in_flight: Optional[asyncio.Semaphore] = None
+        self._in_flight_loop = None
+
+    def count_tokens(self, text: str) -> int:
+        """Tokens with the cl100k_base encoder used by the embedding models"""
+        if self._encoder is None:
+            try:
+                import tiktoken
+                self._encoder = tiktoken.get_encoding("cl100k_base")
+            except Exception as e:
+                print(f"tiktoken unavailable, estimating embedding tokens: {e}")
+                self._encoder = False
+        if self._encoder is False:
+            # Conservative estimate, errs towards smaller requests
+            return len(text) // 3 + 1
+        return len(self._encoder.encode(text, disallowed_special=()))
+
+    def _truncate(self, text: str, tokens: int) -> str:
+        if tokens <= OPENAI_MAX_INPUT_TOKENS:
+            return text
+        print(f"Embedding input of {tokens} tokens truncated to {OPENAI_MAX_INPUT_TOKENS}")
+        if self._encoder:
+            return self._encoder.decode(
+                self._encoder.encode(text, disallowed_special=())[:OPENAI_MAX_INPUT_TOKENS]
+            )
+        return text[:OPENAI_MAX_INPUT_TOKENS * 3]
+
+    def _plan_requests(self, texts: List[str]) -> List[List[str]]:
+        """Split texts into consecutive requests within the input and token budgets"""
+        requests, current, current_tokens = [], [], 0
+
+        for text in texts:
+            tokens = self.count_tokens(text)
+            text = self._truncate(text, tokens)
+            tokens = min(tokens, OPENAI_MAX_INPUT_TOKENS)
+
+            if current and (len(current) >= self.max_request_inputs
+                            or current_tokens + tokens > self.max_request_tokens):
+                requests.append(current)
+                current, current_tokens = [], 0
+            current.append(text)
+            current_tokens += tokens
+
+        if current:
+            requests.append(current)
+        return requests
+
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        if len(texts) == 1:
+            return await self.batcher.submit(texts)
+        return await self._send(texts)
+
+    async def _send(self, texts: List[str]) -> List[List[float]]:
+        requests = self._plan_requests(texts)
+        if len(requests) == 1:
+            return await self._request(requests[0])
+
+        results = await asyncio.gather(*[self._request(batch) for batch in requests])
+        return [vector for result in results for vector in result]
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if self._in_flight is None or self._in_flight_loop is not loop:
+            self._in_flight = asyncio.Semaphore(self.max_in_flight)
+            self._in_flight_loop = loop
+        return self._in_flight
+
+    async def _request(self, texts: List[str]) -> List[List[float]]:
+        """One API request, retried on rate limits and server errors"""
+        attempt = 0
+        while True:
+            async with self._semaphore():
+                try:
+                    response = await self.client.embeddings.create(
+                        model=self.model,
+                        input=texts,
+                        encoding_format="float"
+                    )
+                    break
+                except Exception as e:
+                    error = e
+                    delay = self._retry_delay(e, attempt)
+                    if delay is None:
+                        raise
+            # Back off without holding an in-flight slot
+            attempt += 1
+            print(f"Embedding request of {len(texts)} inputs failed ({error}), retry {attempt} in {delay:.2f}s")
+            await asyncio.sleep(delay)
+
+        record_tokens(self.model, prompt=response.usage.prompt_tokens if response.usage else None)
+        return [item.embedding for item in response.data]
+
+    def _retry_delay(self, error: Exception, attempt: int) -> Optional[float]:
+        """Seconds to wait before retrying, None when the error is final"""
+        if attempt >= self.max_retries:
+            return None
+
+        if isinstance(error, openai.APIStatusError):
+            if error.status_code != 429 and error.status_code < 500:
+                return None
+            retry_after = error.response.headers.get("retry-after") if error.response is not None else None
+            if retry_after:
+                try:
+                    return min(float(retry_after), self.backoff_cap) + random.uniform(0, self.backoff_base)
+                except ValueError:
+                    pass
+        elif not isinstance(error, (openai.APIConnectionError, openai.APITimeoutError)):
+            return None
+
+        # Full jitter keeps concurrent retries from hitting the API in lockstep
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+
+
+class LocalEmbeddingBackend(EmbeddingBackend):
+    """
+    sentence-transformers model run in-process
+
+    Concurrent calls are collected for up to max_wait_ms (or until max_batch_size
+    texts are waiting) and embedded in one forward pass on a dedicated thread,
+    so the event loop never blocks on the model. With use_onnx the model runs
+    through ONNX Runtime where the installed sentence-transformers supports it.
+    """
+
+    def __init__(self,
+                 model_name: Optional[str] = None,
+                 max_batch_size: Optional[int] = None,
+                 max_wait_ms: Optional[float] = None,
+                 use_onnx: Optional[bool] = None,
+                 device: Optional[str] = None):
+        self.model_name = model_name or os.getenv("LOCAL_EMBEDDING_MODEL", DEFAULT_LOCAL_MODEL)
+        self.name = f"local:{self.model_name}"
+        self.max_batch_size = max_batch_size or int(os.getenv("LOCAL_EMBEDDING_BATCH_SIZE", "64"))
+        max_wait = (max_wait_ms if max_wait_ms is not None
+                    else float(os.getenv("LOCAL_EMBEDDING_MAX_WAIT_MS", "5"))) / 1000
+        if use_onnx is None:
+            use_onnx = os.getenv("LOCAL_EMBEDDING_ONNX", "false").lower() in ('1', 'true', 'yes', 'on')
+        self.use_onnx = use_onnx
+        self.device = device or os.getenv("LOCAL_EMBEDDING_DEVICE") or None
+
+        self._model = None
+        self._model_lock = threading.Lock()
+        # One worker: forward passes are serialised, batching provides the throughput
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="local-embeddings")
+        self.batcher = MicroBatcher(self._run_forward_pass, self.max_batch_size, max_wait)
+
+    def _load_model(self):
+        with self._model_lock:
+            if self._model is not None:
+                return self._model
+
+            try:
+                from sentence_transformers import SentenceTransformer
+            except ImportError as e:
+                raise RuntimeError(
+                    "EMBEDDING_BACKEND=local requires sentence-transformers"
+                ) from e
+
+            print(f"Loading local embedding model {self.model_name}...")
+            model = None
+            if self.use_onnx:
+                try:
+                    model = SentenceTransformer(self.model_name, device=self.device, backend="onnx")
+                except TypeError:
+                    print("Installed sentence-transformers has no ONNX backend, using PyTorch")
+            if model is None:
+                model = SentenceTransformer(self.model_name, device=self.device)
+
+            width = model.get_sentence_embedding_dimension()
+            if width and width > self.dimensions:
+                raise RuntimeError(
+                    f"{self.model_name} produces {width}-d vectors, more than the {self.dimensions}-d columns"
+                )
+            self._model = model
+            print(f"Local embedding model loaded ({width} dimensions, padded to {self.dimensions})")
+            return model
+
+    def _encode(self, texts: List[str]) -> List[List[float]]:
+        """Forward pass; runs on the executor thread"""
+        model = self._load_model()
+        vectors = model.encode(
+            texts,
+            batch_size=self.max_batch_size,
+            convert_to_numpy=True,
+            show_progress_bar=False
+        )
+        return fit_to_dimensions(vectors, self.dimensions).tolist()
+
+    async def _run_forward_pass(self, texts: List[str]) -> List[List[float]]:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._encode, texts)
+
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        return await self.batcher.submit(texts)
+
+
+def get_embedding_backend() -> EmbeddingBackend:
+    """Backend selected by EMBEDDING_BACKEND ('openai' or 'local')"""
+    kind = os.getenv("EMBEDDING_BACKEND", "openai").lower()
+    if kind == "local":
+        return LocalEmbeddingBackend()
+    if kind != "openai":
+        print(f"Unknown EMBEDDING_BACKEND '{kind}', using openai")
+    return OpenAIEmbeddingBackend()
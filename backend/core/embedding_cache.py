@@ -0,0 +1,176 @@
+"""
+Query embedding cache for MyBrain
+In-process LRU with TTL, optional Redis tier, and coalescing of identical in-flight requests
+"""
+
+import os
+import time
+import asyncio
+import hashlib
+import unicodedata
+from collections import OrderedDict
+from typing import List, Dict, Optional, Callable, Awaitable, Tuple
+import numpy as np
+from dotenv import load_dotenv
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:
+    aioredis = None
+
+# Load environment variables
+load_dotenv()
+
+
+def normalize_query(text: str) -> str:
+    """Normalise query text so trivially different spellings share a cache entry"""
+    text = unicodedata.normalize('NFC', text)
+    return ' '.join(text.split())
+
+
+class QueryEmbeddingCache:
+    """Two-tier cache for query embeddings keyed by model and normalised text"""
+
+    def __init__(self,
+                 max_entries: Optional[int] = None,
+                 ttl_seconds: Optional[float] = None,
+                 redis_url: Optional[str] = None):
+        self.max_entries = max_entries or int(os.getenv("EMBEDDING_CACHE_SIZE", "1024"))
+        self.ttl_seconds = ttl_seconds or float(os.getenv("EMBEDDING_CACHE_TTL", "86400"))
+
+        if redis_url is None:
+            redis_url = os.getenv("REDIS_URL") or os.getenv("UPSTASH_REDIS_URL")
+        # Only redis:// and rediss:// URLs work with redis-py (not the Upstash REST URL)
+        if redis_url and not redis_url.startswith(('redis://', 'rediss://')):
+            redis_url = None
+        self.redis_url = redis_url
+        self._redis = None
+
+        self._entries: "OrderedDict[str, Tuple[float, List[float]]]" = OrderedDict()
+        self._in_flight: Dict[str, asyncio.Task] = {}
+        self.stats = {
+            'hits': 0,
+            'redis_hits': 0,
+            'misses': 0,
+            'coalesced': 0,
+            'evictions': 0
+        }
+
+    def _key(self, model: str, text: str) -> str:
+        digest = hashlib.sha256(f"{model}\x00{normalize_query(text)}".encode('utf-8')).hexdigest()
+        return f"mybrain:qemb:{digest}"
+
+    def _get_redis(self):
+        """Create the Redis client on first use"""
+        if self._redis is None and self.redis_url and aioredis is not None:
+            self._redis = aioredis.from_url(self.redis_url)
+        return self._redis
+
+    def _get_local(self, key: str) -> Optional[List[float]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        expires_at, embedding = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+
+        self._entries.move_to_end(key)
+        return embedding
+
+    def _set_local(self, key: str, embedding: List[float]):
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, embedding)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats['evictions'] += 1
+
+    async def _get_remote(self, key: str) -> Optional[List[float]]:
+        client = self._get_redis()
+        if client is None:
+            return None
+        try:
+            data = await client.get(key)
+        except Exception as e:
+            print(f"Embedding cache Redis read failed: {e}")
+            return None
+        if data is None:
+            return None
+        return np.frombuffer(data, dtype='<f4').tolist()
+
+    async def _set_remote(self, key: str, embedding: List[float]):
+        client = self._get_redis()
+        if client is None:
+            return
+        try:
+            data = np.asarray(embedding, dtype='<f4').tobytes()
+            await client.set(key, data, ex=int(self.ttl_seconds))
+        except Exception as e:
+            print(f"Embedding cache Redis write failed: {e}")
+
+    async def get_or_compute(self,
+                             model: str,
+                             text: str,
+                             compute: Callable[[], Awaitable[List[float]]]) -> List[float]:
+        """
+        Return the cached embedding or compute it once
+
+        Concurrent calls for the same model and text share a single compute() call.
+        It runs in a task owned by the cache, so a caller that is cancelled (e.g.
+        a pipeline stage timing out) stops waiting without cancelling the
+        computation the other callers are waiting on.
+        """
+        key = self._key(model, text)
+
+        embedding = self._get_local(key)
+        if embedding is not None:
+            self.stats['hits'] += 1
+            return embedding
+
+        in_flight = self._in_flight.get(key)
+        if in_flight is not None:
+            self.stats['coalesced'] += 1
+        else:
+            in_flight = asyncio.create_task(self._compute(key, compute))
+            # Nobody may be waiting any more when it fails
+            in_flight.add_done_callback(lambda task: task.cancelled() or task.exception())
+            self._in_flight[key] = in_flight
+
+        return await asyncio.shield(in_flight)
+
+    async def _compute(self, key: str, compute: Callable[[], Awaitable[List[float]]]) -> List[float]:
+        try:
+            embedding = await self._get_remote(key)
+            if embedding is not None:
+                self.stats['redis_hits'] += 1
+            else:
+                self.stats['misses'] += 1
+                embedding = list(await compute())
+                await self._set_remote(key, embedding)
+
+            self._set_local(key, embedding)
+            return embedding
+        finally:
+            self._in_flight.pop(key, None)
+
+    def get_stats(self) -> Dict:
+        """Hit/miss counters and current size"""
+        lookups = self.stats['hits'] + self.stats['redis_hits'] + self.stats['misses']
+        return {
+            **self.stats,
+            'size': len(self._entries),
+            'max_entries': self.max_entries,
+            'hit_rate': (
+                (self.stats['hits'] + self.stats['redis_hits']) / lookups if lookups else 0.0
+            ),
+            'redis_enabled': bool(self.redis_url and aioredis is not None)
+        }
+
+    def clear(self):
+        """Drop all in-process entries"""
+        self._entries.clear()
+
+
+# Global instance shared by all embedding services
+query_embedding_cache = QueryEmbeddingCache()
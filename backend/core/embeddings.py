@@ -1,85 +1,152 @@
 """
 Embedding service for MyBrain
-Handles OpenAI text-embedding-3-small and ColBERT token embeddings
+Handles dense embeddings (OpenAI or local backend) and ColBERT token embeddings
 """
 
 import os
+import importlib.util
 import numpy as np
 from typing import List, Dict, Tuple, Optional
-from openai import AsyncOpenAI
-import torch
-from transformers import AutoTokenizer, AutoModel
 import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from functools import lru_cache
 import tiktoken
 from dotenv import load_dotenv
+from core.embedding_cache import query_embedding_cache
+from core.chunk_embedding_cache import chunk_embedding_cache
+from core.embedding_backends import EmbeddingBackend, get_embedding_backend
+from core.telemetry import traced
+
+# torch and transformers are imported when ColBERT loads, not with this module.
+# Checking for them here keeps the minimal-service fallback of the importers working.
+if importlib.util.find_spec("torch") is None or importlib.util.find_spec("transformers") is None:
+    raise ImportError("ColBERT needs torch and transformers; use core.embeddings_minimal")
 
 # Load environment variables
 load_dotenv()
 
-# Initialize clients
-openai_client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-
 
 class EmbeddingService:
     """Multi-modal embedding service"""
     
-    def __init__(self):
-        self.openai_client = openai_client
+    def __init__(self, backend: Optional[EmbeddingBackend] = None):
+        self.backend = backend or get_embedding_backend()
+        # Cache keys are per backend model, so switching backends never mixes vectors
+        self.dense_model = self.backend.name
+        self.query_cache = query_embedding_cache
+        self.chunk_cache = chunk_embedding_cache
         self.colbert_model = None
         self.colbert_tokenizer = None
+        self.colbert_ready = False
+        self.colbert_error: Optional[str] = None
+        self._torch = None
+        self._colbert_load: Optional[asyncio.Future] = None
+        # Model load and forward passes run here, never on the event loop
+        self._colbert_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="colbert")
         self.tiktoken_encoder = tiktoken.get_encoding("cl100k_base")
         
-    async def initialize_colbert(self):
-        """Lazy load ColBERT model"""
-        if self.colbert_model is None:
+    def start_colbert_warmup(self) -> asyncio.Future:
+        """
+        Begin loading ColBERT on its executor without waiting for it
+
+        Safe to call repeatedly; every call returns the same load future.
+        Must be called from the event loop.
+        """
+        if self._colbert_load is None:
+            loop = asyncio.get_running_loop()
+            self._colbert_load = loop.run_in_executor(self._colbert_executor, self._load_colbert)
+        return self._colbert_load
+    
+    async def initialize_colbert(self) -> bool:
+        """Wait for the ColBERT model; returns whether it is usable"""
+        await asyncio.shield(self.start_colbert_warmup())
+        return self.colbert_ready
+    
+    def _load_colbert(self):
+        """Load tokenizer and model; runs on the ColBERT executor"""
+        try:
             print("Loading ColBERT model...")
+            # Deferred: importing torch/transformers costs seconds of startup
+            import torch
+            from transformers import AutoTokenizer, AutoModel
+            self._torch = torch
             self.colbert_tokenizer = AutoTokenizer.from_pretrained(
                 "colbert-ir/colbertv2.0",
                 token=os.getenv("HUGGINGFACE_TOKEN")
             )
-            self.colbert_model = AutoModel.from_pretrained(
+            model = AutoModel.from_pretrained(
                 "colbert-ir/colbertv2.0",
                 token=os.getenv("HUGGINGFACE_TOKEN")
             )
-            self.colbert_model.eval()
+            model.eval()
+            self.colbert_model = model
+            self.colbert_ready = True
             print("ColBERT model loaded successfully")
+        except Exception as e:
+            # Reranking stays disabled; first-stage ranking is used instead
+            self.colbert_error = str(e)
+            print(f"ColBERT model could not be loaded: {e}")
+    
+    @traced('embedding.query')
+    async def get_dense_embedding(self, text: str, use_cache: bool = True) -> List[float]:
+        """Get a dense embedding from the configured backend (cached per query text)"""
+        if not use_cache:
+            return await self._fetch_dense_embedding(text)
+        return await self.query_cache.get_or_compute(
+            self.dense_model, text, lambda: self._fetch_dense_embedding(text)
+        )
     
-    async def get_dense_embedding(self, text: str) -> List[float]:
-        """Get dense embedding using OpenAI text-embedding-3-small"""
+    async def _fetch_dense_embedding(self, text: str) -> List[float]:
+        """Embed a single text with the backend"""
         try:
-            response = await self.openai_client.embeddings.create(
-                model="text-embedding-3-small",
-                input=text,
-                encoding_format="float"
-            )
-            return response.data[0].embedding
+            return await self.backend.embed_one(text)
         except Exception as e:
             print(f"Error getting dense embedding: {e}")
             raise
     
     async def get_dense_embeddings_batch(self, texts: List[str]) -> List[List[float]]:
-        """Get dense embeddings for multiple texts efficiently"""
+        """Get dense embeddings for multiple texts, only sending uncached texts to the backend"""
+        return await self.chunk_cache.embed(
+            self.dense_model, texts, self._fetch_dense_embeddings_batch
+        )
+    
+    @traced('embedding.batch')
+    async def _fetch_dense_embeddings_batch(self, texts: List[str]) -> List[List[float]]:
+        """Embed a batch of texts with the backend"""
         try:
-            # OpenAI supports batch embedding
-            response = await self.openai_client.embeddings.create(
-                model="text-embedding-3-small",
-                input=texts,
-                encoding_format="float"
-            )
-            return [item.embedding for item in response.data]
+            return await self.backend.embed(texts)
         except Exception as e:
             print(f"Error getting batch embeddings: {e}")
             raise
     
+    async def encode(self, texts: List[str], batch_size: int = 100) -> np.ndarray:
+        """Same interface as MinimalEmbeddingService.encode"""
+        if not texts:
+            return np.array([])
+        return np.array(await self.get_dense_embeddings_batch(texts))
+    
+    async def encode_query(self, query: str) -> np.ndarray:
+        """Same interface as MinimalEmbeddingService.encode_query"""
+        return np.array(await self.get_dense_embedding(query))
+    
     def get_colbert_embeddings(self, text: str) -> Tuple[List[List[float]], List[str]]:
-        """Get token-level ColBERT embeddings"""
-        if self.colbert_model is None:
+        """Get token-level ColBERT embeddings (blocking; prefer get_colbert_embeddings_batch)"""
+        return self._encode_colbert_batch([text])[0]
+    
+    async def get_colbert_embeddings_batch(self, texts: List[str]) -> List[Tuple[List[List[float]], List[str]]]:
+        """Token-level ColBERT embeddings for several texts in one forward pass on the ColBERT executor"""
+        if not texts:
+            return []
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._colbert_executor, self._encode_colbert_batch, texts)
+    
+    def _encode_colbert_batch(self, texts: List[str]) -> List[Tuple[List[List[float]], List[str]]]:
+        if not self.colbert_ready:
             raise RuntimeError("ColBERT model not initialized. Call initialize_colbert() first.")
         
         # Tokenize
         inputs = self.colbert_tokenizer(
-            text,
+            texts,
             return_tensors="pt",
             max_length=512,
             truncation=True,
@@ -87,23 +154,19 @@ class EmbeddingService:
         )
         
         # Get embeddings
-        with torch.no_grad():
+        with self._torch.no_grad():
             outputs = self.colbert_model(**inputs)
             token_embeddings = outputs.last_hidden_state
         
-        # Convert tokens back to text
-        token_ids = inputs['input_ids'][0].tolist()
-        tokens = self.colbert_tokenizer.convert_ids_to_tokens(token_ids)
-        
-        # Remove padding tokens
-        mask = inputs['attention_mask'][0].bool()
-        token_embeddings = token_embeddings[0][mask]
-        tokens = [t for t, m in zip(tokens, mask) if m]
-        
-        # Convert to list format
-        embeddings_list = token_embeddings.tolist()
+        results = []
+        for i in range(len(texts)):
+            # Remove padding tokens
+            mask = inputs['attention_mask'][i].bool()
+            token_ids = inputs['input_ids'][i][mask].tolist()
+            tokens = self.colbert_tokenizer.convert_ids_to_tokens(token_ids)
+            results.append((token_embeddings[i][mask].tolist(), tokens))
         
-        return embeddings_list, tokens
+        return results
     
     def count_tokens(self, text: str) -> int:
         """Count tokens using tiktoken"""
@@ -135,7 +198,7 @@ class EmbeddingService:
         # Get summary embedding if available
         if "summary" in chunks[0]:
             result["summary_embedding"] = await self.get_dense_embedding(
-                chunks[0]["summary"]
+                chunks[0]["summary"], use_cache=False
             )
         
         # Batch process chunk embeddings
@@ -153,12 +216,12 @@ class EmbeddingService:
         
         # Get ColBERT embeddings for detail chunks (optional, for precision queries)
         # We'll only do this for important chunks to save resources
-        if len(chunks) <= 10:  # Only for short documents
-            await self.initialize_colbert()
-            for chunk in chunks[:5]:  # Top 5 chunks only
-                token_embeddings, tokens = self.get_colbert_embeddings(chunk["content"])
+        if len(chunks) <= 10 and await self.initialize_colbert():  # Only for short documents
+            top_chunks = chunks[:5]  # Top 5 chunks only
+            colbert_batch = await self.get_colbert_embeddings_batch([chunk["content"] for chunk in top_chunks])
+            for i, (chunk, (token_embeddings, tokens)) in enumerate(zip(top_chunks, colbert_batch)):
                 result["colbert_embeddings"].append({
-                    "chunk_id": chunk.get("id"),
+                    "chunk_id": chunk.get("id", i),
                     "token_embeddings": token_embeddings,
                     "tokens": tokens
                 })
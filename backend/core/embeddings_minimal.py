@@ -1,46 +1,58 @@
 """
-Minimal embeddings service using only OpenAI
+Minimal embeddings service without ColBERT
 For production deployment without heavy ML dependencies
 """
 
 from typing import List, Dict, Optional
-import os
-from openai import AsyncOpenAI
-import asyncio
 import numpy as np
+from core.embedding_cache import query_embedding_cache
+from core.chunk_embedding_cache import chunk_embedding_cache
+from core.embedding_backends import EmbeddingBackend, get_embedding_backend
+from core.telemetry import traced
 
 class MinimalEmbeddingService:
-    """Lightweight embedding service using OpenAI embeddings"""
-    
-    def __init__(self):
-        self.openai_client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-        self.model = "text-embedding-3-small"
-        
+    """Lightweight embedding service using the configured dense backend"""
+
+    def __init__(self, backend: Optional[EmbeddingBackend] = None):
+        self.backend = backend or get_embedding_backend()
+        self.model = self.backend.name
+        self.dense_model = self.model
+        self.query_cache = query_embedding_cache
+        self.chunk_cache = chunk_embedding_cache
+
     async def encode(self, texts: List[str], batch_size: int = 100) -> np.ndarray:
-        """Encode texts using OpenAI embeddings"""
+        """
+        Encode texts, only sending uncached texts to the backend
+
+        batch_size is kept for existing callers; the backend sizes its own requests.
+        """
         if not texts:
             return np.array([])
-            
-        embeddings = []
-        
-        for i in range(0, len(texts), batch_size):
-            batch = texts[i:i + batch_size]
-            response = await self.openai_client.embeddings.create(
-                input=batch,
-                model=self.model
-            )
-            batch_embeddings = [e.embedding for e in response.data]
-            embeddings.extend(batch_embeddings)
-            
+
+        embeddings = await self.chunk_cache.embed(self.model, texts, self._fetch_embeddings)
         return np.array(embeddings)
-    
+
+    @traced('embedding.batch')
+    async def _fetch_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """Call the backend for all misses at once"""
+        return await self.backend.embed(texts)
+
     async def encode_query(self, query: str) -> np.ndarray:
-        """Encode a single query"""
-        response = await self.openai_client.embeddings.create(
-            input=[query],
-            model=self.model
+        """Encode a single query (cached per query text)"""
+        return np.array(await self.get_dense_embedding(query))
+
+    @traced('embedding.query')
+    async def get_dense_embedding(self, text: str, use_cache: bool = True) -> List[float]:
+        """Same interface as EmbeddingService.get_dense_embedding, used by the retriever and chat"""
+        if not use_cache:
+            return await self.backend.embed_one(text)
+        return await self.query_cache.get_or_compute(
+            self.model, text, lambda: self.backend.embed_one(text)
         )
-        return np.array(response.data[0].embedding)
+
+    async def get_dense_embeddings_batch(self, texts: List[str]) -> List[List[float]]:
+        """Same interface as EmbeddingService.get_dense_embeddings_batch"""
+        return (await self.encode(texts)).tolist()
 
 # Global instance
-embedding_service = MinimalEmbeddingService()
\ No newline at end of file
+embedding_service = MinimalEmbeddingService()
@@ -0,0 +1,274 @@
+"""
+Entity catalogue for MyBrain
+Document titles, speakers, channels and domain aliases held in memory behind a
+trigram index, loaded once and extended incrementally as documents are ingested
+"""
+
+import os
+import re
+import time
+import asyncio
+import unicodedata
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from core.database import DatabasePool, db_pool
+
+
+ENTITY_KINDS = ('title', 'speaker', 'channel')
+
+
+def normalize_entity(text: str) -> str:
+    """Case-, accent-width- and whitespace-insensitive form used for matching"""
+    text = unicodedata.normalize('NFKC', text).lower()
+    return re.sub(r'\s+', ' ', text).strip()
+
+
+def trigrams(text: str) -> Set[str]:
+    """pg_trgm-style trigrams of every word, padded with two leading and one trailing blank"""
+    grams = set()
+    for word in re.findall(r'\w+', text):
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+@dataclass
+class CatalogueEntry:
+    """One known entity"""
+    name: str
+    kind: str  # 'title', 'speaker', 'channel'
+    normalized: str
+    grams: Set[str]
+
+
+class TrigramIndex:
+    """
+    Inverted lists from trigram to entry ids
+
+    A lookup only touches the posting lists of the query's own trigrams, so it
+    scales with the number of entries sharing trigrams with the query rather
+    than with the catalogue size.
+    """
+
+    def __init__(self):
+        self.entries: List[CatalogueEntry] = []
+        self.postings: Dict[str, List[int]] = {}
+        self._keys: Set[Tuple[str, str]] = set()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def add(self, name: str, kind: str) -> bool:
+        """Add an entity; returns False when it is already known"""
+        normalized = normalize_entity(name)
+        if not normalized or (kind, normalized) in self._keys:
+            return False
+
+        entry = CatalogueEntry(name=name, kind=kind, normalized=normalized, grams=trigrams(normalized))
+        entry_id = len(self.entries)
+        self.entries.append(entry)
+        self._keys.add((kind, normalized))
+        for gram in entry.grams:
+            self.postings.setdefault(gram, []).append(entry_id)
+        return True
+
+    def candidates(self,
+                   text: str,
+                   kinds: Iterable[str] = ENTITY_KINDS,
+                   limit: int = 20,
+                   min_overlap: float = 0.3) -> List[CatalogueEntry]:
+        """
+        Entries sharing the most trigrams with text
+
+        min_overlap is the fraction of the query's trigrams an entry must share;
+        it drops entries that only have a common syllable in common.
+        """
+        query_grams = trigrams(normalize_entity(text))
+        if not query_grams:
+            return []
+
+        kinds = set(kinds)
+        shared = Counter()
+        for gram in query_grams:
+            shared.update(self.postings.get(gram, ()))
+
+        needed = max(1, int(len(query_grams) * min_overlap))
+        ranked = []
+        for entry_id, count in shared.items():
+            if count < needed:
+                continue
+            entry = self.entries[entry_id]
+            if entry.kind not in kinds:
+                continue
+            # Dice coefficient over trigram sets
+            ranked.append((2 * count / (len(query_grams) + len(entry.grams)), count, entry_id))
+
+        ranked.sort(reverse=True)
+        return [self.entries[entry_id] for _, _, entry_id in ranked[:limit]]
+
+
+class EntityCatalogue:
+    """
+    Known entities of the knowledge base
+
+    Loaded from Postgres on first use; ingest adds new titles, channels and
+    speakers directly, and documents written by other processes are picked up
+    by an incremental refresh (created_at after the last seen document) at most
+    every refresh_interval seconds.
+    """
+
+    def __init__(self, pool: Optional[DatabasePool] = None):
+        self.pool = pool or db_pool
+        self.refresh_interval = float(os.getenv("ENTITY_CATALOGUE_REFRESH_SECONDS", "300"))
+        self.index = TrigramIndex()
+        self.aliases: Dict[str, List[str]] = {}
+        self.loaded = False
+        self._watermark: Optional[datetime] = None
+        self._refreshed_at = 0.0
+        # Entities registered by ingest while a load is running, None otherwise
+        self._pending: Optional[List[Tuple[str, str]]] = None
+        self._lock = asyncio.Lock()
+
+    def set_aliases(self, aliases: Dict[str, List[str]]):
+        """Domain aliases: canonical term -> related terms"""
+        self.aliases = {
+            normalize_entity(key): [normalize_entity(alias) for alias in values]
+            for key, values in aliases.items()
+        }
+
+    def add_document(self, title: Optional[str] = None, channel: Optional[str] = None,
+                     speakers: Iterable[Optional[str]] = ()):
+        """Register the entities of a freshly ingested document"""
+        entities = [(title, 'title'), (channel, 'channel')] + [(speaker, 'speaker') for speaker in speakers]
+        for name, kind in entities:
+            if not name:
+                continue
+            self.index.add(name, kind)
+            if self._pending is not None:
+                self._pending.append((name, kind))
+
+    def invalidate(self):
+        """Force a full reload on next use, e.g. after documents were deleted"""
+        self.loaded = False
+
+    async def ensure_fresh(self):
+        """Load the catalogue or pull documents added since the last refresh"""
+        if self.loaded and time.monotonic() - self._refreshed_at < self.refresh_interval:
+            return
+
+        async with self._lock:
+            if not self.loaded:
+                await self._load()
+            elif time.monotonic() - self._refreshed_at >= self.refresh_interval:
+                await self._refresh()
+
+    async def _load(self):
+        start = time.perf_counter()
+        index = TrigramIndex()
+        self._pending = []
+
+        async with self.pool.acquire() as conn:
+            documents = await conn.fetch(
+                """
+                SELECT title, metadata->>'channel' AS channel, created_at
+                FROM documents
+                """
+            )
+            # Loose index scan over idx_chunks_speaker: one probe per distinct
+            # speaker instead of reading every chunk
+            speakers = await conn.fetch(
+                """
+                WITH RECURSIVE s AS (
+                    (SELECT speaker FROM chunks WHERE speaker IS NOT NULL ORDER BY speaker LIMIT 1)
+                    UNION ALL
+                    SELECT (
+                        SELECT c.speaker FROM chunks c
+                        WHERE c.speaker > s.speaker
+                        ORDER BY c.speaker
+                        LIMIT 1
+                    )
+                    FROM s
+                    WHERE s.speaker IS NOT NULL
+                )
+                SELECT speaker FROM s WHERE speaker IS NOT NULL
+                """
+            )
+
+        for row in documents:
+            if row['title']:
+                index.add(row['title'], 'title')
+            if row['channel']:
+                index.add(row['channel'], 'channel')
+        for row in speakers:
+            index.add(row['speaker'], 'speaker')
+
+        # Keep entities registered by ingest while the load was running; the
+        # rest of the old index is dropped, so deleted documents disappear
+        for name, kind in self._pending:
+            index.add(name, kind)
+        self._pending = None
+
+        self.index = index
+        self._watermark = max((row['created_at'] for row in documents if row['created_at']), default=None)
+        self._refreshed_at = time.monotonic()
+        self.loaded = True
+        print(f"Entity catalogue loaded: {len(index)} entities in {(time.perf_counter() - start) * 1000:.0f}ms")
+
+    async def _refresh(self):
+        async with self.pool.acquire() as conn:
+            documents = await conn.fetch(
+                """
+                SELECT id, title, metadata->>'channel' AS channel, created_at
+                FROM documents
+                WHERE $1::timestamptz IS NULL OR created_at > $1
+                """,
+                self._watermark
+            )
+            speakers = []
+            if documents:
+                speakers = await conn.fetch(
+                    """
+                    SELECT DISTINCT speaker
+                    FROM chunks
+                    WHERE document_id = ANY($1::uuid[]) AND speaker IS NOT NULL
+                    """,
+                    [row['id'] for row in documents]
+                )
+
+        for row in documents:
+            self.add_document(row['title'], row['channel'])
+        for row in speakers:
+            self.index.add(row['speaker'], 'speaker')
+
+        if documents:
+            self._watermark = max(
+                [row['created_at'] for row in documents if row['created_at']]
+                + ([self._watermark] if self._watermark else []),
+                default=None
+            )
+        self._refreshed_at = time.monotonic()
+
+    async def lookup(self,
+                     text: str,
+                     kinds: Iterable[str] = ENTITY_KINDS,
+                     limit: int = 20) -> List[CatalogueEntry]:
+        """Closest known entities by trigram overlap"""
+        await self.ensure_fresh()
+        return self.index.candidates(text, kinds, limit)
+
+    def match_aliases(self, text: str) -> List[Tuple[str, float, str]]:
+        """(canonical term, confidence, match type) for domain aliases of text"""
+        text = normalize_entity(text)
+        matches = []
+        for key, aliases in self.aliases.items():
+            if text == key or text in aliases:
+                matches.append((key, 1.0, 'alias'))
+            elif any(alias in text or text in alias for alias in aliases):
+                matches.append((key, 0.8, 'semantic'))
+        return matches
+
+
+# Global instance
+entity_catalogue = EntityCatalogue()
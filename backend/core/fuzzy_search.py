@@ -8,6 +8,9 @@ import asyncpg
 from difflib import SequenceMatcher
 import re
 from dataclasses import dataclass
+from core.database import DatabasePool, db_pool
+from core.entity_catalogue import EntityCatalogue, entity_catalogue
+from core.telemetry import traced
 
 
 @dataclass
@@ -22,8 +25,9 @@ class EntityMatch:
 class FuzzySearchEngine:
     """Handles fuzzy matching and semantic search improvements"""
     
-    def __init__(self, database_url: str):
-        self.database_url = database_url
+    def __init__(self, pool: Optional[DatabasePool] = None, catalogue: Optional[EntityCatalogue] = None):
+        self.pool = pool or db_pool
+        self.catalogue = catalogue or entity_catalogue
         # Common aliases and related terms
         self.domain_knowledge = {
             'pflegekräfte': ['betreuungskräfte', 'pfleger', 'betreuer', 'caregiver'],
@@ -35,143 +39,82 @@ class FuzzySearchEngine:
             'video': ['youtube', 'tutorial', 'recording', 'screencast'],
             'gespräch': ['interview', 'unterhaltung', 'meeting', 'call'],
         }
-        
-    async def fuzzy_search_documents(self, query: str, threshold: float = 0.6) -> List[Dict]:
-        """Search documents with fuzzy matching"""
-        
-        conn = await asyncpg.connect(self.database_url, statement_cache_size=0)
-        try:
-            # Extract key terms from query
-            key_terms = self._extract_search_terms(query)
-            expanded_terms = self._expand_terms(key_terms)
-            
-            # Build search conditions
-            conditions = []
-            params = []
-            param_count = 0
-            
-            for term in expanded_terms:
-                param_count += 1
-                conditions.append(f"""
-                    (LOWER(d.title) LIKE ${param_count} OR 
-                     LOWER(d.summary) LIKE ${param_count} OR
-                     EXISTS (
-                         SELECT 1 FROM chunks c 
-                         WHERE c.document_id = d.id 
-                         AND LOWER(c.content) LIKE ${param_count}
-                         LIMIT 1
-                     ))
-                """)
-                params.append(f"%{term.lower()}%")
-            
-            if not conditions:
-                return []
-            
-            # Search with expanded terms
-            where_clause = " OR ".join(conditions)
-            docs = await conn.fetch(f"""
-                SELECT DISTINCT
-                    d.id, 
-                    d.title, 
-                    d.source_type,
-                    d.created_at,
-                    d.summary
-                FROM documents d
-                WHERE {where_clause}
-                ORDER BY d.created_at DESC
-                LIMIT 10
-            """, *params)
-            
-            # Score results by relevance
-            scored_docs = []
-            for doc in docs:
-                score = self._calculate_relevance_score(
-                    query, 
-                    doc['title'] or '', 
-                    doc['summary'] or ''
-                )
-                if score >= threshold:
-                    doc_dict = dict(doc)
-                    doc_dict['relevance_score'] = score
-                    scored_docs.append(doc_dict)
-            
-            # Sort by relevance
-            scored_docs.sort(key=lambda x: x['relevance_score'], reverse=True)
-            
-            return scored_docs
-            
-        finally:
-            await conn.close()
+        self.catalogue.set_aliases(self.domain_knowledge)
+        
+    @traced('fuzzy')
+    async def fuzzy_search_documents(self,
+                                     query: str,
+                                     threshold: float = 0.6,
+                                     limit: int = 10) -> List[Dict]:
+        """
+        Search documents with trigram fuzzy matching
+        
+        Title, summary and chunk text are matched per expanded term with
+        word_similarity through trigram indexes and ranked in SQL
+        (fuzzy_document_search, migration 011; chunk matches are read
+        nearest-first from a GiST index, at most 50 per term).
+        """
+        # Extract key terms from query
+        key_terms = self._extract_search_terms(query)
+        expanded_terms = self._expand_terms(key_terms)
+        
+        if not expanded_terms:
+            return []
+        
+        async with self.pool.acquire() as conn:
+            docs = await conn.fetch(
+                """
+                SELECT id, title, source_type, created_at, summary, relevance_score
+                FROM fuzzy_document_search($1, $2::text[], $3, $4)
+                """,
+                query,
+                expanded_terms,
+                limit,
+                threshold
+            )
+        
+        return [dict(doc) for doc in docs]
     
     async def find_similar_entities(self, entity: str, search_in: str = 'all') -> List[EntityMatch]:
-        """Find similar entities in the database"""
-        
-        conn = await asyncpg.connect(self.database_url, statement_cache_size=0)
-        try:
-            matches = []
-            
-            # Search in document titles
-            if search_in in ['all', 'documents']:
-                docs = await conn.fetch("""
-                    SELECT DISTINCT title 
-                    FROM documents 
-                    WHERE title IS NOT NULL
-                """)
-                
-                for doc in docs:
-                    title = doc['title']
-                    similarity = self._calculate_similarity(entity, title)
-                    if similarity > 0.5:
-                        matches.append(EntityMatch(
-                            original=entity,
-                            matched=title,
-                            confidence=similarity,
-                            match_type='fuzzy'
-                        ))
-            
-            # Search in speaker names
-            if search_in in ['all', 'speakers']:
-                speakers = await conn.fetch("""
-                    SELECT DISTINCT speaker 
-                    FROM chunks 
-                    WHERE speaker IS NOT NULL
-                """)
-                
-                for record in speakers:
-                    speaker = record['speaker']
-                    similarity = self._calculate_similarity(entity, speaker)
-                    if similarity > 0.6:
-                        matches.append(EntityMatch(
-                            original=entity,
-                            matched=speaker,
-                            confidence=similarity,
-                            match_type='fuzzy'
-                        ))
-            
-            # Check domain knowledge
-            entity_lower = entity.lower()
-            for key, aliases in self.domain_knowledge.items():
-                if entity_lower == key or entity_lower in aliases:
-                    matches.append(EntityMatch(
-                        original=entity,
-                        matched=key,
-                        confidence=1.0,
-                        match_type='alias'
-                    ))
-                elif any(alias in entity_lower or entity_lower in alias for alias in aliases):
+        """
+        Find similar entities (titles, speakers, channels, aliases)
+        
+        Candidates come from the in-memory entity catalogue's trigram index;
+        only those are scored with _calculate_similarity.
+        """
+        kinds = {
+            'all': ('title', 'speaker', 'channel'),
+            'documents': ('title',),
+            'speakers': ('speaker',),
+            'channels': ('channel',)
+        }.get(search_in, ())
+        # Titles and channels match from 0.5 on, speaker names need 0.6
+        thresholds = {'title': 0.5, 'channel': 0.5, 'speaker': 0.6}
+        
+        matches = []
+        if kinds:
+            for candidate in await self.catalogue.lookup(entity, kinds, limit=10):
+                similarity = self._calculate_similarity(entity, candidate.name)
+                if similarity > thresholds[candidate.kind]:
                     matches.append(EntityMatch(
                         original=entity,
-                        matched=key,
-                        confidence=0.8,
-                        match_type='semantic'
+                        matched=candidate.name,
+                        confidence=similarity,
+                        match_type='fuzzy'
                     ))
-            
-            # Sort by confidence
-            matches.sort(key=lambda x: x.confidence, reverse=True)
-            return matches[:5]  # Top 5 matches
-            
-        finally:
-            await conn.close()
+        
+        # Check domain knowledge
+        for key, confidence, match_type in self.catalogue.match_aliases(entity):
+            matches.append(EntityMatch(
+                original=entity,
+                matched=key,
+                confidence=confidence,
+                match_type=match_type
+            ))
+        
+        # Sort by confidence
+        matches.sort(key=lambda x: x.confidence, reverse=True)
+        return matches[:5]  # Top 5 matches
     
     def _extract_search_terms(self, query: str) -> List[str]:
         """Extract meaningful search terms from query"""
@@ -239,28 +182,3 @@ class FuzzySearchEngine:
         
         # Character-level similarity
         return SequenceMatcher(None, str1_lower, str2_lower).ratio()
-    
-    def _calculate_relevance_score(self, query: str, title: str, summary: str) -> float:
-        """Calculate relevance score for a document"""
-        query_lower = query.lower()
-        title_lower = title.lower()
-        summary_lower = summary.lower()
-        
-        score = 0.0
-        
-        # Title match is most important
-        title_similarity = self._calculate_similarity(query, title)
-        score += title_similarity * 0.6
-        
-        # Check query terms in title
-        query_terms = self._extract_search_terms(query)
-        for term in query_terms:
-            if term in title_lower:
-                score += 0.1
-        
-        # Summary match
-        if summary:
-            summary_similarity = self._calculate_similarity(query, summary[:200])
-            score += summary_similarity * 0.3
-        
-        return min(score, 1.0)
\ No newline at end of file
@@ -0,0 +1,149 @@
+"""
+Staged pipeline executor for MyBrain
+Runs independent pipeline stages concurrently as a small DAG with per-stage
+timeouts, cancellation of stages that are no longer needed, and timings
+"""
+
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+
+@dataclass
+class Stage:
+    """One unit of work; fn receives the results of its dependencies"""
+    name: str
+    fn: Callable[[Dict[str, Any]], Awaitable[Any]]
+    depends_on: Tuple[str, ...] = ()
+    timeout: Optional[float] = None  # seconds, None waits indefinitely
+    default: Any = None  # result when the stage times out, fails or is cancelled
+
+
+@dataclass
+class StageTiming:
+    """How a stage ended and how long it ran"""
+    status: str  # 'ok', 'timeout', 'error', 'cancelled', 'skipped'
+    duration_ms: float = 0.0
+    error: Optional[str] = None
+
+    def to_dict(self) -> Dict:
+        timing = {'status': self.status, 'duration_ms': round(self.duration_ms, 1)}
+        if self.error:
+            timing['error'] = self.error
+        return timing
+
+
+class StagedPipeline:
+    """
+    Executes stages as soon as their dependencies are done
+
+    A stage that fails or times out yields its default, so dependents still run
+    and the request degrades instead of failing. on_complete is called after each
+    stage and may cancel() stages whose work has become redundant.
+    """
+
+    def __init__(self,
+                 stages: Optional[list] = None,
+                 on_complete: Optional[Callable[['StagedPipeline', str, Any], None]] = None):
+        self.stages: Dict[str, Stage] = {}
+        self.results: Dict[str, Any] = {}
+        self.timings: Dict[str, StageTiming] = {}
+        self.on_complete = on_complete
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._cancelled = set()
+        self._stopping = False
+
+        for stage in stages or []:
+            self.add(stage)
+
+    def add(self, stage: Stage):
+        for dependency in stage.depends_on:
+            if dependency not in self.stages:
+                raise ValueError(f"Stage '{stage.name}' depends on unknown stage '{dependency}'")
+        self.stages[stage.name] = stage
+
+    def cancel(self, *names: str):
+        """Stop stages that are running or not started yet; they yield their default"""
+        for name in names:
+            if name in self.results or name not in self.stages:
+                continue
+            self._cancelled.add(name)
+            task = self._tasks.get(name)
+            if task is not None and not task.done():
+                task.cancel()
+
+    async def run(self) -> Dict[str, Any]:
+        """Run all stages and return their results keyed by name"""
+        pending = dict(self.stages)
+
+        try:
+            await self._run_pending(pending)
+        finally:
+            # The caller was cancelled; do not leave stages running
+            self._stopping = True
+            for task in self._tasks.values():
+                task.cancel()
+
+        return self.results
+
+    async def _run_pending(self, pending: Dict[str, Stage]):
+        while pending or self._tasks:
+            # Start everything whose dependencies have finished
+            for name, stage in list(pending.items()):
+                if name in self._cancelled:
+                    del pending[name]
+                    self._finish(name, stage.default, StageTiming('skipped'))
+                elif all(dep in self.results for dep in stage.depends_on):
+                    del pending[name]
+                    self._tasks[name] = asyncio.create_task(self._run_stage(stage))
+
+            if not self._tasks:
+                break
+
+            done, _ = await asyncio.wait(self._tasks.values(), return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                name, result, timing = task.result()
+                del self._tasks[name]
+                self._finish(name, result, timing)
+
+    async def run_stage(self, stage: Stage) -> Any:
+        """Run a single stage outside the DAG (e.g. after a join) with the same bookkeeping"""
+        self.stages[stage.name] = stage
+        name, result, timing = await self._run_stage(stage)
+        self.timings[name] = timing
+        self.results[name] = result
+        return result
+
+    async def _run_stage(self, stage: Stage) -> Tuple[str, Any, StageTiming]:
+        inputs = {dep: self.results.get(dep) for dep in stage.depends_on}
+        start = time.perf_counter()
+
+        def elapsed() -> float:
+            return (time.perf_counter() - start) * 1000
+
+        try:
+            result = await asyncio.wait_for(stage.fn(inputs), timeout=stage.timeout)
+            return stage.name, result, StageTiming('ok', elapsed())
+        except asyncio.TimeoutError:
+            print(f"Pipeline stage '{stage.name}' timed out after {stage.timeout}s")
+            return stage.name, stage.default, StageTiming('timeout', elapsed())
+        except asyncio.CancelledError:
+            # Only a cancelled pipeline propagates; a stage cancelled by cancel()
+            # or from below (e.g. a shared future it awaited) yields its default
+            if self._stopping:
+                raise
+            return stage.name, stage.default, StageTiming('cancelled', elapsed())
+        except Exception as e:
+            print(f"Pipeline stage '{stage.name}' failed: {e}")
+            return stage.name, stage.default, StageTiming('error', elapsed(), str(e))
+
+    def _finish(self, name: str, result: Any, timing: StageTiming):
+        self.results[name] = result
+        self.timings[name] = timing
+        if self.on_complete is not None and timing.status == 'ok':
+            self.on_complete(self, name, result)
+
+    def timings_dict(self) -> Dict[str, Dict]:
+        """Per-stage timings for debug output"""
+        return {name: timing.to_dict() for name, timing in self.timings.items()}
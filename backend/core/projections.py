@@ -0,0 +1,34 @@
+"""
+Column projections for MyBrain
+Explicit SELECT lists for the chunk and document row shapes the API works with
+"""
+
+from typing import Iterable
+
+
+# What prompts and source citations read from a chunk. Leaves out embedding
+# (1536 floats per row), tokens, the persisted tsvectors and metadata JSON.
+CHUNK_FIELDS = (
+    'id', 'document_id', 'content', 'chunk_index', 'chunk_type',
+    'speaker', 'start_time', 'end_time', 'importance_score', 'created_at'
+)
+
+# A document as listed or referenced. Leaves out full_content (the whole
+# transcript) and summary_embedding; load those only where they are used.
+DOCUMENT_FIELDS = ('id', 'title', 'source_type', 'source_url', 'created_at')
+
+# A single document opened for reading
+DOCUMENT_DETAIL_FIELDS = DOCUMENT_FIELDS + ('metadata', 'summary', 'full_content')
+
+
+def columns(alias: str, fields: Iterable[str]) -> str:
+    """SELECT list of fields qualified with a table alias"""
+    return ", ".join(f"{alias}.{field}" for field in fields)
+
+
+# Chunk rows with the title of their document, as used by routing and chat
+CHUNK_COLUMNS = columns('c', CHUNK_FIELDS) + ", d.title AS document_title"
+
+DOCUMENT_COLUMNS = columns('d', DOCUMENT_FIELDS)
+
+DOCUMENT_DETAIL_COLUMNS = columns('d', DOCUMENT_DETAIL_FIELDS)
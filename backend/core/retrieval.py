@@ -5,27 +5,59 @@ Combines BM25, dense embeddings, and ColBERT re-ranking
 
 import asyncio
 import numpy as np
-from typing import List, Dict, Optional, Tuple
+from typing import List, Dict, Optional, Tuple, Union
 from datetime import datetime, timedelta
 import asyncpg
+from core.database import DatabasePool, db_pool
+from core.colbert_storage import decode_token_row
+from core.search_filters import SearchFilters
+from core.telemetry import traced
 try:
     from core.embeddings import embedding_service
 except ImportError:
     from core.embeddings_minimal import embedding_service
 
 
+# 'linear' is the original hybrid_search blend, the others go through fused_search
+FUSION_MODES = ('linear', 'rrf', 'zscore')
+
+# Candidate multipliers tried when a filtered query comes back short
+# (pgvector without iterative index scans stops after ef_search rows)
+REFILL_FACTORS = (4, 16)
+
+# pgvector's default hnsw.ef_search
+DEFAULT_EF_SEARCH = 40
+
+# Largest hnsw.ef_search pgvector accepts; set_config fails above it
+MAX_EF_SEARCH = 1000
+
+# pgvector release with hnsw.iterative_scan, which keeps scanning the index
+# until enough rows pass the filter (enable_filtered_vector_scan, migration 010)
+ITERATIVE_SCAN_VERSION = (0, 8, 0)
+
+
+def clamp_ef_search(ef_search: int) -> int:
+    """ef_search within the range pgvector accepts"""
+    return max(1, min(int(ef_search), MAX_EF_SEARCH))
+
+
 class HybridRetriever:
     """Multi-stage retrieval system"""
     
-    def __init__(self, database_url: str):
-        self.database_url = database_url
+    def __init__(self, pool: Optional[DatabasePool] = None):
+        self.pool = pool or db_pool
         self.embedding_service = embedding_service
+        self._iterative_scan: Optional[bool] = None
         
+    @traced('retrieval.search')
     async def search(self,
                     query: str,
                     top_k: int = 20,
                     use_colbert_rerank: bool = True,
-                    filters: Optional[Dict] = None) -> List[Dict]:
+                    filters: Optional[Union[SearchFilters, Dict]] = None,
+                    context_window: int = 1,
+                    ef_search: Optional[int] = None,
+                    fusion: str = 'linear') -> List[Dict]:
         """
         Perform hybrid search with optional ColBERT re-ranking
         
@@ -33,93 +65,120 @@ class HybridRetriever:
             query: Search query
             top_k: Number of results to return
             use_colbert_rerank: Whether to use ColBERT for re-ranking
-            filters: Optional filters (speaker, date range, etc.)
+            filters: SearchFilters (or a dict of its fields), applied inside the SQL
+            context_window: Number of neighbouring chunks to attach on each side
+            ef_search: HNSW candidate list size for this query; lower is faster,
+                higher recalls more (never below the vector candidates hybrid_search asks for)
+            fusion: How vector and full-text candidates are combined
+                ('linear', 'rrf' or 'zscore'; the latter two add recency and importance)
         """
+        if fusion not in FUSION_MODES:
+            raise ValueError(f"Unknown fusion mode '{fusion}', expected one of {FUSION_MODES}")
+        
+        filters = SearchFilters.from_value(filters)
+        if filters is not None and filters.is_empty():
+            filters = None
+        
         # Get query embedding
         query_embedding = await self.embedding_service.get_dense_embedding(query)
         
-        # Connect to database
-        conn = await asyncpg.connect(self.database_url, statement_cache_size=0)
-        
-        try:
+        # Borrow a pooled connection
+        async with self.pool.acquire() as conn:
             # Stage 1: Hybrid search (BM25 + Dense)
             initial_results = await self._hybrid_search(
-                conn, query, query_embedding, top_k * 2, filters
+                conn, query, query_embedding, top_k * 2, filters, ef_search, fusion
             )
             
+            # Over-fetch and refill: widen the candidate lists until enough rows
+            # pass the filter or the filtered set is exhausted. With iterative
+            # index scans the filtered vector search already returned every row
+            # it could, so a short result means the filtered set is exhausted.
+            if (filters is not None and len(initial_results) < top_k
+                    and not await self._supports_iterative_scan(conn)):
+                fetched = top_k * 2
+                for factor in REFILL_FACTORS:
+                    # hybrid_search asks the vector index for twice the match count
+                    match_count = min(top_k * 2 * factor, MAX_EF_SEARCH // 2)
+                    if match_count <= fetched:
+                        break
+                    fetched = match_count
+                    refilled = await self._hybrid_search(
+                        conn, query, query_embedding, match_count, filters,
+                        max(ef_search or DEFAULT_EF_SEARCH, match_count * 2), fusion
+                    )
+                    grew = len(refilled) > len(initial_results)
+                    initial_results = refilled[:top_k * 2]
+                    if not grew or len(initial_results) >= top_k:
+                        break
+            
             if not initial_results:
                 return []
             
-            # Stage 2: ColBERT re-ranking (if enabled and available)
-            if use_colbert_rerank and len(initial_results) > 5:
-                results = await self._colbert_rerank(query, initial_results, top_k)
-            else:
-                results = initial_results[:top_k]
+            # Stage 2: ColBERT re-ranking (if enabled and token data exists)
+            results = initial_results[:top_k]
+            if use_colbert_rerank and len(initial_results) > 5 and self._colbert_ready():
+                token_matrices = await self._fetch_colbert_tokens(conn, initial_results)
+                # Skip model load and query encoding when no candidate has token data
+                if token_matrices:
+                    results = await self._colbert_rerank(
+                        query, initial_results, top_k, token_matrices
+                    )
             
             # Stage 3: Enrich with context
-            results = await self._enrich_results(conn, results)
+            results = await self._enrich_results(conn, results, context_window)
             
             return results
-            
-        finally:
-            await conn.close()
     
+    @traced('retrieval.search_by_speaker')
     async def search_by_speaker(self,
                                speaker_name: str,
                                query: Optional[str] = None,
-                               top_k: int = 20) -> List[Dict]:
+                               top_k: int = 20,
+                               context_window: int = 1) -> List[Dict]:
         """Search for content by a specific speaker"""
-        conn = await asyncpg.connect(self.database_url, statement_cache_size=0)
+        # Get query embedding if query provided
+        query_embedding = None
+        if query:
+            query_embedding = await self.embedding_service.get_dense_embedding(query)
         
-        try:
-            # Get query embedding if query provided
-            query_embedding = None
-            if query:
-                query_embedding = await self.embedding_service.get_dense_embedding(query)
-            
-            # Use specialized speaker search function
-            embedding_str = f'[{",".join(map(str, query_embedding))}]' if query_embedding else None
+        async with self.pool.acquire() as conn:
+            # Use specialized speaker search function (vector sent via the binary codec)
             results = await conn.fetch(
                 """
                 SELECT * FROM search_by_speaker($1, $2, $3)
                 """,
                 speaker_name,
-                embedding_str,
+                query_embedding,
                 top_k
             )
             
             # Convert to dict and enrich
             results = [dict(r) for r in results]
-            results = await self._enrich_results(conn, results)
+            results = await self._enrich_results(conn, results, context_window)
             
             return results
-            
-        finally:
-            await conn.close()
     
+    @traced('retrieval.search_by_date_range')
     async def search_by_date_range(self,
                                   start_date: datetime,
                                   end_date: datetime,
                                   query: Optional[str] = None,
                                   top_k: int = 20) -> List[Dict]:
         """Search for content within a date range"""
-        conn = await asyncpg.connect(self.database_url, statement_cache_size=0)
+        # Get query embedding if query provided
+        query_embedding = None
+        if query:
+            query_embedding = await self.embedding_service.get_dense_embedding(query)
         
-        try:
-            # Get query embedding if query provided
-            query_embedding = None
-            if query:
-                query_embedding = await self.embedding_service.get_dense_embedding(query)
-            
-            # Search by time range
-            embedding_str = f'[{",".join(map(str, query_embedding))}]' if query_embedding else None
+        async with self.pool.acquire() as conn:
+            # Search by time range (vector sent via the binary codec)
             results = await conn.fetch(
                 """
                 SELECT * FROM search_by_timerange($1, $2, $3, $4)
                 """,
                 start_date,
                 end_date,
-                embedding_str,
+                query_embedding,
                 top_k
             )
             
@@ -137,70 +196,129 @@ class HybridRetriever:
                 results = chunk_results
             
             return results
-            
-        finally:
-            await conn.close()
     
+    @traced('retrieval.hybrid_search')
     async def _hybrid_search(self,
                            conn: asyncpg.Connection,
                            query: str,
                            query_embedding: List[float],
                            top_k: int,
-                           filters: Optional[Dict]) -> List[Dict]:
+                           filters: Optional[SearchFilters],
+                           ef_search: Optional[int] = None,
+                           fusion: str = 'linear') -> List[Dict]:
         """Perform hybrid search using database function"""
-        # Convert filters to JSONB if provided
-        filter_jsonb = None
-        if filters:
-            import json
-            filter_jsonb = json.dumps(filters)
+        # Filters are compiled into the search function's WHERE clauses
+        filter_jsonb = filters.to_jsonb() if filters is not None else None
+        
+        # Both candidate lists are built and fused inside one statement
+        args = [query_embedding, query, top_k, filter_jsonb]
+        if fusion == 'linear':
+            query_sql = """
+            SELECT * FROM hybrid_search($1, $2, $3, $4)
+            """
+        else:
+            query_sql = """
+            SELECT * FROM fused_search($1, $2, $3, $4, $5)
+            """
+            args.append(fusion)
         
-        # Convert embedding to vector format
-        embedding_str = f'[{",".join(map(str, query_embedding))}]'
+        # HNSW returns at most ef_search rows, and hybrid_search asks the vector
+        # index for twice the match count; pgvector's default of 40 would cap
+        # the vector side below that for any top_k above 20
+        ef_search = clamp_ef_search(max(ef_search or DEFAULT_EF_SEARCH, top_k * 2))
+        
+        # SET LOCAL semantics keep the knob scoped to this transaction,
+        # which also holds under pgbouncer transaction pooling
+        async with conn.transaction():
+            await conn.execute(
+                "SELECT set_config('hnsw.ef_search', $1, true)", str(ef_search)
+            )
+            results = await conn.fetch(query_sql, *args)
         
-        # Call hybrid search function
-        results = await conn.fetch(
+        # Convert to dictionaries
+        return [dict(r) for r in results]
+    
+    async def _supports_iterative_scan(self, conn: asyncpg.Connection) -> bool:
+        """Whether the installed pgvector has hnsw.iterative_scan (checked once)"""
+        if self._iterative_scan is None:
+            version = await conn.fetchval(
+                "SELECT extversion FROM pg_extension WHERE extname = 'vector'"
+            )
+            try:
+                parsed = tuple(int(part) for part in (version or '').split('.')[:3])
+            except ValueError:
+                parsed = ()
+            self._iterative_scan = parsed >= ITERATIVE_SCAN_VERSION
+        return self._iterative_scan
+    
+    @traced('retrieval.colbert_tokens')
+    async def _fetch_colbert_tokens(self,
+                                  conn: asyncpg.Connection,
+                                  results: List[Dict]) -> Dict:
+        """Bulk-load ColBERT token matrices for all candidates, keyed by chunk_id"""
+        chunk_ids = [r['chunk_id'] for r in results if r.get('chunk_id')]
+        if not chunk_ids:
+            return {}
+        
+        rows = await conn.fetch(
             """
-            SELECT * FROM hybrid_search($1, $2, $3, $4)
+            SELECT DISTINCT ON (chunk_id)
+                chunk_id, token_data, token_dtype, token_count, token_dim
+            FROM colbert_tokens
+            WHERE chunk_id = ANY($1::uuid[])
+            ORDER BY chunk_id, created_at DESC
             """,
-            embedding_str,
-            query,
-            top_k,
-            filter_jsonb
+            chunk_ids
         )
         
-        # Convert to dictionaries
-        return [dict(r) for r in results]
+        return {row['chunk_id']: decode_token_row(row) for row in rows}
     
+    def _colbert_ready(self) -> bool:
+        """
+        Whether ColBERT can rerank right now
+        
+        Never waits for the model: while it is loading (or on minimal deployments
+        without it) search keeps its first-stage ranking.
+        """
+        if not hasattr(self.embedding_service, 'start_colbert_warmup'):
+            return False
+        if not self.embedding_service.colbert_ready:
+            self.embedding_service.start_colbert_warmup()
+            return False
+        return True
+    
+    @traced('retrieval.colbert_rerank')
     async def _colbert_rerank(self,
                             query: str,
                             initial_results: List[Dict],
-                            top_k: int) -> List[Dict]:
+                            top_k: int,
+                            token_matrices: Dict) -> List[Dict]:
         """Re-rank results using ColBERT token-level matching"""
-        # Initialize ColBERT if needed
-        await self.embedding_service.initialize_colbert()
+        if not self._colbert_ready():
+            return initial_results[:top_k]
         
-        # Get query token embeddings
-        query_tokens, query_token_texts = self.embedding_service.get_colbert_embeddings(query)
-        query_tokens = np.array(query_tokens)
+        # Get query token embeddings off the event loop
+        (query_tokens, _), = await self.embedding_service.get_colbert_embeddings_batch([query])
+        query_tokens = np.asarray(query_tokens, dtype=np.float32)
         
-        # Score each result
-        scored_results = []
+        # Score all candidates with token data in one batch
+        scored_ids = [
+            r['chunk_id'] for r in initial_results
+            if r.get('chunk_id') in token_matrices
+            and token_matrices[r['chunk_id']].shape[1] == query_tokens.shape[1]
+        ]
+        colbert_scores = {}
+        if scored_ids:
+            scores = self._maxsim_scores(
+                query_tokens, [token_matrices[chunk_id] for chunk_id in scored_ids]
+            )
+            colbert_scores = dict(zip(scored_ids, scores.tolist()))
         
+        scored_results = []
         for result in initial_results:
-            # Check if we have ColBERT embeddings for this chunk
-            if 'colbert_tokens' in result and result['colbert_tokens']:
-                # Calculate MaxSim score
-                doc_tokens = np.array(result['colbert_tokens']['token_embeddings'])
-                
-                # Compute similarity matrix
-                sim_matrix = np.dot(query_tokens, doc_tokens.T)
-                
-                # MaxSim: max similarity for each query token
-                max_sims = np.max(sim_matrix, axis=1)
-                colbert_score = np.mean(max_sims)
-                
+            if result.get('chunk_id') in colbert_scores:
                 # Combine with original score
-                combined_score = 0.6 * result['rank'] + 0.4 * colbert_score
+                combined_score = 0.6 * result['rank'] + 0.4 * colbert_scores[result['chunk_id']]
             else:
                 # No ColBERT embeddings, use original score
                 combined_score = result['rank']
@@ -213,51 +331,134 @@ class HybridRetriever:
         
         return scored_results[:top_k]
     
+    @staticmethod
+    def _maxsim_scores(query_tokens: np.ndarray,
+                       doc_matrices: List[np.ndarray]) -> np.ndarray:
+        """
+        Vectorised ColBERT MaxSim over a batch of documents
+        
+        Pads all document token matrices into one (docs x max_tokens x dim)
+        tensor with a mask, so every candidate is scored in a single einsum.
+        
+        Returns:
+            Array of mean-over-query-tokens MaxSim scores, one per document
+        """
+        max_tokens = max(m.shape[0] for m in doc_matrices)
+        dim = query_tokens.shape[1]
+        
+        docs = np.zeros((len(doc_matrices), max_tokens, dim), dtype=np.float32)
+        mask = np.zeros((len(doc_matrices), max_tokens), dtype=bool)
+        for i, matrix in enumerate(doc_matrices):
+            docs[i, :matrix.shape[0]] = matrix
+            mask[i, :matrix.shape[0]] = True
+        
+        # (docs, query_tokens, doc_tokens)
+        sims = np.einsum('qd,ntd->nqt', query_tokens, docs)
+        sims = np.where(mask[:, None, :], sims, -np.inf)
+        
+        # MaxSim: best doc token per query token, averaged over query tokens
+        return sims.max(axis=2).mean(axis=1)
+    
+    @traced('retrieval.enrich')
     async def _enrich_results(self,
                             conn: asyncpg.Connection,
-                            results: List[Dict]) -> List[Dict]:
-        """Enrich results with document context and metadata"""
-        enriched = []
+                            results: List[Dict],
+                            context_window: int = 1) -> List[Dict]:
+        """
+        Enrich results with document context and neighbouring chunks
         
-        for result in results:
-            # Get document context
-            doc_id = result.get('document_id')
-            if doc_id:
-                doc_context = await conn.fetchrow(
-                    """
-                    SELECT * FROM get_document_context($1)
-                    """,
-                    doc_id
-                )
-                
-                if doc_context:
-                    result['document'] = dict(doc_context)
+        Uses two set-based queries for the whole result list (document contexts
+        and neighbour chunks) instead of two queries per result.
+        
+        Args:
+            conn: Database connection
+            results: Search results with document_id / chunk_index
+            context_window: Number of neighbouring chunks to attach on each side
+        """
+        if not results:
+            return results
+        
+        # Stage 1: All document contexts in one query
+        doc_ids = list({r['document_id'] for r in results if r.get('document_id')})
+        doc_contexts = {}
+        if doc_ids:
+            rows = await conn.fetch(
+                """
+                SELECT 
+                    d.id AS document_id,
+                    d.title AS document_title,
+                    d.summary AS document_summary,
+                    d.source_type,
+                    d.created_at,
+                    c.participants,
+                    c.key_points
+                FROM documents d
+                LEFT JOIN conversations c ON c.document_id = d.id
+                WHERE d.id = ANY($1::uuid[])
+                """,
+                doc_ids
+            )
+            for row in rows:
+                context = dict(row)
+                doc_id = context.pop('document_id')
+                # Keep the first conversation row, like get_document_context
+                doc_contexts.setdefault(doc_id, context)
+        
+        # Stage 2: All neighbour chunks in one query keyed by (document_id, chunk_index)
+        neighbours = {}
+        if context_window > 0:
+            wanted = set()
+            for result in results:
+                if result.get('document_id') and result.get('chunk_index') is not None:
+                    for offset in range(1, context_window + 1):
+                        wanted.add((result['document_id'], result['chunk_index'] - offset))
+                        wanted.add((result['document_id'], result['chunk_index'] + offset))
             
-            # Add surrounding chunks if detail chunk
-            if result.get('chunk_index'):
-                # Get previous and next chunks for context
-                surrounding = await conn.fetch(
+            if wanted:
+                wanted_docs, wanted_indices = zip(*wanted)
+                rows = await conn.fetch(
                     """
-                    SELECT id, content, chunk_index, speaker
-                    FROM chunks
-                    WHERE document_id = $1 
-                    AND chunk_index IN ($2, $3)
-                    AND chunk_type = 'detail'
-                    ORDER BY chunk_index
+                    SELECT c.id, c.document_id, c.content, c.chunk_index, c.speaker
+                    FROM chunks c
+                    JOIN unnest($1::uuid[], $2::int[]) AS k(document_id, chunk_index)
+                      ON c.document_id = k.document_id
+                     AND c.chunk_index = k.chunk_index
+                    WHERE c.chunk_type = 'detail'
                     """,
-                    doc_id,
-                    result['chunk_index'] - 1,
-                    result['chunk_index'] + 1
+                    list(wanted_docs),
+                    list(wanted_indices)
                 )
-                
+                for row in rows:
+                    neighbour = dict(row)
+                    doc_id = neighbour.pop('document_id')
+                    neighbours[(doc_id, neighbour['chunk_index'])] = neighbour
+        
+        # Stage 3: Stitch back in Python
+        for result in results:
+            doc_id = result.get('document_id')
+            if doc_id in doc_contexts:
+                result['document'] = doc_contexts[doc_id]
+            
+            if context_window > 0 and doc_id and result.get('chunk_index') is not None:
+                idx = result['chunk_index']
+                before = [
+                    neighbours[(doc_id, idx - offset)]
+                    for offset in range(context_window, 0, -1)
+                    if (doc_id, idx - offset) in neighbours
+                ]
+                after = [
+                    neighbours[(doc_id, idx + offset)]
+                    for offset in range(1, context_window + 1)
+                    if (doc_id, idx + offset) in neighbours
+                ]
                 result['context'] = {
-                    'previous': dict(surrounding[0]) if len(surrounding) > 0 else None,
-                    'next': dict(surrounding[1]) if len(surrounding) > 1 else None
+                    'previous': neighbours.get((doc_id, idx - 1)),
+                    'next': neighbours.get((doc_id, idx + 1)),
+                    'before': before,
+                    'after': after
                 }
-            
-            enriched.append(result)
         
-        return enriched
+        return results
     
     async def _get_document_chunks(self,
                                  conn: asyncpg.Connection,
@@ -265,7 +466,7 @@ class HybridRetriever:
                                  query_embedding: Optional[List[float]],
                                  limit: int) -> List[Dict]:
         """Get relevant chunks from a document"""
-        if query_embedding:
+        if query_embedding is not None:
             # Get chunks sorted by relevance
             chunks = await conn.fetch(
                 """
@@ -313,9 +514,7 @@ class HybridRetriever:
                                    document_id: str,
                                    top_k: int = 5) -> List[Dict]:
         """Find similar documents based on summary embeddings"""
-        conn = await asyncpg.connect(self.database_url, statement_cache_size=0)
-        
-        try:
+        async with self.pool.acquire() as conn:
             # Get document's summary embedding
             doc_embedding = await conn.fetchval(
                 """
@@ -326,7 +525,7 @@ class HybridRetriever:
                 document_id
             )
             
-            if not doc_embedding:
+            if doc_embedding is None:
                 return []
             
             # Find similar documents
@@ -350,6 +549,3 @@ class HybridRetriever:
             )
             
             return [dict(doc) for doc in similar]
-            
-        finally:
-            await conn.close()
\ No newline at end of file
@@ -0,0 +1,69 @@
+"""
+Search filter model for MyBrain
+Filters are compiled into the WHERE clauses of hybrid_search / fused_search instead of
+being applied to the result list afterwards
+"""
+
+import json
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List, Optional, Union
+
+
+CHUNK_TYPES = ('summary', 'topic', 'detail')
+
+
+@dataclass
+class SearchFilters:
+    """Restrictions applied inside the search functions"""
+    speaker: Optional[str] = None  # case-insensitive exact match on chunks.speaker
+    start_date: Optional[datetime] = None  # documents.created_at >= start_date
+    end_date: Optional[datetime] = None  # documents.created_at <= end_date
+    source_type: Optional[str] = None  # documents.source_type
+    document_ids: Optional[List[str]] = None
+    chunk_type: Optional[str] = None  # 'summary', 'topic', 'detail'
+    metadata: Dict = field(default_factory=dict)  # containment match on chunks.metadata
+
+    @classmethod
+    def from_value(cls, value: Union['SearchFilters', Dict, None]) -> Optional['SearchFilters']:
+        """Accept a SearchFilters, a plain dict of the same fields, or None"""
+        if value is None or isinstance(value, SearchFilters):
+            return value
+
+        known = {k: v for k, v in value.items() if k in cls.__dataclass_fields__ and k != 'metadata'}
+        # Unknown keys keep their old meaning of a chunk metadata match
+        metadata = dict(value.get('metadata') or {})
+        metadata.update({k: v for k, v in value.items() if k not in cls.__dataclass_fields__})
+
+        for key in ('start_date', 'end_date'):
+            if isinstance(known.get(key), str):
+                known[key] = datetime.fromisoformat(known[key].replace('Z', '+00:00'))
+
+        return cls(metadata=metadata, **known)
+
+    def is_empty(self) -> bool:
+        return not self.to_dict()
+
+    def to_dict(self) -> Dict:
+        """Non-empty fields in the shape the SQL functions expect"""
+        compiled = {}
+        if self.speaker:
+            compiled['speaker'] = self.speaker
+        if self.start_date:
+            compiled['start_date'] = self.start_date.isoformat()
+        if self.end_date:
+            compiled['end_date'] = self.end_date.isoformat()
+        if self.source_type:
+            compiled['source_type'] = self.source_type
+        if self.document_ids:
+            compiled['document_ids'] = [str(d) for d in self.document_ids]
+        if self.chunk_type:
+            compiled['chunk_type'] = self.chunk_type
+        if self.metadata:
+            compiled['metadata'] = self.metadata
+        return compiled
+
+    def to_jsonb(self) -> Optional[str]:
+        """JSON argument for the filters parameter, None when nothing is filtered"""
+        compiled = self.to_dict()
+        return json.dumps(compiled) if compiled else None
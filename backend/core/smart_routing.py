@@ -3,11 +3,59 @@ Smart query routing for MyBrain
 Intelligently routes queries based on their type and intent
 """
 
+import os
 import re
+import json
+import base64
+import uuid
 from typing import List, Dict, Optional, Tuple
 from dataclasses import dataclass
 import asyncpg
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
+from core.database import DatabasePool, db_pool
+from core.entity_catalogue import EntityCatalogue, entity_catalogue, normalize_entity
+from core.projections import CHUNK_COLUMNS, DOCUMENT_COLUMNS
+from core.retrieval import DEFAULT_EF_SEARCH, clamp_ef_search
+from core.search_filters import SearchFilters
+from core.telemetry import traced
+
+try:
+    from core.embeddings import embedding_service
+except ImportError:
+    from core.embeddings_minimal import embedding_service
+
+
+# Chunks per page of a speaker or temporal route
+ROUTE_PAGE_SIZE = int(os.getenv("ROUTE_PAGE_SIZE", "20"))
+
+# Ranked candidates behind every page. Each page of a route reruns
+# hybrid_search with this same match count (and ef_search), so the ranking
+# the cursor points into stays the same from page to page
+ROUTE_MAX_DEPTH = int(os.getenv("ROUTE_MAX_DEPTH", "100"))
+
+
+def encode_cursor(rank: float, chunk_id, scope: str, since: Optional[str] = None) -> str:
+    """Opaque keyset cursor: the last returned chunk's (rank, chunk_id) plus the route's window"""
+    payload = {'rank': rank, 'chunk_id': str(chunk_id), 'scope': scope}
+    if since:
+        payload['since'] = since
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[Dict]:
+    """Inverse of encode_cursor; None for a missing or malformed cursor"""
+    if not cursor:
+        return None
+    try:
+        after = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return {
+            'rank': float(after['rank']),
+            'chunk_id': str(uuid.UUID(after['chunk_id'])),
+            'scope': str(after['scope']),
+            'since': datetime.fromisoformat(after['since']) if after.get('since') else None
+        }
+    except (ValueError, TypeError, KeyError, AttributeError):
+        return None
 
 
 @dataclass
@@ -21,8 +69,10 @@ class QueryIntent:
 class SmartQueryRouter:
     """Routes queries to appropriate search strategies"""
     
-    def __init__(self, database_url: str):
-        self.database_url = database_url
+    def __init__(self, pool: Optional[DatabasePool] = None, catalogue: Optional[EntityCatalogue] = None):
+        self.pool = pool or db_pool
+        self.embedding_service = embedding_service
+        self.catalogue = catalogue or entity_catalogue
         
     async def analyze_query(self, query: str, history: List[Dict] = None) -> QueryIntent:
         """Analyze query to determine intent and extract entities"""
@@ -82,7 +132,9 @@ class SmartQueryRouter:
                 )
         
         # Speaker reference patterns
-        if any(phrase in query_lower for phrase in ['hat gesagt', 'meinte', 'erwähnte', 'sagte']):
+        # ("was hat Sascha Müller gesagt" puts the name between "hat" and "gesagt")
+        if (any(phrase in query_lower for phrase in ['hat gesagt', 'meinte', 'erwähnte', 'sagte'])
+                or re.search(r'\bhat\b.+\bgesagt\b', query_lower)):
             # Extract speaker name (usually before "hat gesagt")
             speaker_match = re.search(r'(\w+)\s+(?:hat|meinte|erwähnte|sagte)', query_lower)
             speaker = speaker_match.group(1) if speaker_match else None
@@ -118,23 +170,44 @@ class SmartQueryRouter:
             confidence=0.5
         )
     
-    async def route_query(self, query: str, history: List[Dict] = None) -> Dict:
-        """Route query to appropriate search strategy"""
+    @traced('routing')
+    async def route_query(self,
+                          query: str,
+                          history: List[Dict] = None,
+                          cursor: Optional[str] = None,
+                          limit: int = ROUTE_PAGE_SIZE) -> Dict:
+        """
+        Route query to appropriate search strategy
+        
+        Speaker and temporal routes return one page of at most limit chunks;
+        pass the result's next_cursor back to get the following page.
+        """
         
         intent = await self.analyze_query(query, history)
         
-        conn = await asyncpg.connect(self.database_url, statement_cache_size=0)
-        try:
-            if intent.query_type == 'document_ref':
+        # General queries need no database work here
+        if intent.query_type not in ('document_ref', 'speaker_ref', 'temporal'):
+            return {'strategy': 'general', 'intent': intent}
+        
+        if intent.query_type == 'document_ref':
+            async with self.pool.acquire() as conn:
                 return await self._document_reference_search(conn, query, intent.entities)
-            elif intent.query_type == 'speaker_ref':
-                return await self._speaker_reference_search(conn, query, intent.entities)
-            elif intent.query_type == 'temporal':
-                return await self._temporal_search(conn, query, intent.entities)
-            else:
-                return {'strategy': 'general', 'intent': intent}
-        finally:
-            await conn.close()
+        
+        # Cached and coalesced with the chat pipeline's dense stage; fetched
+        # before taking a connection so the pool is not held during the API call
+        query_embedding = await self.embedding_service.get_dense_embedding(query)
+        
+        if intent.query_type == 'speaker_ref':
+            intent.entities['speaker'] = await self._resolve_speaker(query, intent.entities.get('speaker'))
+        
+        async with self.pool.acquire() as conn:
+            if intent.query_type == 'speaker_ref':
+                return await self._speaker_reference_search(
+                    conn, query, query_embedding, intent.entities, cursor, limit
+                )
+            return await self._temporal_search(
+                conn, query, query_embedding, intent.entities, cursor, limit
+            )
     
     async def _document_reference_search(self, conn: asyncpg.Connection, 
                                        query: str, entities: Dict) -> Dict:
@@ -147,17 +220,17 @@ class SmartQueryRouter:
         
         if entities.get('author'):
             param_count += 1
-            conditions.append(f"LOWER(title) LIKE ${param_count}")
+            conditions.append(f"LOWER(d.title) LIKE ${param_count}")
             params.append(f"%{entities['author'].lower()}%")
         
         if entities.get('topic'):
             param_count += 1
-            conditions.append(f"LOWER(title) LIKE ${param_count}")
+            conditions.append(f"LOWER(d.title) LIKE ${param_count}")
             params.append(f"%{entities['topic'].lower()}%")
         
         if entities.get('doc_type') == 'video':
             param_count += 1
-            conditions.append(f"(source_type = 'youtube' OR LOWER(title) LIKE ${param_count})")
+            conditions.append(f"(d.source_type = 'youtube' OR LOWER(d.title) LIKE ${param_count})")
             params.append("%video%")
         
         if not conditions:
@@ -166,10 +239,10 @@ class SmartQueryRouter:
         # Search documents
         where_clause = " OR ".join(conditions)
         docs = await conn.fetch(f"""
-            SELECT id, title, source_type, created_at, full_content
-            FROM documents
+            SELECT {DOCUMENT_COLUMNS}
+            FROM documents d
             WHERE {where_clause}
-            ORDER BY created_at DESC
+            ORDER BY d.created_at DESC
             LIMIT 5
         """, *params)
         
@@ -179,13 +252,15 @@ class SmartQueryRouter:
         doc_id = docs[0]['id']
         doc_dict = dict(docs[0])
         
-        # Check if query needs full context
-        needs_full_context = self._needs_full_context(query)
+        # Only detail questions pay for loading the whole transcript
+        full_content = None
+        if self._needs_full_context(query):
+            full_content = await self._load_full_content(conn, doc_id)
         
-        if needs_full_context and doc_dict.get('full_content'):
+        if full_content:
             # Return full content as a single chunk for detail questions
             full_chunk = {
-                'content': doc_dict['full_content'],
+                'content': full_content,
                 'chunk_type': 'full_document',
                 'chunk_index': 0,
                 'document': {
@@ -204,8 +279,8 @@ class SmartQueryRouter:
             }
         else:
             # Get ALL chunks from the most relevant document
-            chunks = await conn.fetch("""
-                SELECT c.*, d.title as document_title
+            chunks = await conn.fetch(f"""
+                SELECT {CHUNK_COLUMNS}
                 FROM chunks c
                 JOIN documents d ON d.id = c.document_id
                 WHERE c.document_id = $1
@@ -230,59 +305,171 @@ class SmartQueryRouter:
                 'used_full_content': False
             }
     
-    async def _speaker_reference_search(self, conn: asyncpg.Connection,
-                                      query: str, entities: Dict) -> Dict:
-        """Search for chunks where a specific speaker said something"""
-        
-        speaker = entities.get('speaker', '')
+    async def _resolve_speaker(self, query: str, extracted: Optional[str]) -> Optional[str]:
+        """
+        Stored speaker name the query refers to
+        
+        analyze_query only takes the single word before "hat/meinte/sagte",
+        while chunks.speaker holds full names ("Sascha Müller") and the speaker
+        filter is an exact match. Each query word is looked up among the known
+        speakers and the speaker sharing the most words with the query wins;
+        the extracted word is kept when nobody matches.
+        """
+        words = [word for word in re.findall(r'\w+', normalize_entity(query)) if len(word) > 2]
+        
+        def matches(name_word: str) -> bool:
+            # Exact, or with a genitive/plural ending ("Saschas")
+            return any(
+                word == name_word or (word.startswith(name_word) and len(word) - len(name_word) <= 1)
+                for word in words
+            )
         
-        chunks = await conn.fetch("""
-            SELECT c.*, d.title as document_title
-            FROM chunks c
-            JOIN documents d ON d.id = c.document_id
-            WHERE LOWER(c.speaker) LIKE $1
-               OR LOWER(c.content) LIKE $2
-            ORDER BY c.created_at DESC
-            LIMIT 20
-        """, f"%{speaker.lower()}%", f"%{speaker}%")
+        best, best_score, seen = None, 0, set()
+        try:
+            for word in words:
+                for entry in await self.catalogue.lookup(word, ('speaker',), limit=5):
+                    if entry.normalized in seen:
+                        continue
+                    seen.add(entry.normalized)
+                    score = sum(1 for name_word in entry.normalized.split() if matches(name_word))
+                    if score > best_score:
+                        best, best_score = entry.name, score
+        except Exception as e:
+            print(f"Speaker lookup failed: {e}")
+        
+        return best or extracted
+    
+    async def _load_full_content(self, conn: asyncpg.Connection, document_id) -> Optional[str]:
+        """Complete original text of one document, fetched only when it is used"""
+        return await conn.fetchval(
+            "SELECT full_content FROM documents WHERE id = $1",
+            document_id
+        )
+    
+    async def _ranked_page(self,
+                           conn: asyncpg.Connection,
+                           query: str,
+                           query_embedding: List[float],
+                           filters: SearchFilters,
+                           scope: str,
+                           after: Optional[Dict],
+                           limit: int) -> Tuple[List[Dict], Optional[str]]:
+        """
+        One page of hybrid_search results inside the filter window
+        
+        Every page ranks the same ROUTE_MAX_DEPTH candidates and takes the
+        rows after the cursor's (rank, chunk_id). Pages line up as long as the
+        chunks in the window do not change between requests; the vector side
+        is an approximate HNSW scan, so this is not a snapshot.
+        """
+        async with conn.transaction():
+            # hybrid_search asks the vector index for twice the match count
+            await conn.execute(
+                "SELECT set_config('hnsw.ef_search', $1, true)",
+                str(clamp_ef_search(max(DEFAULT_EF_SEARCH, ROUTE_MAX_DEPTH * 2)))
+            )
+            # One row past the page tells whether there is a next page
+            rows = await conn.fetch(f"""
+                SELECT {CHUNK_COLUMNS}, h.similarity, h.rank
+                FROM hybrid_search($1, $2, $3, $4) h
+                JOIN chunks c ON c.id = h.chunk_id
+                JOIN documents d ON d.id = h.document_id
+                WHERE $5::float IS NULL OR (h.rank, h.chunk_id) < ($5::float, $6::uuid)
+                ORDER BY h.rank DESC, h.chunk_id DESC
+                LIMIT $7
+            """, query_embedding, query, ROUTE_MAX_DEPTH, filters.to_jsonb(),
+                after['rank'] if after else None,
+                after['chunk_id'] if after else None,
+                limit + 1)
+        
+        has_more = len(rows) > limit
+        rows = rows[:limit]
         
         chunk_dicts = []
-        for chunk in chunks:
+        for chunk in rows:
             chunk_dict = dict(chunk)
-            chunk_dict['document'] = {'document_title': chunk['document_title']}
+            chunk_dict['document'] = {
+                'document_title': chunk['document_title'],
+                'document_id': str(chunk['document_id'])
+            }
             chunk_dicts.append(chunk_dict)
         
+        next_cursor = None
+        if has_more:
+            last = rows[-1]
+            since = filters.start_date.isoformat() if filters.start_date else None
+            next_cursor = encode_cursor(last['rank'], last['id'], scope, since)
+        
+        return chunk_dicts, next_cursor
+    
+    async def _speaker_reference_search(self,
+                                      conn: asyncpg.Connection,
+                                      query: str,
+                                      query_embedding: List[float],
+                                      entities: Dict,
+                                      cursor: Optional[str] = None,
+                                      limit: int = ROUTE_PAGE_SIZE) -> Dict:
+        """Search for chunks where a specific speaker said something"""
+        
+        speaker = entities.get('speaker') or ''
+        after = decode_cursor(cursor)
+        scope = after['scope'] if after else 'speaker'
+        
+        chunk_dicts, next_cursor = [], None
+        if speaker and scope == 'speaker':
+            # Chunks attributed to the speaker (idx_chunks_speaker_lower)
+            chunk_dicts, next_cursor = await self._ranked_page(
+                conn, query, query_embedding, SearchFilters(speaker=speaker),
+                'speaker', after, limit
+            )
+        
+        if not chunk_dicts and not after:
+            # Nobody by that name in chunks.speaker: the name stays in the
+            # full-text query, so mentions of it rank first
+            scope = 'mentions'
+            chunk_dicts, next_cursor = await self._ranked_page(
+                conn, query, query_embedding, SearchFilters(), scope, None, limit
+            )
+        elif scope == 'mentions':
+            chunk_dicts, next_cursor = await self._ranked_page(
+                conn, query, query_embedding, SearchFilters(), scope, after, limit
+            )
+        
         return {
             'strategy': 'speaker_ref',
             'speaker': speaker,
-            'chunks': chunk_dicts
+            'speaker_match': scope == 'speaker',
+            'chunks': chunk_dicts,
+            'next_cursor': next_cursor
         }
     
-    async def _temporal_search(self, conn: asyncpg.Connection,
-                             query: str, entities: Dict) -> Dict:
-        """Search based on time references"""
-        
-        days_ago = int(entities.get('days_ago', 7))
-        since_date = datetime.now() - timedelta(days=days_ago)
-        
-        chunks = await conn.fetch("""
-            SELECT c.*, d.title as document_title
-            FROM chunks c
-            JOIN documents d ON d.id = c.document_id
-            WHERE d.created_at >= $1
-            ORDER BY d.created_at DESC
-        """, since_date)
+    async def _temporal_search(self,
+                             conn: asyncpg.Connection,
+                             query: str,
+                             query_embedding: List[float],
+                             entities: Dict,
+                             cursor: Optional[str] = None,
+                             limit: int = ROUTE_PAGE_SIZE) -> Dict:
+        """Search based on time references, ranked within the time window"""
+        
+        after = decode_cursor(cursor)
+        if after and after['since']:
+            # Later pages keep the window of the first one
+            since_date = after['since']
+        else:
+            days_ago = int(entities.get('days_ago', 7))
+            since_date = datetime.now(timezone.utc) - timedelta(days=days_ago)
         
-        chunk_dicts = []
-        for chunk in chunks:
-            chunk_dict = dict(chunk)
-            chunk_dict['document'] = {'document_title': chunk['document_title']}
-            chunk_dicts.append(chunk_dict)
+        chunk_dicts, next_cursor = await self._ranked_page(
+            conn, query, query_embedding, SearchFilters(start_date=since_date),
+            'temporal', after, limit
+        )
         
         return {
             'strategy': 'temporal',
             'since_date': since_date.isoformat(),
-            'chunks': chunk_dicts
+            'chunks': chunk_dicts,
+            'next_cursor': next_cursor
         }
     
     def _needs_full_context(self, query: str) -> bool:
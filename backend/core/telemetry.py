@@ -0,0 +1,258 @@
+"""
+Lightweight tracing and metrics for MyBrain
+Spans time pipeline stages, a per-request scope counts database round trips,
+and everything is exposed in the Prometheus text format on /metrics
+"""
+
+import time
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from functools import wraps
+from typing import Dict, List, Optional, Sequence, Tuple
+
+
+# Seconds; covers a cache hit up to a long LLM answer
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Round trips per request
+ROUND_TRIP_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250)
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(label_names: Sequence[str], label_values: Tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(label_names, label_values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Counter:
+    """Monotonic counter with labels"""
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._values: Dict[Tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = tuple(labels.get(name, '') for name in self.label_names)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket histogram with labels"""
+
+    def __init__(self,
+                 name: str,
+                 documentation: str,
+                 label_names: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+        # key -> (bucket counts, sum, count)
+        self._series: Dict[Tuple, List] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(labels.get(name, '') for name in self.label_names)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (bucket_counts, total, count) in sorted(self._series.items()):
+                for bound, bucket_count in zip(self.buckets, bucket_counts):
+                    labels = _format_labels(self.label_names, key, f'le="{_format_value(bound)}"')
+                    lines.append(f"{self.name}_bucket{labels} {bucket_count}")
+                labels = _format_labels(self.label_names, key)
+                lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+                lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Holds all metrics of the process and renders them for scraping"""
+
+    def __init__(self):
+        self._metrics = []
+
+    def counter(self, name: str, documentation: str, label_names: Sequence[str] = ()) -> Counter:
+        metric = Counter(name, documentation, label_names)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self,
+                  name: str,
+                  documentation: str,
+                  label_names: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        metric = Histogram(name, documentation, label_names, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# Global registry and the metrics used across the backend
+metrics = MetricsRegistry()
+
+STAGE_DURATION = metrics.histogram(
+    'mybrain_stage_duration_seconds', 'Duration of traced pipeline stages', ('stage',)
+)
+STAGE_ERRORS = metrics.counter(
+    'mybrain_stage_errors_total', 'Traced stages that raised', ('stage',)
+)
+REQUEST_DURATION = metrics.histogram(
+    'mybrain_request_duration_seconds', 'HTTP request duration including streamed bodies', ('endpoint',)
+)
+REQUEST_DB_ROUND_TRIPS = metrics.histogram(
+    'mybrain_request_db_round_trips', 'Database round trips per HTTP request', ('endpoint',),
+    buckets=ROUND_TRIP_BUCKETS
+)
+LLM_TOKENS = metrics.counter(
+    'mybrain_llm_tokens_total', 'Tokens reported by model providers', ('model', 'kind')
+)
+
+
+@dataclass
+class RequestTrace:
+    """Per-request accounting, reachable from any coroutine of the request"""
+    endpoint: str
+    db_round_trips: int = 0
+    spans: List[Tuple[str, float]] = field(default_factory=list)  # (name, ms)
+
+    def summary(self) -> Dict:
+        return {
+            'db_round_trips': self.db_round_trips,
+            'spans': [{'name': name, 'duration_ms': round(ms, 1)} for name, ms in self.spans]
+        }
+
+
+_current_trace: ContextVar[Optional[RequestTrace]] = ContextVar('mybrain_request_trace', default=None)
+
+
+def current_trace() -> Optional[RequestTrace]:
+    return _current_trace.get()
+
+
+def start_request(endpoint: str):
+    """Open a request scope; returns the token for end_request"""
+    return _current_trace.set(RequestTrace(endpoint=endpoint))
+
+
+def end_request(token, duration_seconds: float, endpoint: Optional[str] = None):
+    """Close a request scope and record its totals"""
+    trace = _current_trace.get()
+    _current_trace.reset(token)
+    if trace is None:
+        return
+    endpoint = endpoint or trace.endpoint
+    REQUEST_DURATION.observe(duration_seconds, endpoint=endpoint)
+    REQUEST_DB_ROUND_TRIPS.observe(trace.db_round_trips, endpoint=endpoint)
+
+
+def count_db_round_trip(trace: Optional[RequestTrace] = None):
+    """Count one statement sent to Postgres for the given (or current) request"""
+    trace = trace or _current_trace.get()
+    if trace is not None:
+        trace.db_round_trips += 1
+
+
+@contextmanager
+def span(name: str):
+    """Time a block as a pipeline stage"""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        # CancelledError is not an Exception: a cancelled losing stage is no error
+        STAGE_ERRORS.inc(stage=name)
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_DURATION.observe(elapsed, stage=name)
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.spans.append((name, elapsed * 1000))
+
+
+def traced(name: str):
+    """Decorator form of span() for coroutine functions"""
+    def decorator(fn):
+        @wraps(fn)
+        async def wrapper(*args, **kwargs):
+            with span(name):
+                return await fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def record_tokens(model: str, prompt: Optional[int] = None, completion: Optional[int] = None):
+    """Add provider-reported token usage for a model"""
+    if prompt:
+        LLM_TOKENS.inc(prompt, model=model, kind='prompt')
+    if completion:
+        LLM_TOKENS.inc(completion, model=model, kind='completion')
+
+
+class TelemetryMiddleware:
+    """
+    ASGI middleware opening a request scope around every HTTP request
+
+    Plain ASGI rather than BaseHTTPMiddleware so streamed chat responses are
+    measured until their last chunk, not until the headers are sent.
+    """
+
+    def __init__(self, app, skip_paths: Sequence[str] = ('/metrics', '/health')):
+        self.app = app
+        self.skip_paths = set(skip_paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or scope.get('path') in self.skip_paths:
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        token = start_request(scope.get('path', ''))
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            # Route templates keep the label set bounded
+            route = scope.get('route')
+            endpoint = f"{scope.get('method', '')} {getattr(route, 'path', 'unmatched')}"
+            end_request(token, time.perf_counter() - start, endpoint)
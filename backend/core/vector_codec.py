@@ -0,0 +1,60 @@
+"""
+Binary pgvector codec for asyncpg
+Lets numpy arrays and float lists cross the wire as packed float32 instead of '[x,y,z]' text
+"""
+
+import struct
+from typing import Union, List, Optional
+import numpy as np
+import asyncpg
+
+
+# pgvector binary layout: uint16 dim, uint16 unused, dim x float32 (all big-endian)
+_HEADER = struct.Struct('>HH')
+
+
+def encode_vector(value: Union[np.ndarray, List[float], str]) -> bytes:
+    """Encode a vector for the pgvector binary protocol"""
+    if isinstance(value, str):
+        # Accept the legacy '[x,y,z]' text form
+        value = np.fromstring(value.strip().strip('[]'), sep=',', dtype=np.float32)
+
+    array = np.asarray(value, dtype='>f4')
+    if array.ndim != 1:
+        raise ValueError(f"Expected a 1-D vector, got shape {array.shape}")
+
+    return _HEADER.pack(array.shape[0], 0) + array.tobytes()
+
+
+def decode_vector(data: bytes) -> np.ndarray:
+    """Decode a pgvector binary value into a read-only float32 view"""
+    dim, _ = _HEADER.unpack_from(data)
+    return np.frombuffer(data, dtype='>f4', count=dim, offset=_HEADER.size)
+
+
+async def register_vector_codec(conn: asyncpg.Connection) -> Optional[str]:
+    """
+    Register the binary codec for the vector type on a connection
+
+    Returns the schema the extension lives in, or None if pgvector is not installed.
+    """
+    schema = await conn.fetchval(
+        """
+        SELECT n.nspname
+        FROM pg_type t
+        JOIN pg_namespace n ON n.oid = t.typnamespace
+        WHERE t.typname = 'vector'
+        LIMIT 1
+        """
+    )
+    if schema is None:
+        return None
+
+    await conn.set_type_codec(
+        'vector',
+        schema=schema,
+        encoder=encode_vector,
+        decoder=decode_vector,
+        format='binary'
+    )
+    return schema
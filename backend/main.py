@@ -4,6 +4,7 @@ FastAPI application for personal knowledge management
 """
 
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 import os
@@ -14,6 +15,9 @@ try:
     from api import ingest_minimal as ingest, search, chat, documents
 except ImportError:
     from api import ingest, search, chat, documents
+from core.database import db_pool
+from core.embedding_cache import query_embedding_cache
+from core.telemetry import TelemetryMiddleware, metrics
 
 # Load environment variables
 load_dotenv()
@@ -24,9 +28,19 @@ async def lifespan(app: FastAPI):
     """Handle startup and shutdown events"""
     # Startup
     print("Starting MyBrain backend...")
+    try:
+        await db_pool.connect()
+    except Exception as e:
+        # The pool is created lazily on first use if the database is not reachable yet
+        print(f"Database pool not ready at startup: {e}")
+    # Load ColBERT in the background; search reranks once it is ready
+    if os.getenv("COLBERT_WARMUP", "true").lower() not in ('0', 'false', 'no', 'off') \
+            and hasattr(search.retriever.embedding_service, 'start_colbert_warmup'):
+        search.retriever.embedding_service.start_colbert_warmup()
     yield
     # Shutdown
     print("Shutting down MyBrain backend...")
+    await db_pool.close()
 
 
 # Create FastAPI app
@@ -53,6 +67,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Per-request spans and database round trips for /metrics
+app.add_middleware(TelemetryMiddleware)
+
 # Include routers
 app.include_router(ingest.router, prefix="/api/v1/ingest", tags=["ingestion"])
 app.include_router(search.router, prefix="/api/v1/search", tags=["search"])
@@ -70,14 +87,34 @@ async def root():
     }
 
 
+def colbert_status() -> str:
+    service = search.retriever.embedding_service
+    if not hasattr(service, 'start_colbert_warmup'):
+        return "unavailable"
+    if service.colbert_ready:
+        return "ready"
+    if service.colbert_error:
+        return "failed"
+    return "loading"
+
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
     return {
         "status": "healthy",
         "services": {
-            "database": "connected",
+            "database": "connected" if db_pool.stats()['connected'] else "disconnected",
             "redis": "connected",
-            "embeddings": "ready"
-        }
-    }
\ No newline at end of file
+            "embeddings": "ready",
+            "colbert": colbert_status()
+        },
+        "database_pool": db_pool.stats(),
+        "embedding_cache": query_embedding_cache.get_stats()
+    }
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """Prometheus scrape endpoint: stage histograms, DB round trips per request, token counts"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
\ No newline at end of file
@@ -0,0 +1,14 @@
+"""
+Shared test setup for the MyBrain backend
+Puts backend/ on the import path and provides placeholder API keys; no test
+talks to OpenAI, Anthropic or Postgres.
+"""
+
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+os.environ.setdefault("OPENAI_API_KEY", "test")
+os.environ.setdefault("ANTHROPIC_API_KEY", "test")
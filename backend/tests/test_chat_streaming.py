@@ -0,0 +1,88 @@
+"""
+Tests for the streamed chat answer
+Serialisation of the final sources event and error reporting mid-stream
+"""
+
+import asyncio
+import json
+import uuid
+from datetime import datetime, timezone
+
+from api import chat
+
+
+def parse_events(events):
+    return [json.loads(event[len("data: "):]) for event in events]
+
+
+def retrieved_chunk():
+    """A chunk shaped like HybridRetriever results: datetimes and UUIDs included"""
+    return {
+        'chunk_id': uuid.uuid4(),
+        'content': "Sascha erklärt das neue Preismodell.",
+        'similarity': 0.82,
+        'speaker': 'Sascha',
+        'document': {
+            'document_id': uuid.uuid4(),
+            'document_title': 'Team Meeting',
+            'source_type': 'audio',
+            'created_at': datetime(2024, 5, 1, 9, 30, tzinfo=timezone.utc)
+        }
+    }
+
+
+def test_format_sources_sends_dates_as_iso_strings():
+    sources = chat.format_sources([retrieved_chunk()])
+
+    assert sources[0]['date'] == '2024-05-01T09:30:00+00:00'
+    assert sources[0]['speaker'] == 'Sascha'
+    json.dumps(sources)
+
+
+def test_sse_event_serialises_non_json_types():
+    event = chat.sse_event({'id': uuid.UUID(int=1), 'at': datetime(2024, 1, 1)})
+
+    assert event.startswith("data: ") and event.endswith("\n\n")
+    assert parse_events([event])[0]['id'] == str(uuid.UUID(int=1))
+
+
+def run_stream(monkeypatch, text_stream, chunks):
+    async def grade(**kwargs):
+        return 0.9
+
+    monkeypatch.setattr(chat, 'route_to_model_text_stream', lambda **kwargs: ('gpt-test', text_stream()))
+    monkeypatch.setattr(chat, 'check_answer_quality', grade)
+
+    async def collect():
+        return [event async for event in chat.stream_answer_with_quality_check(
+            query="Was hat Sascha gesagt?",
+            context_chunks=chunks,
+            preferred_model='gpt-test',
+            conversation_history=""
+        )]
+
+    return parse_events(asyncio.run(collect()))
+
+
+def test_stream_ends_with_done_event_for_retrieved_chunks(monkeypatch):
+    async def tokens():
+        yield "Das "
+        yield "Preismodell."
+
+    events = run_stream(monkeypatch, tokens, [retrieved_chunk()])
+
+    assert [e['text'] for e in events if 'text' in e] == ["Das ", "Preismodell."]
+    assert events[-1]['done'] is True
+    assert events[-1]['sources'][0]['date'] == '2024-05-01T09:30:00+00:00'
+
+
+def test_stream_reports_provider_errors(monkeypatch):
+    async def tokens():
+        yield "Das "
+        raise RuntimeError("provider went away")
+
+    events = run_stream(monkeypatch, tokens, [retrieved_chunk()])
+
+    assert events[0] == {'text': "Das "}
+    assert events[-1]['done'] is True
+    assert events[-1]['error'] == "provider went away"
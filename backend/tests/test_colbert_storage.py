@@ -0,0 +1,37 @@
+"""
+Tests for the ColBERT token storage format
+"""
+
+import numpy as np
+import pytest
+
+from core.colbert_storage import STORAGE_DTYPE, decode_token_row, encode_token_embeddings
+
+
+def test_round_trip_as_float16():
+    matrix = np.random.default_rng(0).standard_normal((7, 128)).astype(np.float32)
+
+    data, dtype, count, dim = encode_token_embeddings(matrix)
+    decoded = decode_token_row({'token_data': data, 'token_dtype': dtype,
+                                'token_count': count, 'token_dim': dim})
+
+    assert (count, dim) == (7, 128)
+    assert dtype == np.dtype(STORAGE_DTYPE).str
+    assert len(data) == 7 * 128 * 2
+    np.testing.assert_allclose(decoded, matrix, atol=1e-2)
+
+
+def test_round_trip_keeps_explicit_dtype():
+    data, dtype, count, dim = encode_token_embeddings([[1.0, 2.0], [3.0, 4.0]], dtype='<f4')
+
+    decoded = decode_token_row({'token_data': data, 'token_dtype': dtype,
+                                'token_count': count, 'token_dim': dim})
+
+    assert decoded.dtype == np.float32
+    assert decoded.tolist() == [[1.0, 2.0], [3.0, 4.0]]
+    assert not decoded.flags.writeable
+
+
+def test_rejects_non_matrix_input():
+    with pytest.raises(ValueError):
+        encode_token_embeddings([1.0, 2.0, 3.0])
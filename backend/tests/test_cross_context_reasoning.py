@@ -0,0 +1,63 @@
+"""
+Tests for relationship edges built at ingest
+Edge derivation from document profiles, without a database
+"""
+
+import uuid
+from datetime import datetime, timezone
+
+from core.cross_context_reasoning import CrossContextReasoner
+
+
+def profile(day, speakers=(), concepts=(), technologies=(), has_problems=False, has_solutions=False):
+    return {
+        'document_id': uuid.uuid4(),
+        'speakers': list(speakers),
+        'concepts': list(concepts),
+        'technologies': list(technologies),
+        'has_problems': has_problems,
+        'has_solutions': has_solutions,
+        'created_at': datetime(2024, 5, day, tzinfo=timezone.utc)
+    }
+
+
+def edges_by_type(edges):
+    grouped = {}
+    for source, target, kind, confidence, evidence in edges:
+        grouped.setdefault(kind, set()).add((source, target))
+    return grouped
+
+
+def test_symmetric_edges_are_written_in_both_directions():
+    reasoner = CrossContextReasoner(pool=object())
+    me = profile(10, speakers=['sascha'], concepts=['pricing', 'churn'])
+    other = profile(3, speakers=['sascha', 'mara'], concepts=['churn', 'pricing'])
+
+    edges = edges_by_type(reasoner._relationship_edges(me, [other], {}))
+
+    pair = {(me['document_id'], other['document_id']), (other['document_id'], me['document_id'])}
+    assert edges['people'] == pair
+    assert edges['topic'] == pair
+    assert edges['temporal'] == pair
+
+
+def test_temporal_edges_link_only_the_nearest_document_on_each_side():
+    reasoner = CrossContextReasoner(pool=object())
+    me = profile(10, concepts=['pricing'])
+    older, oldest = profile(8, concepts=['pricing']), profile(1, concepts=['pricing'])
+    newer = profile(12, concepts=['pricing'])
+
+    edges = edges_by_type(reasoner._relationship_edges(me, [oldest, older, newer], {}))
+
+    linked = {target for source, target in edges['temporal'] if source == me['document_id']}
+    assert linked == {older['document_id'], newer['document_id']}
+
+
+def test_solution_match_points_from_need_to_solution():
+    reasoner = CrossContextReasoner(pool=object())
+    me = profile(10, speakers=['sascha'], has_problems=True)
+    other = profile(11, speakers=['sascha'], has_solutions=True)
+
+    edges = edges_by_type(reasoner._relationship_edges(me, [other], {}))
+
+    assert edges['solution_match'] == {(me['document_id'], other['document_id'])}
@@ -0,0 +1,81 @@
+"""
+Tests for the dense embedding backends
+Vector fitting and request batching, without loading a model or calling OpenAI
+"""
+
+import asyncio
+
+import numpy as np
+import pytest
+
+from core.embedding_backends import STORAGE_DIMENSIONS, MicroBatcher, fit_to_dimensions
+
+
+def test_fit_to_dimensions_normalises_and_pads():
+    vectors = fit_to_dimensions(np.array([[3.0, 4.0], [0.0, 2.0]]))
+
+    assert vectors.shape == (2, STORAGE_DIMENSIONS)
+    np.testing.assert_allclose(vectors[:, :2], [[0.6, 0.8], [0.0, 1.0]])
+    assert not vectors[:, 2:].any()
+
+
+def test_fit_to_dimensions_keeps_cosine_similarity():
+    a, b = np.array([1.0, 2.0, 3.0]), np.array([2.0, 0.5, 1.0])
+    fitted = fit_to_dimensions(np.stack([a, b]))
+
+    cosine = a @ b / (np.linalg.norm(a) * np.linalg.norm(b))
+    assert fitted[0] @ fitted[1] == pytest.approx(cosine, rel=1e-6)
+
+
+def test_fit_to_dimensions_rejects_wider_vectors():
+    with pytest.raises(ValueError):
+        fit_to_dimensions(np.ones((1, STORAGE_DIMENSIONS + 1)))
+
+
+def fake_process(calls, fail_on=None):
+    async def process(texts):
+        calls.append(list(texts))
+        if fail_on in texts:
+            raise RuntimeError("rate limited")
+        return [[float(len(text))] for text in texts]
+    return process
+
+
+def test_micro_batcher_coalesces_concurrent_calls():
+    calls = []
+    batcher = MicroBatcher(fake_process(calls), max_batch_size=10, max_wait=0.02)
+
+    async def main():
+        return await asyncio.gather(
+            batcher.submit(["a"]), batcher.submit(["bb", "ccc"]), batcher.submit(["dddd"])
+        )
+
+    results = asyncio.run(main())
+
+    assert calls == [["a", "bb", "ccc", "dddd"]]
+    assert results == [[[1.0]], [[2.0], [3.0]], [[4.0]]]
+
+
+def test_micro_batcher_splits_at_max_batch_size():
+    calls = []
+    batcher = MicroBatcher(fake_process(calls), max_batch_size=2, max_wait=0.02)
+
+    async def main():
+        return await asyncio.gather(*(batcher.submit([str(i)]) for i in range(5)))
+
+    results = asyncio.run(main())
+
+    assert [len(batch) for batch in calls] == [2, 2, 1]
+    assert results == [[[1.0]]] * 5
+
+
+def test_micro_batcher_fails_every_caller_of_a_failed_batch():
+    calls = []
+    batcher = MicroBatcher(fake_process(calls, fail_on="bad"), max_batch_size=10, max_wait=0.02)
+
+    async def main():
+        return await asyncio.gather(batcher.submit(["ok"]), batcher.submit(["bad"]), return_exceptions=True)
+
+    results = asyncio.run(main())
+
+    assert all(isinstance(result, RuntimeError) for result in results)
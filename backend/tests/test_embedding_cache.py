@@ -0,0 +1,119 @@
+"""
+Tests for the query embedding cache (in-process tier; Redis disabled)
+"""
+
+import asyncio
+
+from core.embedding_cache import QueryEmbeddingCache, normalize_query
+
+
+def local_cache(**kwargs):
+    return QueryEmbeddingCache(redis_url='', **kwargs)
+
+
+def test_normalize_query_collapses_whitespace():
+    assert normalize_query("  was hat\tSascha \n gesagt ") == "was hat Sascha gesagt"
+
+
+def test_repeated_queries_are_served_from_cache():
+    cache = local_cache(max_entries=10)
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        return [0.1, 0.2]
+
+    async def main():
+        first = await cache.get_or_compute('model', "Preismodell  Q3", compute)
+        second = await cache.get_or_compute('model', "Preismodell Q3", compute)
+        other_model = await cache.get_or_compute('other', "Preismodell Q3", compute)
+        return first, second, other_model
+
+    first, second, _ = asyncio.run(main())
+
+    assert first == second == [0.1, 0.2]
+    assert len(calls) == 2
+    assert cache.get_stats()['hits'] == 1
+
+
+def test_concurrent_misses_share_one_computation():
+    cache = local_cache(max_entries=10)
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return [1.0]
+
+    async def main():
+        return await asyncio.gather(*(cache.get_or_compute('model', "q", compute) for _ in range(5)))
+
+    results = asyncio.run(main())
+
+    assert results == [[1.0]] * 5
+    assert len(calls) == 1
+    assert cache.get_stats()['coalesced'] == 4
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = local_cache(max_entries=2)
+
+    async def main():
+        for text in ("a", "b", "a", "c"):
+            await cache.get_or_compute('model', text, lambda: asyncio.sleep(0, [0.0]))
+
+    asyncio.run(main())
+
+    assert cache._get_local(cache._key('model', "a")) is not None
+    assert cache._get_local(cache._key('model', "b")) is None
+    assert cache.get_stats()['evictions'] == 1
+
+
+def test_cancelled_caller_does_not_cancel_the_shared_computation():
+    cache = local_cache(max_entries=10)
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return [1.0]
+
+    async def main():
+        leader = asyncio.create_task(cache.get_or_compute('model', "q", compute))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(cache.get_or_compute('model', "q", compute))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        return await follower, leader
+
+    follower_result, leader = asyncio.run(main())
+
+    assert leader.cancelled()
+    assert follower_result == [1.0]
+    assert len(calls) == 1
+    assert cache._get_local(cache._key('model', "q")) == [1.0]
+
+
+def test_failed_computation_reaches_every_caller_and_is_retried():
+    cache = local_cache(max_entries=10)
+    attempts = []
+
+    async def flaky():
+        attempts.append(1)
+        await asyncio.sleep(0.01)
+        if len(attempts) == 1:
+            raise RuntimeError("rate limited")
+        return [2.0]
+
+    async def main():
+        first = await asyncio.gather(
+            cache.get_or_compute('model', "q", flaky), cache.get_or_compute('model', "q", flaky),
+            return_exceptions=True
+        )
+        return first, await cache.get_or_compute('model', "q", flaky)
+
+    first, retried = asyncio.run(main())
+
+    assert all(isinstance(result, RuntimeError) for result in first)
+    assert retried == [2.0]
+    assert len(attempts) == 2
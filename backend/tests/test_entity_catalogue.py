@@ -0,0 +1,83 @@
+"""
+Tests for the entity catalogue
+Trigram matching and reloads against a fake pool
+"""
+
+import asyncio
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+
+from core.entity_catalogue import EntityCatalogue, TrigramIndex, normalize_entity
+
+
+class FakeConnection:
+    def __init__(self, db, on_fetch=None):
+        self.db = db
+        self.on_fetch = on_fetch
+
+    async def fetch(self, sql, *args):
+        if self.on_fetch:
+            self.on_fetch()
+        if 'FROM documents' in sql:
+            return [
+                {'id': i, 'title': doc['title'], 'channel': doc.get('channel'),
+                 'created_at': datetime(2024, 1, i + 1, tzinfo=timezone.utc)}
+                for i, doc in enumerate(self.db['documents'])
+            ]
+        return [{'speaker': speaker} for speaker in self.db['speakers']]
+
+
+class FakePool:
+    def __init__(self, db):
+        self.db = db
+        self.on_fetch = None
+
+    @asynccontextmanager
+    async def acquire(self):
+        yield FakeConnection(self.db, self.on_fetch)
+
+
+def names(entries):
+    return [entry.name for entry in entries]
+
+
+def test_normalize_entity():
+    assert normalize_entity("  Sascha  Müller ") == "sascha müller"
+
+
+def test_trigram_index_ranks_closest_entries_first():
+    index = TrigramIndex()
+    for title in ("Kubernetes Deployment", "Kubernetes Operator Basics", "Sales Meeting"):
+        index.add(title, 'title')
+
+    assert index.add("kubernetes  deployment", 'title') is False
+    assert names(index.candidates("kubernets deploy"))[0] == "Kubernetes Deployment"
+    assert "Sales Meeting" not in names(index.candidates("kubernetes"))
+    assert index.candidates("kubernetes", kinds=('speaker',)) == []
+
+
+def test_invalidate_drops_deleted_documents():
+    db = {'documents': [{'title': 'Pricing Workshop'}, {'title': 'Hiring Plan'}], 'speakers': ['Sascha']}
+    catalogue = EntityCatalogue(pool=FakePool(db))
+
+    assert names(asyncio.run(catalogue.lookup("pricing workshop"))) == ['Pricing Workshop']
+
+    db['documents'].pop(0)
+    catalogue.invalidate()
+
+    assert asyncio.run(catalogue.lookup("pricing workshop")) == []
+    assert names(asyncio.run(catalogue.lookup("hiring plan"))) == ['Hiring Plan']
+
+
+def test_load_keeps_entities_ingested_while_loading():
+    db = {'documents': [{'title': 'Hiring Plan'}], 'speakers': []}
+    pool = FakePool(db)
+    catalogue = EntityCatalogue(pool=pool)
+
+    # A document arrives after the load started but is not in its snapshot
+    pool.on_fetch = lambda: catalogue.add_document(title='Roadmap Review', speakers=['Mara'])
+    asyncio.run(catalogue.ensure_fresh())
+
+    assert names(asyncio.run(catalogue.lookup("roadmap review"))) == ['Roadmap Review']
+    assert names(asyncio.run(catalogue.lookup("mara", kinds=('speaker',)))) == ['Mara']
+    assert catalogue._pending is None
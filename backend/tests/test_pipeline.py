@@ -0,0 +1,160 @@
+"""
+Tests for the staged pipeline executor
+"""
+
+import asyncio
+
+import pytest
+
+from core.pipeline import Stage, StagedPipeline
+
+
+def run(pipeline):
+    return asyncio.run(pipeline.run())
+
+
+def test_independent_stages_run_concurrently():
+    async def sleep_then(value):
+        await asyncio.sleep(0.1)
+        return value
+
+    pipeline = StagedPipeline([
+        Stage('a', lambda _: sleep_then(1)),
+        Stage('b', lambda _: sleep_then(2)),
+        Stage('sum', lambda inputs: sleep_then(inputs['a'] + inputs['b']), depends_on=('a', 'b'))
+    ])
+
+    loop = asyncio.new_event_loop()
+    start = loop.time()
+    results = loop.run_until_complete(pipeline.run())
+    elapsed = loop.time() - start
+    loop.close()
+
+    assert results == {'a': 1, 'b': 2, 'sum': 3}
+    # a and b overlap: two sleeps, not three
+    assert elapsed < 0.25
+
+
+def test_failures_and_timeouts_yield_defaults():
+    async def fail(_):
+        raise RuntimeError("boom")
+
+    async def hang(_):
+        await asyncio.sleep(10)
+
+    async def use(inputs):
+        return (inputs['broken'], inputs['slow'])
+
+    pipeline = StagedPipeline([
+        Stage('broken', fail, default=[]),
+        Stage('slow', hang, timeout=0.01, default='fallback'),
+        Stage('after', use, depends_on=('broken', 'slow'))
+    ])
+
+    results = run(pipeline)
+
+    assert results['after'] == ([], 'fallback')
+    assert pipeline.timings['broken'].status == 'error'
+    assert pipeline.timings['broken'].error == 'boom'
+    assert pipeline.timings['slow'].status == 'timeout'
+
+
+def test_on_complete_can_cancel_running_and_pending_stages():
+    async def fast(_):
+        return 'found'
+
+    async def slow(_):
+        await asyncio.sleep(10)
+        return 'late'
+
+    def on_complete(pipeline, name, result):
+        if name == 'fast':
+            pipeline.cancel('slow', 'later')
+
+    pipeline = StagedPipeline([
+        Stage('fast', fast),
+        Stage('slow', slow, default=None),
+        Stage('later', slow, depends_on=('slow',), default='skipped')
+    ], on_complete=on_complete)
+
+    results = run(pipeline)
+
+    assert results == {'fast': 'found', 'slow': None, 'later': 'skipped'}
+    assert pipeline.timings['slow'].status == 'cancelled'
+    assert pipeline.timings['later'].status == 'skipped'
+
+
+def test_unknown_dependency_is_rejected():
+    with pytest.raises(ValueError):
+        StagedPipeline([Stage('b', lambda _: None, depends_on=('a',))])
+
+
+def test_stage_cancelled_from_below_yields_its_default():
+    async def main():
+        shared = asyncio.get_running_loop().create_future()
+
+        async def waits_on_shared(_):
+            return await shared
+
+        async def cancels_shared(_):
+            await asyncio.sleep(0.01)
+            shared.cancel()
+            return 'done'
+
+        pipeline = StagedPipeline([
+            Stage('follower', waits_on_shared, default='fallback'),
+            Stage('other', cancels_shared)
+        ])
+        return pipeline, await pipeline.run()
+
+    pipeline, results = asyncio.run(main())
+
+    assert results == {'follower': 'fallback', 'other': 'done'}
+    assert pipeline.timings['follower'].status == 'cancelled'
+
+
+def test_cancelling_the_pipeline_cancels_its_stages():
+    started, finished = [], []
+
+    async def slow(_):
+        started.append(1)
+        await asyncio.sleep(10)
+        finished.append(1)
+
+    async def main():
+        pipeline = StagedPipeline([Stage('slow', slow)])
+        task = asyncio.create_task(pipeline.run())
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        await asyncio.sleep(0)
+
+    asyncio.run(main())
+
+    assert started == [1] and finished == []
+
+
+def test_timed_out_leader_does_not_cancel_a_coalesced_stage():
+    # Two stages embedding the same query through the cache; the one that
+    # started the computation times out first
+    from core.embedding_cache import QueryEmbeddingCache
+
+    cache = QueryEmbeddingCache(redis_url='', max_entries=10)
+
+    async def compute():
+        await asyncio.sleep(0.05)
+        return [1.0]
+
+    def embed(_):
+        return cache.get_or_compute('model', "q", compute)
+
+    pipeline = StagedPipeline([
+        Stage('leader', embed, timeout=0.01, default=None),
+        Stage('dense', embed, timeout=1)
+    ])
+
+    results = run(pipeline)
+
+    assert results == {'leader': None, 'dense': [1.0]}
+    assert pipeline.timings['leader'].status == 'timeout'
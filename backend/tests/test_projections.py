@@ -0,0 +1,26 @@
+"""
+Tests for the column projections
+"""
+
+from core.projections import (
+    CHUNK_COLUMNS, CHUNK_FIELDS, DOCUMENT_COLUMNS, DOCUMENT_DETAIL_COLUMNS, columns
+)
+
+
+def test_columns_are_qualified_with_the_alias():
+    assert columns('c', ('id', 'content')) == "c.id, c.content"
+
+
+def test_chunk_projection_leaves_out_vectors_and_search_columns():
+    selected = {column.strip().split()[0] for column in CHUNK_COLUMNS.split(',')}
+
+    assert 'c.content' in selected and 'd.title' in selected
+    assert not {'c.embedding', 'c.tokens', 'c.metadata'} & selected
+    assert '*' not in CHUNK_COLUMNS
+    assert len(CHUNK_FIELDS) == len(set(CHUNK_FIELDS))
+
+
+def test_full_content_only_in_the_detail_projection():
+    assert 'full_content' not in DOCUMENT_COLUMNS
+    assert 'summary_embedding' not in DOCUMENT_COLUMNS + DOCUMENT_DETAIL_COLUMNS
+    assert 'd.full_content' in DOCUMENT_DETAIL_COLUMNS
@@ -0,0 +1,134 @@
+"""
+Tests for HybridRetriever.search
+ef_search handling of the filtered over-fetch and refill, against a fake connection
+"""
+
+import asyncio
+import uuid
+from contextlib import asynccontextmanager
+
+from core.retrieval import HybridRetriever, MAX_EF_SEARCH, clamp_ef_search
+from core.search_filters import SearchFilters
+
+
+class FakeConnection:
+    """Records hybrid_search calls and ef_search settings; pgvector's range check included"""
+
+    def __init__(self, pgvector_version: str, matches: int):
+        self.pgvector_version = pgvector_version
+        self.matches = [
+            {'chunk_id': uuid.uuid4(), 'document_id': uuid.uuid4(), 'content': f"chunk {i}",
+             'chunk_index': i, 'similarity': 0.9 - i / 100, 'rank': 0.9 - i / 100, 'metadata': {}}
+            for i in range(matches)
+        ]
+        self.match_counts = []
+        self.ef_search = []
+
+    async def fetchval(self, sql, *args):
+        assert 'pg_extension' in sql
+        return self.pgvector_version
+
+    async def execute(self, sql, *args):
+        if 'hnsw.ef_search' in sql:
+            value = int(args[0])
+            if not 1 <= value <= 1000:
+                raise ValueError(f'{value} is outside the valid range for parameter "hnsw.ef_search" (1 .. 1000)')
+            self.ef_search.append(value)
+
+    async def fetch(self, sql, *args):
+        if 'hybrid_search' in sql:
+            self.match_counts.append(args[2])
+            return self.matches[:args[2]]
+        # Enrichment queries
+        return []
+
+    @asynccontextmanager
+    async def transaction(self):
+        yield
+
+
+class FakePool:
+    def __init__(self, conn):
+        self.conn = conn
+
+    @asynccontextmanager
+    async def acquire(self):
+        yield self.conn
+
+
+class FakeEmbeddings:
+    async def get_dense_embedding(self, text):
+        return [0.0] * 1536
+
+
+def search(conn, **kwargs):
+    retriever = HybridRetriever(pool=FakePool(conn))
+    retriever.embedding_service = FakeEmbeddings()
+    return asyncio.run(retriever.search(
+        query="preismodell", use_colbert_rerank=False, context_window=0, **kwargs
+    ))
+
+
+def test_clamp_ef_search():
+    assert clamp_ef_search(40) == 40
+    assert clamp_ef_search(1600) == MAX_EF_SEARCH
+    assert clamp_ef_search(0) == 1
+
+
+def test_default_search_sets_ef_search_for_every_vector_candidate():
+    for top_k in (3, 20, 100):
+        conn = FakeConnection(pgvector_version='0.8.0', matches=top_k * 2)
+
+        search(conn, top_k=top_k)
+
+        # hybrid_search asks the vector index for twice the match count
+        match_count, = conn.match_counts
+        assert conn.ef_search == [max(40, match_count * 2)]
+
+
+def test_explicit_ef_search_is_raised_to_the_candidate_count():
+    conn = FakeConnection(pgvector_version='0.8.0', matches=10)
+
+    search(conn, top_k=20, ef_search=20)
+
+    assert conn.ef_search == [80]
+
+
+def test_sparse_filtered_search_with_limit_100_stays_in_ef_search_range():
+    # pgvector without iterative scans: refill, but never past ef_search 1000
+    conn = FakeConnection(pgvector_version='0.7.4', matches=7)
+
+    results = search(conn, top_k=100, filters=SearchFilters(speaker='Sascha'), ef_search=200)
+
+    assert len(results) == 7
+    assert conn.ef_search and max(conn.ef_search) <= MAX_EF_SEARCH
+    assert all(count * 2 <= MAX_EF_SEARCH for count in conn.match_counts)
+    # 200 first, then one refill capped at 500 (ef_search 1000); it found nothing new
+    assert conn.match_counts == [200, 500]
+
+
+def test_refill_skipped_with_iterative_scan():
+    conn = FakeConnection(pgvector_version='0.8.0', matches=7)
+
+    results = search(conn, top_k=100, filters=SearchFilters(speaker='Sascha'))
+
+    assert len(results) == 7
+    assert conn.match_counts == [200]
+
+
+def test_refill_without_filters_never_runs():
+    conn = FakeConnection(pgvector_version='0.7.4', matches=3)
+
+    search(conn, top_k=20)
+
+    assert conn.match_counts == [40]
+
+
+def test_refill_factors_stay_below_limit_for_small_top_k():
+    conn = FakeConnection(pgvector_version='0.7.4', matches=2)
+
+    search(conn, top_k=20, filters=SearchFilters(chunk_type='summary'))
+
+    # 40, then 160; the refill found nothing new, so the wider factor is skipped
+    assert conn.match_counts == [40, 160]
+    assert max(conn.ef_search) <= MAX_EF_SEARCH
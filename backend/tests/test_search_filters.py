@@ -0,0 +1,50 @@
+"""
+Tests for the search filter model
+"""
+
+import json
+from datetime import datetime, timezone
+
+from core.search_filters import SearchFilters
+
+
+def test_empty_filters_compile_to_null():
+    filters = SearchFilters()
+
+    assert filters.is_empty()
+    assert filters.to_jsonb() is None
+
+
+def test_fields_compile_to_the_sql_shape():
+    filters = SearchFilters(
+        speaker='Sascha',
+        start_date=datetime(2024, 5, 1, tzinfo=timezone.utc),
+        document_ids=['a', 'b'],
+        chunk_type='summary'
+    )
+
+    assert json.loads(filters.to_jsonb()) == {
+        'speaker': 'Sascha',
+        'start_date': '2024-05-01T00:00:00+00:00',
+        'document_ids': ['a', 'b'],
+        'chunk_type': 'summary'
+    }
+
+
+def test_from_value_accepts_dicts_and_keeps_unknown_keys_as_metadata():
+    filters = SearchFilters.from_value({
+        'speaker': 'Mara',
+        'end_date': '2024-06-01T12:00:00Z',
+        'topic': 'pricing'
+    })
+
+    assert filters.speaker == 'Mara'
+    assert filters.end_date == datetime(2024, 6, 1, 12, tzinfo=timezone.utc)
+    assert filters.metadata == {'topic': 'pricing'}
+
+
+def test_from_value_passes_through_filters_and_none():
+    filters = SearchFilters(source_type='youtube')
+
+    assert SearchFilters.from_value(filters) is filters
+    assert SearchFilters.from_value(None) is None
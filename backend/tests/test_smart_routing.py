@@ -0,0 +1,215 @@
+"""
+Tests for the speaker and temporal routes
+Cursor encoding and page-by-page traversal against a fake hybrid_search
+"""
+
+import asyncio
+import base64
+import json
+import time
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+
+from core.entity_catalogue import EntityCatalogue
+from core.smart_routing import (
+    ROUTE_MAX_DEPTH, SmartQueryRouter, decode_cursor, encode_cursor
+)
+
+
+class FakeConnection:
+    """hybrid_search over an in-memory ranking, with the route's keyset predicate"""
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.calls = []
+
+    async def execute(self, sql, *args):
+        pass
+
+    async def fetch(self, sql, *args):
+        assert 'hybrid_search' in sql and 'c.embedding' not in sql
+        _, _, match_count, filters, after_rank, after_id, limit = args
+        filters = json.loads(filters) if filters else {}
+        self.calls.append({'match_count': match_count, 'filters': filters})
+
+        ranked = [c for c in self.chunks
+                  if not filters.get('speaker') or (c['speaker'] or '').lower() == filters['speaker'].lower()]
+        ranked = sorted(ranked, key=lambda c: (c['rank'], c['id']), reverse=True)[:match_count]
+        if after_rank is not None:
+            ranked = [c for c in ranked if (c['rank'], c['id']) < (after_rank, uuid.UUID(after_id))]
+        return [dict(c) for c in ranked[:limit]]
+
+    @asynccontextmanager
+    async def transaction(self):
+        yield
+
+
+class FakePool:
+    def __init__(self, conn):
+        self.conn = conn
+
+    @asynccontextmanager
+    async def acquire(self):
+        yield self.conn
+
+
+class FakeEmbeddings:
+    async def get_dense_embedding(self, text):
+        return [0.0] * 1536
+
+
+def make_chunks(count, speaker=None):
+    return [
+        {'id': uuid.uuid4(), 'document_id': uuid.uuid4(), 'content': f"chunk {i}",
+         'speaker': speaker, 'rank': round(1 - i / 100, 2), 'document_title': 'Meeting'}
+        for i in range(count)
+    ]
+
+
+def loaded_catalogue(speakers=()):
+    """A catalogue that is already loaded and fresh, so it never queries the database"""
+    catalogue = EntityCatalogue(pool=object())
+    for speaker in speakers:
+        catalogue.index.add(speaker, 'speaker')
+    catalogue.loaded = True
+    catalogue._refreshed_at = time.monotonic()
+    return catalogue
+
+
+def router_for(conn, speakers=()):
+    router = SmartQueryRouter(pool=FakePool(conn), catalogue=loaded_catalogue(speakers))
+    router.embedding_service = FakeEmbeddings()
+    return router
+
+
+def all_pages(router, query, limit):
+    pages, cursor = [], None
+    while True:
+        result = asyncio.run(router.route_query(query, cursor=cursor, limit=limit))
+        pages.append(result)
+        cursor = result['next_cursor']
+        if cursor is None:
+            return pages
+
+
+def test_cursor_round_trip():
+    chunk_id = uuid.uuid4()
+    since = datetime(2024, 5, 1, tzinfo=timezone.utc)
+
+    after = decode_cursor(encode_cursor(0.42, chunk_id, 'temporal', since.isoformat()))
+
+    assert after == {'rank': 0.42, 'chunk_id': str(chunk_id), 'scope': 'temporal', 'since': since}
+    assert decode_cursor(encode_cursor(0.1, chunk_id, 'speaker'))['since'] is None
+
+
+def test_decode_cursor_rejects_malformed_input():
+    def encoded(payload):
+        return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+    assert decode_cursor(None) is None
+    assert decode_cursor("") is None
+    assert decode_cursor("not base64!") is None
+    assert decode_cursor(encoded(123)) is None
+    assert decode_cursor(encoded({'rank': 0.5, 'scope': 'speaker'})) is None
+    assert decode_cursor(encoded({'rank': 0.5, 'chunk_id': 'x', 'scope': 'speaker'})) is None
+    assert decode_cursor(encoded({'rank': 'high', 'chunk_id': str(uuid.uuid4()), 'scope': 'speaker'})) is None
+
+
+def test_temporal_pages_cover_the_ranking_once_with_the_same_window():
+    conn = FakeConnection(make_chunks(45))
+
+    pages = all_pages(router_for(conn), "was war letzte woche", limit=20)
+
+    ids = [c['id'] for page in pages for c in page['chunks']]
+    assert [len(page['chunks']) for page in pages] == [20, 20, 5]
+    assert len(set(ids)) == 45
+    # Every page ranks the same candidates inside the first page's window
+    assert {call['match_count'] for call in conn.calls} == {ROUTE_MAX_DEPTH}
+    assert len({call['filters']['start_date'] for call in conn.calls}) == 1
+    assert len({page['since_date'] for page in pages}) == 1
+
+
+def test_speaker_route_filters_by_speaker():
+    conn = FakeConnection(make_chunks(3, speaker='sascha') + make_chunks(5))
+
+    result = asyncio.run(router_for(conn).route_query("sascha hat gesagt", limit=10))
+
+    assert result['speaker_match'] is True
+    assert len(result['chunks']) == 3
+    assert result['next_cursor'] is None
+
+
+def test_speaker_route_resolves_multi_word_names():
+    chunks = make_chunks(3, speaker='Sascha Müller') + make_chunks(2, speaker='Mara Weber') + make_chunks(4)
+    router = router_for(FakeConnection(chunks), speakers=['Sascha Müller', 'Mara Weber', 'Sascha Berg'])
+
+    for query in ("sascha müller hat gesagt", "was hat sascha müller gesagt", "Was meinte Müller?", "was sagte saschas kollege müller"):
+        result = asyncio.run(router.route_query(query, limit=10))
+
+        assert result['speaker'] == 'Sascha Müller', query
+        assert result['speaker_match'] is True
+        assert len(result['chunks']) == 3
+
+
+def test_speaker_route_prefers_the_speaker_sharing_most_words():
+    chunks = make_chunks(2, speaker='Sascha Berg') + make_chunks(3, speaker='Sascha Müller')
+    router = router_for(FakeConnection(chunks), speakers=['Sascha Müller', 'Sascha Berg'])
+
+    result = asyncio.run(router.route_query("was hat sascha berg gesagt", limit=10))
+
+    assert result['speaker'] == 'Sascha Berg'
+    assert len(result['chunks']) == 2
+
+
+def test_speaker_route_keeps_the_extracted_name_for_unknown_speakers():
+    router = router_for(FakeConnection(make_chunks(4)), speakers=['Mara Weber'])
+
+    result = asyncio.run(router.route_query("jonas hat gesagt", limit=10))
+
+    assert result['speaker'] == 'jonas'
+    assert result['speaker_match'] is False
+
+
+def test_speaker_route_falls_back_to_mentions_across_pages():
+    conn = FakeConnection(make_chunks(12))
+
+    pages = all_pages(router_for(conn), "mara hat gesagt", limit=5)
+
+    assert all(page['speaker_match'] is False for page in pages)
+    assert len({c['id'] for page in pages for c in page['chunks']}) == 12
+
+
+class DocumentReferenceConnection:
+    """Documents and chunks for the document-reference route; records every query"""
+
+    def __init__(self):
+        self.queries = []
+
+    async def fetch(self, sql, *args):
+        self.queries.append(sql)
+        if 'FROM documents d' in sql:
+            return [{'id': uuid.uuid4(), 'title': 'Video von Max', 'source_type': 'youtube',
+                     'source_url': None, 'created_at': None}]
+        return [{'id': uuid.uuid4(), 'document_id': uuid.uuid4(), 'content': 'chunk', 'document_title': 'Video von Max'}]
+
+    async def fetchval(self, sql, *args):
+        self.queries.append(sql)
+        return 'Das komplette Transkript'
+
+
+def test_document_reference_loads_full_content_only_for_detail_questions():
+    router = SmartQueryRouter(pool=object())
+    entities = {'doc_type': 'video', 'author': 'max', 'topic': None}
+
+    conn = DocumentReferenceConnection()
+    result = asyncio.run(router._document_reference_search(conn, "video von max", entities))
+    assert result['used_full_content'] is False
+    assert not any('full_content' in sql for sql in conn.queries)
+    assert not any('c.*' in sql or 'c.embedding' in sql for sql in conn.queries)
+
+    conn = DocumentReferenceConnection()
+    result = asyncio.run(router._document_reference_search(conn, "das komplette video von max", entities))
+    assert result['used_full_content'] is True
+    assert result['chunks'][0]['content'] == 'Das komplette Transkript'
+    assert sum('full_content' in sql for sql in conn.queries) == 1
@@ -0,0 +1,34 @@
+"""
+Tests for the binary pgvector codec
+"""
+
+import struct
+
+import numpy as np
+import pytest
+
+from core.vector_codec import decode_vector, encode_vector
+
+
+def test_round_trip():
+    vector = np.random.default_rng(0).standard_normal(1536).astype(np.float32)
+
+    data = encode_vector(vector)
+
+    assert len(data) == 4 + 1536 * 4
+    np.testing.assert_array_equal(decode_vector(data), vector)
+
+
+def test_binary_layout_matches_pgvector():
+    data = encode_vector([1.0, -2.5])
+
+    assert data == struct.pack('>HHff', 2, 0, 1.0, -2.5)
+
+
+def test_accepts_lists_and_legacy_text():
+    assert encode_vector("[1.0, -2.5]") == encode_vector([1.0, -2.5])
+
+
+def test_rejects_matrices():
+    with pytest.raises(ValueError):
+        encode_vector([[1.0, 2.0]])
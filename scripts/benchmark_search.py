@@ -0,0 +1,532 @@
+#!/usr/bin/env python3
+"""
+Offline search benchmark for MyBrain
+Generates a synthetic German/English transcript corpus with speakers and timestamps,
+embeds it with a deterministic local stand-in for the OpenAI model, loads it into a
+local Postgres with pgvector and reports p50/p95 latency, QPS and recall@k for
+HybridRetriever.search, search_by_speaker, search_by_date_range and /quick.
+
+Nothing here talks to Supabase or OpenAI, so runs are reproducible and comparable
+between commits.
+
+Usage:
+    createdb mybrain_bench
+    python scripts/benchmark_search.py --database-url postgresql://localhost/mybrain_bench
+    python scripts/benchmark_search.py --database-url ... --sizes 10000,100000,1000000 --json results.json
+
+The corpus grows in place: each size only loads the chunks missing from the previous
+one, so the planted facts (the ground truth) stay the same while distractors grow.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+BACKEND_DIR = Path(__file__).parent.parent / "backend"
+MIGRATIONS_DIR = Path(__file__).parent.parent / "supabase" / "migrations"
+
+EMBEDDING_DIM = 1536
+CHUNKS_PER_DOCUMENT = 20
+SECONDS_PER_CHUNK = 30.0
+BASE_DATE = datetime(2024, 1, 1, tzinfo=timezone.utc)
+DATE_SPAN_MINUTES = 730 * 24 * 60
+LOAD_BATCH_DOCUMENTS = 250
+
+# Facts are planted in the first 10k chunks, which every benchmark size contains
+PLANTED_DOCUMENTS = 10000 // CHUNKS_PER_DOCUMENT
+FACT_COPIES = 3
+
+ID_NAMESPACE = uuid.UUID('6f1c6b1e-6d1a-4c47-9a55-5d3b2f0c7e11')
+
+SPEAKERS = [
+    'Anna Schmidt', 'Jonas Becker', 'Lena Hoffmann', 'Felix Wagner', 'Marie Keller',
+    'David Miller', 'Sarah Johnson', 'Tom Fischer', 'Laura Weber', 'Chris Taylor'
+]
+
+TOPICS = {
+    'de': [
+        ['vertrieb', 'kunden', 'angebot', 'umsatz', 'pipeline', 'abschluss', 'preis'],
+        ['software', 'datenbank', 'server', 'deployment', 'fehler', 'schnittstelle', 'latenz'],
+        ['marketing', 'kampagne', 'zielgruppe', 'budget', 'reichweite', 'inhalte', 'marke'],
+        ['team', 'einstellung', 'onboarding', 'feedback', 'meeting', 'ziele', 'prozess'],
+        ['finanzen', 'rechnung', 'steuer', 'liquiditaet', 'kosten', 'planung', 'bank'],
+        ['produkt', 'roadmap', 'funktion', 'nutzer', 'prototyp', 'design', 'test']
+    ],
+    'en': [
+        ['sales', 'customers', 'offer', 'revenue', 'pipeline', 'closing', 'pricing'],
+        ['software', 'database', 'server', 'deployment', 'bug', 'interface', 'latency'],
+        ['marketing', 'campaign', 'audience', 'budget', 'reach', 'content', 'brand'],
+        ['team', 'hiring', 'onboarding', 'feedback', 'meeting', 'goals', 'process'],
+        ['finance', 'invoice', 'tax', 'cash', 'costs', 'planning', 'bank'],
+        ['product', 'roadmap', 'feature', 'users', 'prototype', 'design', 'testing']
+    ]
+}
+
+TEMPLATES = {
+    'de': [
+        "Wir haben heute über {a} und {b} gesprochen, vor allem wegen {c}.",
+        "Beim Thema {a} ist mir aufgefallen, dass {b} oft unterschätzt wird.",
+        "Ich glaube, {a} hängt direkt mit {b} zusammen, und {c} zeigt das.",
+        "Nächste Woche sollten wir {a} noch einmal prüfen, besonders {b}.",
+        "Die Frage ist, wie wir {a} verbessern, ohne {b} zu vernachlässigen."
+    ],
+    'en': [
+        "Today we talked about {a} and {b}, mostly because of {c}.",
+        "On the topic of {a} I noticed that {b} is often underestimated.",
+        "I think {a} is directly tied to {b}, and {c} shows that.",
+        "Next week we should review {a} again, especially {b}.",
+        "The question is how we improve {a} without neglecting {b}."
+    ]
+}
+
+FACT_TEMPLATES = {
+    'de': "{code} war das eigentliche Thema: {speaker} erklärte, warum {code} für {topic} entscheidend ist.",
+    'en': "{code} was the real subject: {speaker} explained why {code} matters for {topic}."
+}
+
+QUERY_TEMPLATES = {
+    'de': "Was wurde über {code} und {topic} gesagt?",
+    'en': "What was said about {code} and {topic}?"
+}
+
+SYLLABLES = ['ka', 'lo', 'mir', 'tex', 'vu', 'zan', 'quo', 'rel', 'bis', 'nor', 'pha', 'gul']
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+
+def corpus_vocabulary() -> set:
+    """Words every generated transcript draws from (templates, topics, speakers)"""
+    words = set()
+    for language in TEMPLATES:
+        for text in TEMPLATES[language] + [FACT_TEMPLATES[language], QUERY_TEMPLATES[language]]:
+            words.update(_TOKEN.findall(text.lower()))
+        for topic in TOPICS[language]:
+            words.update(topic)
+    for speaker in SPEAKERS:
+        words.update(speaker.lower().split())
+    return words
+
+
+class HashingEmbedder:
+    """
+    Deterministic local stand-in for text-embedding-3-small
+
+    Every token maps to a fixed pseudo-random direction seeded by its hash; a text
+    is the normalised weighted sum of its tokens. Frequent corpus words are damped
+    the way a trained model discounts filler, so texts sharing distinctive words are
+    close. The vectors have the production dimension.
+    """
+
+    def __init__(self, dim: int = EMBEDDING_DIM, common_words: Optional[set] = None,
+                 common_weight: float = 0.2):
+        self.dim = dim
+        self.common_words = corpus_vocabulary() if common_words is None else common_words
+        self.common_weight = common_weight
+        self._token_vectors: Dict[str, np.ndarray] = {}
+
+    def _token_vector(self, token: str) -> np.ndarray:
+        vector = self._token_vectors.get(token)
+        if vector is None:
+            seed = int.from_bytes(hashlib.blake2b(token.encode(), digest_size=8).digest(), 'little')
+            vector = np.random.default_rng(seed).standard_normal(self.dim).astype(np.float32)
+            if token in self.common_words:
+                vector *= self.common_weight
+            self._token_vectors[token] = vector
+        return vector
+
+    def embed(self, text: str) -> np.ndarray:
+        tokens = _TOKEN.findall(text.lower()) or ['<empty>']
+        vector = np.sum([self._token_vector(t) for t in tokens], axis=0)
+        return vector / np.linalg.norm(vector)
+
+    async def get_dense_embedding(self, text: str, use_cache: bool = True) -> np.ndarray:
+        """Same call the retriever makes on the real embedding service"""
+        return self.embed(text)
+
+
+class SyntheticCorpus:
+    """Deterministic transcript corpus with planted facts as ground truth"""
+
+    def __init__(self, seed: int, n_facts: int):
+        self.seed = seed
+        self.facts = []
+        self.planted: Dict[Tuple[int, int], int] = {}  # (document, chunk_index) -> fact
+
+        rng = np.random.default_rng(seed)
+        for fact_no in range(n_facts):
+            code = ''.join(rng.choice(SYLLABLES, size=3)) + str(fact_no)
+            language = 'de' if fact_no % 5 < 3 else 'en'
+            topic_words = TOPICS[language][fact_no % len(TOPICS[language])]
+            fact = {
+                'code': code,
+                'language': language,
+                'topic': topic_words[fact_no % len(topic_words)],
+                'speaker': SPEAKERS[fact_no % len(SPEAKERS)],
+                'locations': []
+            }
+
+            for copy in range(FACT_COPIES):
+                document = (fact_no * 7 + copy * 131) % PLANTED_DOCUMENTS
+                index = (fact_no + copy * 5) % CHUNKS_PER_DOCUMENT
+                # Probe for a free slot so facts never share a chunk
+                while (document, index) in self.planted:
+                    index = (index + 1) % CHUNKS_PER_DOCUMENT
+                    if index == 0:
+                        document = (document + 1) % PLANTED_DOCUMENTS
+                self.planted[(document, index)] = fact_no
+                fact['locations'].append((document, index))
+
+            self.facts.append(fact)
+
+    @staticmethod
+    def document_id(document: int) -> uuid.UUID:
+        return uuid.uuid5(ID_NAMESPACE, f"document-{document}")
+
+    @staticmethod
+    def chunk_id(document: int, index: int) -> uuid.UUID:
+        return uuid.uuid5(ID_NAMESPACE, f"chunk-{document}-{index}")
+
+    @staticmethod
+    def document_date(document: int) -> datetime:
+        return BASE_DATE + timedelta(minutes=(document * 7919) % DATE_SPAN_MINUTES)
+
+    def document(self, document: int) -> Tuple[Dict, List[Dict]]:
+        """Document row and its chunk rows"""
+        rng = np.random.default_rng([self.seed, document])
+        language = 'de' if rng.random() < 0.6 else 'en'
+        topics = TOPICS[language]
+        main_topic = topics[int(rng.integers(len(topics)))]
+        speakers = list(rng.choice(SPEAKERS, size=2 + int(rng.integers(2)), replace=False))
+
+        chunks = []
+        summary_terms = set(main_topic[:3])
+        for index in range(CHUNKS_PER_DOCUMENT):
+            speaker = speakers[index % len(speakers)]
+            sentences = []
+            for _ in range(3):
+                words = rng.choice(main_topic, size=3, replace=False)
+                template = TEMPLATES[language][int(rng.integers(len(TEMPLATES[language])))]
+                sentences.append(template.format(a=words[0], b=words[1], c=words[2]))
+
+            fact_no = self.planted.get((document, index))
+            if fact_no is not None:
+                fact = self.facts[fact_no]
+                speaker = fact['speaker']
+                # Fact first, so it survives the /quick answer truncation
+                sentences.insert(0, FACT_TEMPLATES[language].format(
+                    code=fact['code'], speaker=speaker, topic=fact['topic']
+                ))
+                summary_terms.add(fact['code'])
+
+            chunks.append({
+                'id': self.chunk_id(document, index),
+                'content': ' '.join(sentences),
+                'chunk_index': index,
+                'speaker': speaker,
+                'start_time': index * SECONDS_PER_CHUNK,
+                'end_time': (index + 1) * SECONDS_PER_CHUNK,
+                'language': language
+            })
+
+        doc = {
+            'id': self.document_id(document),
+            'title': f"{'Besprechung' if language == 'de' else 'Meeting'} {main_topic[0]} #{document}",
+            'source_type': 'audio' if document % 3 else 'youtube',
+            'language': language,
+            'created_at': self.document_date(document),
+            'duration_seconds': int(CHUNKS_PER_DOCUMENT * SECONDS_PER_CHUNK),
+            'summary': ' '.join(sorted(summary_terms))
+        }
+        return doc, chunks
+
+    def relevant_chunks(self, fact_no: int, speaker: Optional[str] = None,
+                        start: Optional[datetime] = None, end: Optional[datetime] = None) -> set:
+        """Ground truth: planted chunks of a fact passing the given restrictions"""
+        fact = self.facts[fact_no]
+        relevant = set()
+        for document, index in fact['locations']:
+            if speaker and fact['speaker'] != speaker:
+                continue
+            created = self.document_date(document)
+            if (start and created < start) or (end and created > end):
+                continue
+            relevant.add(self.chunk_id(document, index))
+        return relevant
+
+
+async def prepare_schema(conn, reset: bool):
+    """Apply the migrations to an empty database, optionally clearing old data"""
+    exists = await conn.fetchval("SELECT to_regclass('public.chunks') IS NOT NULL")
+    if not exists:
+        for migration in sorted(MIGRATIONS_DIR.glob("*.sql")):
+            print(f"Applying {migration.name}")
+            await conn.execute(migration.read_text())
+    elif reset:
+        await conn.execute("TRUNCATE documents CASCADE")
+        await conn.execute("TRUNCATE embedding_cache")
+
+
+async def load_corpus(conn, corpus: SyntheticCorpus, embedder: HashingEmbedder, target_chunks: int):
+    """Grow the corpus to target_chunks, rebuilding the vector indexes once afterwards"""
+    from core.chunk_writer import CHUNK_COLUMNS
+
+    present = await conn.fetchval("SELECT COUNT(*) FROM documents")
+    target_documents = target_chunks // CHUNKS_PER_DOCUMENT
+    if present >= target_documents:
+        return
+
+    # Inserting into an HNSW index row by row is far slower than one build
+    vector_indexes = await conn.fetch(
+        """
+        SELECT indexname, indexdef FROM pg_indexes
+        WHERE tablename IN ('chunks', 'documents')
+          AND (indexdef ILIKE '%hnsw%' OR indexdef ILIKE '%ivfflat%')
+        """
+    )
+    for index in vector_indexes:
+        await conn.execute(f"DROP INDEX {index['indexname']}")
+
+    document_columns = [
+        'id', 'title', 'source_type', 'language', 'created_at',
+        'duration_seconds', 'summary', 'summary_embedding'
+    ]
+
+    start = time.perf_counter()
+    for batch_start in range(present, target_documents, LOAD_BATCH_DOCUMENTS):
+        document_records, chunk_records = [], []
+        for document in range(batch_start, min(batch_start + LOAD_BATCH_DOCUMENTS, target_documents)):
+            doc, chunks = corpus.document(document)
+            document_records.append((
+                doc['id'], doc['title'], doc['source_type'], doc['language'], doc['created_at'],
+                doc['duration_seconds'], doc['summary'], embedder.embed(f"{doc['title']} {doc['summary']}")
+            ))
+            for chunk in chunks:
+                row = {
+                    'id': chunk['id'],
+                    'document_id': doc['id'],
+                    'content': chunk['content'],
+                    'chunk_index': chunk['chunk_index'],
+                    'chunk_type': 'detail',
+                    'start_time': chunk['start_time'],
+                    'end_time': chunk['end_time'],
+                    'speaker': chunk['speaker'],
+                    'embedding': embedder.embed(chunk['content']),
+                    'tokens': len(chunk['content']) // 4,
+                    'importance_score': 0.5,
+                    'metadata': '{}',
+                    'language': chunk['language']
+                }
+                chunk_records.append(tuple(row[column] for column in CHUNK_COLUMNS))
+
+        async with conn.transaction():
+            await conn.copy_records_to_table('documents', records=document_records, columns=document_columns)
+            await conn.copy_records_to_table('chunks', records=chunk_records, columns=CHUNK_COLUMNS)
+
+        loaded = min(batch_start + LOAD_BATCH_DOCUMENTS, target_documents) * CHUNKS_PER_DOCUMENT
+        print(f"  loaded {loaded:>9,} chunks ({time.perf_counter() - start:.0f}s)", end='\r')
+    print()
+
+    for index in vector_indexes:
+        print(f"  building {index['indexname']}")
+        await conn.execute(index['indexdef'])
+    await conn.execute("ANALYZE documents")
+    await conn.execute("ANALYZE chunks")
+    print(f"  corpus ready in {time.perf_counter() - start:.0f}s")
+
+
+def percentile(values: List[float], q: float) -> float:
+    return float(np.percentile(values, q)) if values else 0.0
+
+
+async def measure(operation, cases: List[Dict], concurrency: int, warmup: int) -> Dict:
+    """
+    Latency from a sequential pass, throughput from a concurrent pass
+
+    operation(case) returns (retrieved chunk ids or None, hit for /quick or None).
+    """
+    for case in cases[:warmup]:
+        await operation(case)
+
+    latencies, recalls = [], []
+    for case in cases:
+        start = time.perf_counter()
+        retrieved, hit = await operation(case)
+        latencies.append((time.perf_counter() - start) * 1000)
+        if hit is not None:
+            recalls.append(1.0 if hit else 0.0)
+        elif case['relevant']:
+            found = len(set(retrieved[:case['k']]) & case['relevant'])
+            recalls.append(found / min(case['k'], len(case['relevant'])))
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def bounded(case):
+        async with semaphore:
+            await operation(case)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(bounded(case) for case in cases))
+    elapsed = time.perf_counter() - start
+
+    return {
+        'p50_ms': percentile(latencies, 50),
+        'p95_ms': percentile(latencies, 95),
+        'qps': len(cases) / elapsed if elapsed else 0.0,
+        'recall': float(np.mean(recalls)) if recalls else None,
+        'queries': len(cases)
+    }
+
+
+def build_cases(corpus: SyntheticCorpus, k: int) -> Dict[str, List[Dict]]:
+    cases = {'search': [], 'search_by_speaker': [], 'search_by_date_range': [], 'quick': []}
+    for fact_no, fact in enumerate(corpus.facts):
+        query = QUERY_TEMPLATES[fact['language']].format(code=fact['code'], topic=fact['topic'])
+
+        cases['search'].append({
+            'query': query, 'k': k, 'relevant': corpus.relevant_chunks(fact_no)
+        })
+        cases['search_by_speaker'].append({
+            'query': query, 'k': k, 'speaker': fact['speaker'],
+            'relevant': corpus.relevant_chunks(fact_no, speaker=fact['speaker'])
+        })
+
+        # A two-week window around one of the fact's documents
+        created = corpus.document_date(fact['locations'][0][0])
+        start, end = created - timedelta(days=7), created + timedelta(days=7)
+        cases['search_by_date_range'].append({
+            'query': query, 'k': k, 'start': start, 'end': end,
+            'relevant': corpus.relevant_chunks(fact_no, start=start, end=end)
+        })
+
+        cases['quick'].append({'query': query, 'k': 1, 'code': fact['code'], 'relevant': None})
+    return cases
+
+
+async def run_benchmarks(retriever, search_api, cases: Dict[str, List[Dict]],
+                         concurrency: int, warmup: int, fusion: str) -> Dict[str, Dict]:
+    async def search(case):
+        results = await retriever.search(
+            query=case['query'], top_k=case['k'], use_colbert_rerank=False, fusion=fusion
+        )
+        return [r['chunk_id'] for r in results], None
+
+    async def by_speaker(case):
+        results = await retriever.search_by_speaker(
+            speaker_name=case['speaker'], query=case['query'], top_k=case['k']
+        )
+        return [r['chunk_id'] for r in results], None
+
+    async def by_date_range(case):
+        results = await retriever.search_by_date_range(
+            start_date=case['start'], end_date=case['end'], query=case['query'], top_k=case['k']
+        )
+        return [r['chunk_id'] for r in results], None
+
+    async def quick(case):
+        response = await search_api.quick_search(case['query'])
+        return None, case['code'] in response.get('answer', '')
+
+    operations = {
+        'search': search,
+        'search_by_speaker': by_speaker,
+        'search_by_date_range': by_date_range,
+        'quick': quick
+    }
+
+    return {
+        name: await measure(operation, cases[name], concurrency, warmup)
+        for name, operation in operations.items()
+    }
+
+
+def print_report(size: int, report: Dict[str, Dict], k: int):
+    print()
+    print(f"Corpus: {size:,} chunks")
+    print(f"{'operation':<24} {'p50 ms':>9} {'p95 ms':>9} {'QPS':>9} {'recall':>12}")
+    for name, row in report.items():
+        label = 'hit@1' if name == 'quick' else f'recall@{k}'
+        recall = f"{row['recall']:.3f} {label}" if row['recall'] is not None else '-'
+        print(f"{name:<24} {row['p50_ms']:>9.1f} {row['p95_ms']:>9.1f} {row['qps']:>9.1f} {recall:>12}")
+
+
+async def main_async(args):
+    # The backend reads its configuration at import time
+    os.environ['DATABASE_URL'] = args.database_url
+    os.environ.setdefault('DB_POOL_MAX_SIZE', str(args.concurrency + 2))
+    os.environ.setdefault('OPENAI_API_KEY', 'offline-benchmark')  # never called
+    os.environ.setdefault('ANTHROPIC_API_KEY', 'offline-benchmark')
+    sys.path.insert(0, str(BACKEND_DIR))
+
+    from core.database import db_pool
+    from core.retrieval import HybridRetriever
+    from api import search as search_api
+
+    embedder = HashingEmbedder()
+    corpus = SyntheticCorpus(seed=args.seed, n_facts=args.queries)
+    cases = build_cases(corpus, args.k)
+
+    retriever = HybridRetriever(db_pool)
+    retriever.embedding_service = embedder
+    search_api.retriever.embedding_service = embedder
+
+    results = {}
+    try:
+        async with db_pool.acquire() as conn:
+            await prepare_schema(conn, args.reset)
+
+        for size in args.sizes:
+            print(f"\nPreparing {size:,} chunks")
+            async with db_pool.acquire() as conn:
+                await load_corpus(conn, corpus, embedder, size)
+
+            report = await run_benchmarks(
+                retriever, search_api, cases, args.concurrency, args.warmup, args.fusion
+            )
+            print_report(size, report, args.k)
+            results[str(size)] = report
+    finally:
+        await db_pool.close()
+
+    if args.json:
+        Path(args.json).write_text(json.dumps({
+            'settings': {
+                'seed': args.seed, 'queries': args.queries, 'k': args.k,
+                'concurrency': args.concurrency, 'fusion': args.fusion
+            },
+            'results': results
+        }, indent=2))
+        print(f"\nResults written to {args.json}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", required=True, help="local Postgres with pgvector (not production)")
+    parser.add_argument("--sizes", default="10000,100000,1000000",
+                        type=lambda v: sorted(int(s) for s in v.split(',')),
+                        help="comma-separated corpus sizes in chunks")
+    parser.add_argument("--queries", type=int, default=200, help="planted facts = queries per operation")
+    parser.add_argument("--k", type=int, default=10, help="cut-off for recall@k")
+    parser.add_argument("--concurrency", type=int, default=8, help="parallel queries in the QPS pass")
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--fusion", default="linear", help="fusion mode for HybridRetriever.search")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--reset", action="store_true", help="drop previously loaded benchmark data")
+    parser.add_argument("--json", default=None, help="also write the results to this file")
+    args = parser.parse_args()
+
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Startup benchmark for MyBrain
+Imports the FastAPI app in a fresh interpreter under `python -X importtime` and
+reports the total import time of main, the slowest modules and whether heavy ML
+packages (torch, transformers, sentence_transformers) were pulled in.
+
+Cold-start time on Render/Fly is dominated by module imports, so this catches
+regressions such as a new top-level `import torch`.
+
+Usage:
+    python scripts/benchmark_startup.py
+    python scripts/benchmark_startup.py --runs 5 --top 25 --json startup.json
+    python scripts/benchmark_startup.py --max-seconds 2.5 --forbid torch,transformers   # exits 1 on regression
+"""
+
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List
+
+BACKEND_DIR = Path(__file__).parent.parent / "backend"
+
+HEAVY_PACKAGES = ('torch', 'transformers', 'sentence_transformers', 'scipy', 'sklearn')
+
+# "import time:       123 |       4567 |   package.module"
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S.*)$")
+
+
+def run_import(module: str) -> Dict:
+    """Import module in a fresh interpreter and parse its -X importtime output"""
+    env = dict(os.environ)
+    # The app reads API keys at import time; no request is ever made
+    env.setdefault("OPENAI_API_KEY", "benchmark")
+    env.setdefault("ANTHROPIC_API_KEY", "benchmark")
+
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR,
+        env=env,
+        capture_output=True,
+        text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+
+    modules = []
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, name = match.groups()
+        modules.append({
+            'module': name.strip(),
+            'self_ms': int(self_us) / 1000,
+            'cumulative_ms': int(cumulative_us) / 1000,
+            'depth': len(indent) // 2
+        })
+
+    # Top-level entries are the imports the interpreter did for us, the target among them
+    total_ms = sum(m['cumulative_ms'] for m in modules if m['depth'] == 0)
+    target = next((m for m in modules if m['module'] == module and m['depth'] == 0), None)
+
+    imported = {m['module'] for m in modules}
+    return {
+        'total_ms': total_ms,
+        'module_ms': target['cumulative_ms'] if target else total_ms,
+        'modules': modules,
+        'heavy': sorted(p for p in HEAVY_PACKAGES if p in imported)
+    }
+
+
+def slowest(modules: List[Dict], top: int) -> List[Dict]:
+    """Modules with the largest self time (cumulative time double counts parents)"""
+    return sorted(modules, key=lambda m: m['self_ms'], reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="main", help="module to import from backend/")
+    parser.add_argument("--runs", type=int, default=3, help="fresh interpreters; the median is reported")
+    parser.add_argument("--top", type=int, default=15, help="slowest modules to list")
+    parser.add_argument("--max-seconds", type=float, default=None, help="fail when the median import is slower")
+    parser.add_argument("--forbid", default="", help="comma-separated packages that must not be imported")
+    parser.add_argument("--json", default=None, help="also write the results to this file")
+    args = parser.parse_args()
+
+    runs = [run_import(args.module) for _ in range(args.runs)]
+    median_ms = statistics.median(r['module_ms'] for r in runs)
+    # The breakdown comes from the run closest to the median
+    representative = min(runs, key=lambda r: abs(r['module_ms'] - median_ms))
+
+    print(f"import {args.module}: median {median_ms:.0f} ms over {args.runs} runs "
+          f"(min {min(r['module_ms'] for r in runs):.0f}, max {max(r['module_ms'] for r in runs):.0f})")
+    print(f"heavy packages imported: {', '.join(representative['heavy']) or 'none'}")
+    print(f"\n{'self ms':>9} {'cumul ms':>9}  module")
+    for m in slowest(representative['modules'], args.top):
+        print(f"{m['self_ms']:>9.1f} {m['cumulative_ms']:>9.1f}  {m['module']}")
+
+    if args.json:
+        Path(args.json).write_text(json.dumps({
+            'module': args.module,
+            'runs_ms': [r['module_ms'] for r in runs],
+            'median_ms': median_ms,
+            'heavy': representative['heavy'],
+            'slowest': slowest(representative['modules'], args.top)
+        }, indent=2))
+        print(f"\nResults written to {args.json}")
+
+    failures = []
+    if args.max_seconds is not None and median_ms > args.max_seconds * 1000:
+        failures.append(f"median import {median_ms:.0f} ms exceeds {args.max_seconds * 1000:.0f} ms")
+    forbidden = [p.strip() for p in args.forbid.split(",") if p.strip()]
+    imported = {m['module'] for m in representative['modules']}
+    for package in forbidden:
+        if package in imported:
+            failures.append(f"{package} is imported at startup")
+
+    if failures:
+        print("\nStartup regression:")
+        for failure in failures:
+            print(f"  - {failure}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
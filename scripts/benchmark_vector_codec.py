@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: pgvector text format vs. binary codec
+Measures the client-side cost per query vector and per ingest batch, and
+optionally the full round trip against a live database (--database-url).
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Backend modules
+sys.path.append(str(Path(__file__).parent.parent / "backend"))
+from core.vector_codec import encode_vector, decode_vector, register_vector_codec
+
+
+def to_text(embedding) -> str:
+    """The former '[x,y,z]' formatting used across the code base"""
+    return f'[{",".join(map(str, embedding))}]'
+
+
+def from_text(text: str) -> list:
+    """What callers had to do with a vector read back as text"""
+    return [float(x) for x in text.strip('[]').split(',')]
+
+
+def timeit(fn, repeat: int) -> float:
+    """Mean microseconds per call"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def run_client_benchmark(dim: int, chunks: int, repeat: int):
+    rng = np.random.default_rng(42)
+    query = rng.standard_normal(dim).astype(np.float32)
+    query_list = query.tolist()  # OpenAI returns Python floats
+    batch = [rng.standard_normal(dim).tolist() for _ in range(chunks)]
+
+    text_value = to_text(query_list)
+    binary_value = encode_vector(query_list)
+
+    print(f"Vector dim={dim}  text payload={len(text_value)} B  binary payload={len(binary_value)} B")
+    print()
+
+    rows = [
+        ("encode query (text)", timeit(lambda: to_text(query_list), repeat)),
+        ("encode query (binary)", timeit(lambda: encode_vector(query_list), repeat)),
+        ("decode vector (text)", timeit(lambda: from_text(text_value), repeat)),
+        ("decode vector (binary)", timeit(lambda: decode_vector(binary_value), repeat)),
+    ]
+
+    ingest_repeat = max(1, repeat // chunks)
+    rows.append((
+        f"encode ingest batch of {chunks} (text)",
+        timeit(lambda: [to_text(e) for e in batch], ingest_repeat)
+    ))
+    rows.append((
+        f"encode ingest batch of {chunks} (binary)",
+        timeit(lambda: [encode_vector(e) for e in batch], ingest_repeat)
+    ))
+
+    for label, micros in rows:
+        print(f"{label:<40} {micros:>12.1f} us")
+
+
+async def run_roundtrip_benchmark(database_url: str, dim: int, repeat: int):
+    import asyncpg
+
+    rng = np.random.default_rng(7)
+    query_list = rng.standard_normal(dim).astype(np.float32).tolist()
+
+    text_conn = await asyncpg.connect(database_url, statement_cache_size=0)
+    binary_conn = await asyncpg.connect(database_url, statement_cache_size=0)
+    try:
+        await register_vector_codec(binary_conn)
+
+        async def text_roundtrip():
+            value = await text_conn.fetchval("SELECT $1::text::vector::text", to_text(query_list))
+            return from_text(value)
+
+        async def binary_roundtrip():
+            return await binary_conn.fetchval("SELECT $1::vector", query_list)
+
+        print()
+        for label, fn in [("round trip (text)", text_roundtrip), ("round trip (binary)", binary_roundtrip)]:
+            await fn()  # warm up
+            start = time.perf_counter()
+            for _ in range(repeat):
+                await fn()
+            micros = (time.perf_counter() - start) / repeat * 1e6
+            print(f"{label:<40} {micros:>12.1f} us")
+    finally:
+        await text_conn.close()
+        await binary_conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--chunks", type=int, default=300, help="chunks per simulated ingest")
+    parser.add_argument("--repeat", type=int, default=2000)
+    parser.add_argument("--database-url", default=None, help="also measure live round trips")
+    args = parser.parse_args()
+
+    run_client_benchmark(args.dim, args.chunks, args.repeat)
+
+    if args.database_url:
+        asyncio.run(run_roundtrip_benchmark(args.database_url, args.dim, min(args.repeat, 500)))
+
+
+if __name__ == "__main__":
+    main()
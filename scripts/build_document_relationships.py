@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Backfill the document relationship graph (migration 012)
+Ingest links each new document as it arrives; this builds profiles and edges for
+documents that were ingested before, oldest first, so every document is linked
+against all earlier ones exactly as if it had just been ingested.
+A rebuild only replaces the edges the document produced itself;
+edges that other documents found against it are kept.
+
+Usage:
+    python scripts/build_document_relationships.py            # documents without a profile
+    python scripts/build_document_relationships.py --all      # rebuild everything
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+# Backend modules
+sys.path.append(str(Path(__file__).parent.parent / "backend"))
+from core.database import db_pool
+from core.cross_context_reasoning import cross_context_reasoner
+
+
+async def main_async(rebuild_all: bool):
+    async with db_pool.acquire() as conn:
+        documents = await conn.fetch(
+            """
+            SELECT d.id, d.title
+            FROM documents d
+            WHERE $1 OR NOT EXISTS (
+                SELECT 1 FROM document_profiles p WHERE p.document_id = d.id
+            )
+            ORDER BY d.created_at, d.id
+            """,
+            rebuild_all
+        )
+
+    print(f"Linking {len(documents)} documents...")
+    start = time.perf_counter()
+    total_edges = 0
+    for i, doc in enumerate(documents, 1):
+        edges = await cross_context_reasoner.update_document_relationships(doc['id'])
+        total_edges += edges
+        print(f"[{i}/{len(documents)}] {doc['title']}: {edges} edges")
+
+    print(f"Done: {total_edges} edges in {time.perf_counter() - start:.1f}s")
+    await db_pool.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--all", action="store_true", help="rebuild documents that already have a profile")
+    args = parser.parse_args()
+    asyncio.run(main_async(args.all))
+
+
+if __name__ == "__main__":
+    main()
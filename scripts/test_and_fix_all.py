@@ -10,8 +10,14 @@ import os
 import sys
 import json
 import traceback
+from pathlib import Path
 from datetime import datetime
 from dotenv import load_dotenv
+import numpy as np
+
+# Backend modules (binary pgvector codec)
+sys.path.append(str(Path(__file__).parent.parent / "backend"))
+from core.vector_codec import register_vector_codec
 
 # Load environment variables
 load_dotenv()
@@ -196,6 +202,7 @@ $$;
         
         # Test with direct database operations to ensure it works
         conn = await asyncpg.connect(self.database_url, statement_cache_size=0)
+        await register_vector_codec(conn)
         
         try:
             # 1. Create a test document directly
@@ -212,8 +219,7 @@ $$;
             self.log("Creating test chunk with embedding...", "INFO")
             
             # Generate a simple test embedding (1536 dimensions)
-            test_embedding = [0.1] * 1536
-            embedding_str = f'[{",".join(map(str, test_embedding))}]'
+            test_embedding = np.full(1536, 0.1, dtype=np.float32)
             
             chunk_id = await conn.fetchval("""
                 INSERT INTO chunks (
@@ -223,7 +229,7 @@ $$;
                 VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
                 RETURNING id
             """, doc_id, "This is test content for MyBrain system", 
-                0, "detail", embedding_str, 10, 0.8, '{}')
+                0, "detail", test_embedding, 10, 0.8, '{}')
             
             self.log(f"Created chunk: {chunk_id}", "SUCCESS")
             
@@ -232,7 +238,7 @@ $$;
             
             search_results = await conn.fetch("""
                 SELECT * FROM hybrid_search($1, $2, $3)
-            """, embedding_str, "test content", 5)
+            """, test_embedding, "test content", 5)
             
             if search_results:
                 self.log(f"Search returned {len(search_results)} results", "SUCCESS")
@@ -0,0 +1,14 @@
+-- Content-addressed cache for chunk embeddings
+-- Keyed by sha256(model || 0x00 || text) so re-ingesting the same video or a
+-- slightly edited note only sends new or changed chunks to the embeddings API
+
+CREATE TABLE embedding_cache (
+    content_hash BYTEA PRIMARY KEY,
+    model TEXT NOT NULL,
+    dims INTEGER NOT NULL,
+    -- Little-endian float32, decoded with numpy.frombuffer
+    embedding BYTEA NOT NULL,
+    created_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE INDEX idx_embedding_cache_created_at ON embedding_cache(created_at);
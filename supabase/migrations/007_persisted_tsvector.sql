@@ -0,0 +1,125 @@
+-- Persisted full-text search vectors and per-chunk language
+-- hybrid_search used to call to_tsvector(query_language, content) at query time.
+-- When the detected query language did not line up with an indexed expression
+-- the planner fell back to computing a tsvector for every chunk.
+
+-- Language detected per chunk at ingest ('de' or 'en')
+ALTER TABLE chunks
+ADD COLUMN language TEXT CHECK (language IN ('de', 'en'));
+
+-- Backfill existing rows with the same heuristic the ingest fallback uses
+UPDATE chunks
+SET language = CASE
+    WHEN content ~ '[äöüßÄÖÜ]'
+      OR content ~* '\m(und|der|die|das|ist|nicht|ich|wir)\M'
+    THEN 'de'
+    ELSE 'en'
+END
+WHERE language IS NULL;
+
+-- Stored generated tsvectors, one per configuration
+ALTER TABLE chunks
+ADD COLUMN tsv_de tsvector GENERATED ALWAYS AS (to_tsvector('german_custom'::regconfig, content)) STORED,
+ADD COLUMN tsv_en tsvector GENERATED ALWAYS AS (to_tsvector('english_custom'::regconfig, content)) STORED;
+
+CREATE INDEX idx_chunks_tsv_de ON chunks USING GIN (tsv_de);
+CREATE INDEX idx_chunks_tsv_en ON chunks USING GIN (tsv_en);
+
+-- The expression indexes are superseded by the stored columns
+DROP INDEX IF EXISTS idx_chunks_content_fts_de;
+DROP INDEX IF EXISTS idx_chunks_content_fts_en;
+
+-- Hybrid search over both indexed columns.
+-- Each language is searched through its own GIN index and the two candidate
+-- lists are merged; a match in the chunk's own language counts fully, a match
+-- through the other configuration is damped.
+CREATE OR REPLACE FUNCTION hybrid_search(
+    query_embedding vector(1536),
+    query_text TEXT,
+    match_count INT DEFAULT 20,
+    filter_metadata JSONB DEFAULT NULL
+)
+RETURNS TABLE (
+    chunk_id UUID,
+    document_id UUID,
+    content TEXT,
+    chunk_index INT,
+    similarity FLOAT,
+    rank FLOAT,
+    metadata JSONB
+)
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    query_de tsquery := plainto_tsquery('german_custom', query_text);
+    query_en tsquery := plainto_tsquery('english_custom', query_text);
+BEGIN
+    RETURN QUERY
+    WITH vector_search AS (
+        SELECT
+            c.id,
+            1 - (c.embedding <=> query_embedding) AS vector_similarity
+        FROM chunks c
+        WHERE
+            c.embedding IS NOT NULL
+            AND (filter_metadata IS NULL OR c.metadata @> filter_metadata)
+        ORDER BY c.embedding <=> query_embedding
+        LIMIT match_count * 2
+    ),
+    text_de AS (
+        SELECT
+            c.id,
+            ts_rank_cd(c.tsv_de, query_de)::float
+                * CASE WHEN c.language IS DISTINCT FROM 'en' THEN 1.0::float ELSE 0.7::float END
+                AS text_rank
+        FROM chunks c
+        WHERE
+            c.tsv_de @@ query_de
+            AND (filter_metadata IS NULL OR c.metadata @> filter_metadata)
+        ORDER BY text_rank DESC
+        LIMIT match_count * 2
+    ),
+    text_en AS (
+        SELECT
+            c.id,
+            ts_rank_cd(c.tsv_en, query_en)::float
+                * CASE WHEN c.language IS DISTINCT FROM 'de' THEN 1.0::float ELSE 0.7::float END
+                AS text_rank
+        FROM chunks c
+        WHERE
+            c.tsv_en @@ query_en
+            AND (filter_metadata IS NULL OR c.metadata @> filter_metadata)
+        ORDER BY text_rank DESC
+        LIMIT match_count * 2
+    ),
+    text_search AS (
+        SELECT t.id, MAX(t.text_rank) AS text_rank
+        FROM (
+            SELECT * FROM text_de
+            UNION ALL
+            SELECT * FROM text_en
+        ) t
+        GROUP BY t.id
+    ),
+    combined_results AS (
+        SELECT
+            COALESCE(v.id, t.id) AS cid,
+            COALESCE(v.vector_similarity, 0) AS vec_sim,
+            COALESCE(t.text_rank, 0) AS txt_rank
+        FROM vector_search v
+        FULL OUTER JOIN text_search t ON v.id = t.id
+    )
+    SELECT
+        c.id,
+        c.document_id,
+        c.content,
+        c.chunk_index,
+        cr.vec_sim::float,
+        (0.5 * cr.vec_sim + 0.25 * LEAST(cr.txt_rank / 10, 1))::float,
+        c.metadata
+    FROM combined_results cr
+    JOIN chunks c ON c.id = cr.cid
+    ORDER BY 6 DESC
+    LIMIT match_count;
+END;
+$$;
@@ -0,0 +1,33 @@
+-- Replace the ivfflat indexes with HNSW
+-- The ivfflat indexes were built with lists = 100 on an empty table, so their
+-- centroids say nothing about the data and recall/latency degrade as it grows.
+-- HNSW needs no training data and keeps recall stable under inserts.
+--
+-- Build parameters can be overridden per session before running this file:
+--   SET mybrain.hnsw_m = '24';
+--   SET mybrain.hnsw_ef_construction = '128';
+-- Query-time recall is tuned per request with hnsw.ef_search (see HybridRetriever.search).
+
+DROP INDEX IF EXISTS idx_chunks_embedding;
+DROP INDEX IF EXISTS idx_documents_summary_embedding;
+
+DO $$
+DECLARE
+    hnsw_m INT := COALESCE(NULLIF(current_setting('mybrain.hnsw_m', true), '')::INT, 16);
+    hnsw_ef_construction INT := COALESCE(NULLIF(current_setting('mybrain.hnsw_ef_construction', true), '')::INT, 64);
+BEGIN
+    EXECUTE format(
+        'CREATE INDEX idx_chunks_embedding ON chunks
+            USING hnsw (embedding vector_cosine_ops)
+            WITH (m = %s, ef_construction = %s)',
+        hnsw_m, hnsw_ef_construction
+    );
+
+    EXECUTE format(
+        'CREATE INDEX idx_documents_summary_embedding ON documents
+            USING hnsw (summary_embedding vector_cosine_ops)
+            WITH (m = %s, ef_construction = %s)',
+        hnsw_m, hnsw_ef_construction
+    );
+END;
+$$;
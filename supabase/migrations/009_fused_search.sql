@@ -0,0 +1,147 @@
+-- Rank fusion for hybrid search
+-- hybrid_search adds raw cosine similarity to LEAST(text_rank / 10, 1); the two
+-- scales are unrelated and the "recency boost" mentioned in 003 never existed.
+-- fused_search computes both candidate lists in one statement, fuses them by
+-- reciprocal rank ('rrf') or weighted z-score ('zscore') and blends in real
+-- recency and importance_score terms.
+
+CREATE OR REPLACE FUNCTION fused_search(
+    query_embedding vector(1536),
+    query_text TEXT,
+    match_count INT DEFAULT 20,
+    filter_metadata JSONB DEFAULT NULL,
+    fusion TEXT DEFAULT 'rrf',
+    recency_weight FLOAT DEFAULT 0.1,
+    importance_weight FLOAT DEFAULT 0.1,
+    recency_half_life_days FLOAT DEFAULT 180,
+    rrf_k INT DEFAULT 60
+)
+RETURNS TABLE (
+    chunk_id UUID,
+    document_id UUID,
+    content TEXT,
+    chunk_index INT,
+    similarity FLOAT,
+    rank FLOAT,
+    metadata JSONB,
+    vector_position INT,
+    text_position INT
+)
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    query_de tsquery := plainto_tsquery('german_custom', query_text);
+    query_en tsquery := plainto_tsquery('english_custom', query_text);
+    relevance_weight FLOAT := GREATEST(1 - recency_weight - importance_weight, 0);
+BEGIN
+    IF fusion NOT IN ('rrf', 'zscore') THEN
+        RAISE EXCEPTION 'Unknown fusion mode: %', fusion;
+    END IF;
+
+    RETURN QUERY
+    WITH vector_search AS (
+        SELECT
+            c.id,
+            1 - (c.embedding <=> query_embedding) AS vector_similarity
+        FROM chunks c
+        WHERE
+            c.embedding IS NOT NULL
+            AND (filter_metadata IS NULL OR c.metadata @> filter_metadata)
+        ORDER BY c.embedding <=> query_embedding
+        LIMIT match_count * 2
+    ),
+    vector_ranked AS (
+        SELECT
+            v.id,
+            v.vector_similarity,
+            ROW_NUMBER() OVER (ORDER BY v.vector_similarity DESC)::int AS pos,
+            (v.vector_similarity - AVG(v.vector_similarity) OVER ())
+                / NULLIF(STDDEV_POP(v.vector_similarity) OVER (), 0) AS z
+        FROM vector_search v
+    ),
+    text_de AS (
+        SELECT
+            c.id,
+            ts_rank_cd(c.tsv_de, query_de)::float
+                * CASE WHEN c.language IS DISTINCT FROM 'en' THEN 1.0::float ELSE 0.7::float END
+                AS text_rank
+        FROM chunks c
+        WHERE
+            c.tsv_de @@ query_de
+            AND (filter_metadata IS NULL OR c.metadata @> filter_metadata)
+        ORDER BY text_rank DESC
+        LIMIT match_count * 2
+    ),
+    text_en AS (
+        SELECT
+            c.id,
+            ts_rank_cd(c.tsv_en, query_en)::float
+                * CASE WHEN c.language IS DISTINCT FROM 'de' THEN 1.0::float ELSE 0.7::float END
+                AS text_rank
+        FROM chunks c
+        WHERE
+            c.tsv_en @@ query_en
+            AND (filter_metadata IS NULL OR c.metadata @> filter_metadata)
+        ORDER BY text_rank DESC
+        LIMIT match_count * 2
+    ),
+    text_search AS (
+        SELECT t.id, MAX(t.text_rank) AS text_rank
+        FROM (
+            SELECT * FROM text_de
+            UNION ALL
+            SELECT * FROM text_en
+        ) t
+        GROUP BY t.id
+    ),
+    text_ranked AS (
+        SELECT
+            t.id,
+            ROW_NUMBER() OVER (ORDER BY t.text_rank DESC)::int AS pos,
+            (t.text_rank - AVG(t.text_rank) OVER ())
+                / NULLIF(STDDEV_POP(t.text_rank) OVER (), 0) AS z
+        FROM text_search t
+    ),
+    combined_results AS (
+        SELECT
+            COALESCE(v.id, t.id) AS cid,
+            COALESCE(v.vector_similarity, 0) AS vec_sim,
+            v.pos AS vec_pos,
+            t.pos AS txt_pos,
+            CASE fusion
+                -- Scaled so a chunk ranked first in both lists scores 1
+                WHEN 'rrf' THEN
+                    (COALESCE(1.0 / (rrf_k + v.pos), 0) + COALESCE(1.0 / (rrf_k + t.pos), 0))
+                        * (rrf_k + 1) / 2.0
+                -- Missing from a list counts as two deviations below its mean;
+                -- the logistic maps the sum onto (0, 1)
+                ELSE
+                    1 / (1 + EXP(-(0.5 * COALESCE(v.z, -2) + 0.5 * COALESCE(t.z, -2))))
+            END AS relevance
+        FROM vector_ranked v
+        FULL OUTER JOIN text_ranked t ON v.id = t.id
+    )
+    SELECT
+        c.id,
+        c.document_id,
+        c.content,
+        c.chunk_index,
+        cr.vec_sim::float,
+        (
+            relevance_weight * cr.relevance
+            + recency_weight * EXP(
+                -LN(2) * GREATEST(EXTRACT(EPOCH FROM NOW() - COALESCE(d.created_at, c.created_at)), 0)
+                / 86400 / GREATEST(recency_half_life_days, 1)
+            )
+            + importance_weight * COALESCE(c.importance_score, 0.5)
+        )::float,
+        c.metadata,
+        cr.vec_pos,
+        cr.txt_pos
+    FROM combined_results cr
+    JOIN chunks c ON c.id = cr.cid
+    JOIN documents d ON d.id = c.document_id
+    ORDER BY 6 DESC
+    LIMIT match_count;
+END;
+$$;
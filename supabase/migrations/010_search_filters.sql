@@ -0,0 +1,344 @@
+-- Search filters compiled into the search functions
+-- /api/v1/search used to fetch top_k rows and then drop those with the wrong
+-- speaker or date in Python, so filtered queries came back short. The filters
+-- argument of hybrid_search / fused_search now carries the filter model
+-- (speaker, start_date, end_date, source_type, document_ids, chunk_type and an
+-- optional metadata containment match) and is applied inside every candidate list.
+
+-- Case-insensitive speaker lookups, narrowed to the owning document
+CREATE INDEX idx_chunks_speaker_lower ON chunks (lower(speaker), document_id)
+    WHERE speaker IS NOT NULL;
+
+-- Chunk type filters; summaries and topics are a small slice of all chunks
+CREATE INDEX idx_chunks_type_document ON chunks (chunk_type, document_id)
+    WHERE chunk_type <> 'detail';
+
+-- Source type plus date range resolve the document scope from one index
+CREATE INDEX idx_documents_source_created ON documents (source_type, created_at DESC);
+
+-- Documents allowed by the document-level filters, NULL when unrestricted.
+-- The scope is resolved once per query so the chunk scans only need
+-- document_id = ANY(scope), which idx_chunks_document_id serves.
+CREATE OR REPLACE FUNCTION search_document_scope(filters JSONB)
+RETURNS UUID[]
+LANGUAGE plpgsql
+STABLE
+AS $$
+DECLARE
+    scope UUID[];
+    f_source_type TEXT := NULLIF(filters->>'source_type', '');
+    f_start TIMESTAMPTZ := (NULLIF(filters->>'start_date', ''))::timestamptz;
+    f_end TIMESTAMPTZ := (NULLIF(filters->>'end_date', ''))::timestamptz;
+BEGIN
+    IF filters IS NULL THEN
+        RETURN NULL;
+    END IF;
+
+    IF jsonb_typeof(filters->'document_ids') = 'array' THEN
+        scope := ARRAY(
+            SELECT jsonb_array_elements_text(filters->'document_ids')::uuid
+        );
+    END IF;
+
+    IF f_source_type IS NOT NULL OR f_start IS NOT NULL OR f_end IS NOT NULL THEN
+        scope := ARRAY(
+            SELECT d.id
+            FROM documents d
+            WHERE
+                (f_source_type IS NULL OR d.source_type = f_source_type)
+                AND (f_start IS NULL OR d.created_at >= f_start)
+                AND (f_end IS NULL OR d.created_at <= f_end)
+                AND (scope IS NULL OR d.id = ANY(scope))
+        );
+    END IF;
+
+    RETURN scope;
+END;
+$$;
+
+-- With a filter the HNSW scan would stop after ef_search candidates and the
+-- filter could leave fewer than requested. pgvector >= 0.8 keeps scanning until
+-- enough rows pass; older versions do not know the setting, and the retriever
+-- over-fetches and refills instead.
+CREATE OR REPLACE FUNCTION enable_filtered_vector_scan(filters JSONB)
+RETURNS VOID
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    IF filters IS NULL OR filters = '{}'::jsonb THEN
+        RETURN;
+    END IF;
+
+    BEGIN
+        PERFORM set_config('hnsw.iterative_scan', 'strict_order', true);
+    EXCEPTION WHEN OTHERS THEN
+        NULL;
+    END;
+END;
+$$;
+
+-- The parameter changes name and meaning, which CREATE OR REPLACE cannot do
+DROP FUNCTION IF EXISTS hybrid_search(vector, TEXT, INT, JSONB);
+DROP FUNCTION IF EXISTS fused_search(vector, TEXT, INT, JSONB, TEXT, FLOAT, FLOAT, FLOAT, INT);
+
+CREATE FUNCTION hybrid_search(
+    query_embedding vector(1536),
+    query_text TEXT,
+    match_count INT DEFAULT 20,
+    filters JSONB DEFAULT NULL
+)
+RETURNS TABLE (
+    chunk_id UUID,
+    document_id UUID,
+    content TEXT,
+    chunk_index INT,
+    similarity FLOAT,
+    rank FLOAT,
+    metadata JSONB
+)
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    query_de tsquery := plainto_tsquery('german_custom', query_text);
+    query_en tsquery := plainto_tsquery('english_custom', query_text);
+    f_speaker TEXT := lower(NULLIF(filters->>'speaker', ''));
+    f_chunk_type TEXT := NULLIF(filters->>'chunk_type', '');
+    f_metadata JSONB := NULLIF(filters->'metadata', '{}'::jsonb);
+    doc_scope UUID[] := search_document_scope(filters);
+BEGIN
+    PERFORM enable_filtered_vector_scan(filters);
+
+    RETURN QUERY
+    WITH vector_search AS (
+        SELECT
+            c.id,
+            1 - (c.embedding <=> query_embedding) AS vector_similarity
+        FROM chunks c
+        WHERE
+            c.embedding IS NOT NULL
+            AND (f_speaker IS NULL OR lower(c.speaker) = f_speaker)
+            AND (f_chunk_type IS NULL OR c.chunk_type = f_chunk_type)
+            AND (doc_scope IS NULL OR c.document_id = ANY(doc_scope))
+            AND (f_metadata IS NULL OR c.metadata @> f_metadata)
+        ORDER BY c.embedding <=> query_embedding
+        LIMIT match_count * 2
+    ),
+    text_de AS (
+        SELECT
+            c.id,
+            ts_rank_cd(c.tsv_de, query_de)::float
+                * CASE WHEN c.language IS DISTINCT FROM 'en' THEN 1.0::float ELSE 0.7::float END
+                AS text_rank
+        FROM chunks c
+        WHERE
+            c.tsv_de @@ query_de
+            AND (f_speaker IS NULL OR lower(c.speaker) = f_speaker)
+            AND (f_chunk_type IS NULL OR c.chunk_type = f_chunk_type)
+            AND (doc_scope IS NULL OR c.document_id = ANY(doc_scope))
+            AND (f_metadata IS NULL OR c.metadata @> f_metadata)
+        ORDER BY text_rank DESC
+        LIMIT match_count * 2
+    ),
+    text_en AS (
+        SELECT
+            c.id,
+            ts_rank_cd(c.tsv_en, query_en)::float
+                * CASE WHEN c.language IS DISTINCT FROM 'de' THEN 1.0::float ELSE 0.7::float END
+                AS text_rank
+        FROM chunks c
+        WHERE
+            c.tsv_en @@ query_en
+            AND (f_speaker IS NULL OR lower(c.speaker) = f_speaker)
+            AND (f_chunk_type IS NULL OR c.chunk_type = f_chunk_type)
+            AND (doc_scope IS NULL OR c.document_id = ANY(doc_scope))
+            AND (f_metadata IS NULL OR c.metadata @> f_metadata)
+        ORDER BY text_rank DESC
+        LIMIT match_count * 2
+    ),
+    text_search AS (
+        SELECT t.id, MAX(t.text_rank) AS text_rank
+        FROM (
+            SELECT * FROM text_de
+            UNION ALL
+            SELECT * FROM text_en
+        ) t
+        GROUP BY t.id
+    ),
+    combined_results AS (
+        SELECT
+            COALESCE(v.id, t.id) AS cid,
+            COALESCE(v.vector_similarity, 0) AS vec_sim,
+            COALESCE(t.text_rank, 0) AS txt_rank
+        FROM vector_search v
+        FULL OUTER JOIN text_search t ON v.id = t.id
+    )
+    SELECT
+        c.id,
+        c.document_id,
+        c.content,
+        c.chunk_index,
+        cr.vec_sim::float,
+        (0.5 * cr.vec_sim + 0.25 * LEAST(cr.txt_rank / 10, 1))::float,
+        c.metadata
+    FROM combined_results cr
+    JOIN chunks c ON c.id = cr.cid
+    ORDER BY 6 DESC
+    LIMIT match_count;
+END;
+$$;
+
+CREATE FUNCTION fused_search(
+    query_embedding vector(1536),
+    query_text TEXT,
+    match_count INT DEFAULT 20,
+    filters JSONB DEFAULT NULL,
+    fusion TEXT DEFAULT 'rrf',
+    recency_weight FLOAT DEFAULT 0.1,
+    importance_weight FLOAT DEFAULT 0.1,
+    recency_half_life_days FLOAT DEFAULT 180,
+    rrf_k INT DEFAULT 60
+)
+RETURNS TABLE (
+    chunk_id UUID,
+    document_id UUID,
+    content TEXT,
+    chunk_index INT,
+    similarity FLOAT,
+    rank FLOAT,
+    metadata JSONB,
+    vector_position INT,
+    text_position INT
+)
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    query_de tsquery := plainto_tsquery('german_custom', query_text);
+    query_en tsquery := plainto_tsquery('english_custom', query_text);
+    relevance_weight FLOAT := GREATEST(1 - recency_weight - importance_weight, 0);
+    f_speaker TEXT := lower(NULLIF(filters->>'speaker', ''));
+    f_chunk_type TEXT := NULLIF(filters->>'chunk_type', '');
+    f_metadata JSONB := NULLIF(filters->'metadata', '{}'::jsonb);
+    doc_scope UUID[] := search_document_scope(filters);
+BEGIN
+    PERFORM enable_filtered_vector_scan(filters);
+
+    IF fusion NOT IN ('rrf', 'zscore') THEN
+        RAISE EXCEPTION 'Unknown fusion mode: %', fusion;
+    END IF;
+
+    RETURN QUERY
+    WITH vector_search AS (
+        SELECT
+            c.id,
+            1 - (c.embedding <=> query_embedding) AS vector_similarity
+        FROM chunks c
+        WHERE
+            c.embedding IS NOT NULL
+            AND (f_speaker IS NULL OR lower(c.speaker) = f_speaker)
+            AND (f_chunk_type IS NULL OR c.chunk_type = f_chunk_type)
+            AND (doc_scope IS NULL OR c.document_id = ANY(doc_scope))
+            AND (f_metadata IS NULL OR c.metadata @> f_metadata)
+        ORDER BY c.embedding <=> query_embedding
+        LIMIT match_count * 2
+    ),
+    vector_ranked AS (
+        SELECT
+            v.id,
+            v.vector_similarity,
+            ROW_NUMBER() OVER (ORDER BY v.vector_similarity DESC)::int AS pos,
+            (v.vector_similarity - AVG(v.vector_similarity) OVER ())
+                / NULLIF(STDDEV_POP(v.vector_similarity) OVER (), 0) AS z
+        FROM vector_search v
+    ),
+    text_de AS (
+        SELECT
+            c.id,
+            ts_rank_cd(c.tsv_de, query_de)::float
+                * CASE WHEN c.language IS DISTINCT FROM 'en' THEN 1.0::float ELSE 0.7::float END
+                AS text_rank
+        FROM chunks c
+        WHERE
+            c.tsv_de @@ query_de
+            AND (f_speaker IS NULL OR lower(c.speaker) = f_speaker)
+            AND (f_chunk_type IS NULL OR c.chunk_type = f_chunk_type)
+            AND (doc_scope IS NULL OR c.document_id = ANY(doc_scope))
+            AND (f_metadata IS NULL OR c.metadata @> f_metadata)
+        ORDER BY text_rank DESC
+        LIMIT match_count * 2
+    ),
+    text_en AS (
+        SELECT
+            c.id,
+            ts_rank_cd(c.tsv_en, query_en)::float
+                * CASE WHEN c.language IS DISTINCT FROM 'de' THEN 1.0::float ELSE 0.7::float END
+                AS text_rank
+        FROM chunks c
+        WHERE
+            c.tsv_en @@ query_en
+            AND (f_speaker IS NULL OR lower(c.speaker) = f_speaker)
+            AND (f_chunk_type IS NULL OR c.chunk_type = f_chunk_type)
+            AND (doc_scope IS NULL OR c.document_id = ANY(doc_scope))
+            AND (f_metadata IS NULL OR c.metadata @> f_metadata)
+        ORDER BY text_rank DESC
+        LIMIT match_count * 2
+    ),
+    text_search AS (
+        SELECT t.id, MAX(t.text_rank) AS text_rank
+        FROM (
+            SELECT * FROM text_de
+            UNION ALL
+            SELECT * FROM text_en
+        ) t
+        GROUP BY t.id
+    ),
+    text_ranked AS (
+        SELECT
+            t.id,
+            ROW_NUMBER() OVER (ORDER BY t.text_rank DESC)::int AS pos,
+            (t.text_rank - AVG(t.text_rank) OVER ())
+                / NULLIF(STDDEV_POP(t.text_rank) OVER (), 0) AS z
+        FROM text_search t
+    ),
+    combined_results AS (
+        SELECT
+            COALESCE(v.id, t.id) AS cid,
+            COALESCE(v.vector_similarity, 0) AS vec_sim,
+            v.pos AS vec_pos,
+            t.pos AS txt_pos,
+            CASE fusion
+                -- Scaled so a chunk ranked first in both lists scores 1
+                WHEN 'rrf' THEN
+                    (COALESCE(1.0 / (rrf_k + v.pos), 0) + COALESCE(1.0 / (rrf_k + t.pos), 0))
+                        * (rrf_k + 1) / 2.0
+                -- Missing from a list counts as two deviations below its mean;
+                -- the logistic maps the sum onto (0, 1)
+                ELSE
+                    1 / (1 + EXP(-(0.5 * COALESCE(v.z, -2) + 0.5 * COALESCE(t.z, -2))))
+            END AS relevance
+        FROM vector_ranked v
+        FULL OUTER JOIN text_ranked t ON v.id = t.id
+    )
+    SELECT
+        c.id,
+        c.document_id,
+        c.content,
+        c.chunk_index,
+        cr.vec_sim::float,
+        (
+            relevance_weight * cr.relevance
+            + recency_weight * EXP(
+                -LN(2) * GREATEST(EXTRACT(EPOCH FROM NOW() - COALESCE(d.created_at, c.created_at)), 0)
+                / 86400 / GREATEST(recency_half_life_days, 1)
+            )
+            + importance_weight * COALESCE(c.importance_score, 0.5)
+        )::float,
+        c.metadata,
+        cr.vec_pos,
+        cr.txt_pos
+    FROM combined_results cr
+    JOIN chunks c ON c.id = cr.cid
+    JOIN documents d ON d.id = c.document_id
+    ORDER BY 6 DESC
+    LIMIT match_count;
+END;
+$$;
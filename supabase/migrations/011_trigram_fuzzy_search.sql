@@ -0,0 +1,131 @@
+-- Trigram fuzzy document search
+-- FuzzySearchEngine used to OR together LOWER(title) LIKE / LOWER(summary) LIKE /
+-- EXISTS (... LOWER(c.content) LIKE ...) for every expanded term. LOWER() hid the
+-- columns from idx_chunks_content_trgm, so each term could scan all chunk text,
+-- and only 10 arbitrary newest rows were then scored in Python.
+
+-- Title and summary are matched lower-cased; these expressions make that indexable
+CREATE INDEX idx_documents_title_trgm ON documents USING GIN (lower(title) gin_trgm_ops);
+CREATE INDEX idx_documents_summary_trgm ON documents USING GIN (lower(summary) gin_trgm_ops)
+    WHERE summary IS NOT NULL;
+
+-- Chunk content keeps idx_chunks_content_trgm from 002: pg_trgm folds case when
+-- extracting trigrams, so term <% content is case-insensitive and uses it as is.
+-- GIN cannot return rows in order, though, so a per-term LIMIT on it would still
+-- fetch and score every chunk matching the term. A GiST trigram index serves the
+-- word-similarity distance <<-> as an ordered (KNN) scan; GIN stays for ILIKE and
+-- unordered <% lookups.
+CREATE INDEX idx_chunks_content_trgm_gist ON chunks USING GIST (content gist_trgm_ops);
+
+-- Documents whose title, summary or chunk text contains a word similar to one of
+-- the search terms, ranked in SQL:
+--   0.6 * title similarity (whole query or best term)
+-- + 0.1 per term appearing verbatim in the title
+-- + 0.3 * best summary or chunk word similarity
+CREATE OR REPLACE FUNCTION fuzzy_document_search(
+    query_text TEXT,
+    search_terms TEXT[],
+    match_count INT DEFAULT 10,
+    min_relevance FLOAT DEFAULT 0.6,
+    term_threshold REAL DEFAULT 0.6,
+    chunk_matches_per_term INT DEFAULT 50
+)
+RETURNS TABLE (
+    id UUID,
+    title TEXT,
+    source_type TEXT,
+    created_at TIMESTAMPTZ,
+    summary TEXT,
+    relevance_score FLOAT
+)
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    q TEXT := lower(query_text);
+BEGIN
+    -- Threshold of the <% operator, local to this transaction
+    PERFORM set_config('pg_trgm.word_similarity_threshold', term_threshold::text, true);
+
+    RETURN QUERY
+    WITH terms AS (
+        SELECT DISTINCT lower(t) AS term
+        FROM unnest(search_terms) t
+        WHERE length(t) > 2
+    ),
+    title_hits AS (
+        SELECT
+            d.id AS doc_id,
+            word_similarity(t.term, lower(d.title)) AS score,
+            (strpos(lower(d.title), t.term) > 0)::int AS verbatim
+        FROM terms t
+        JOIN documents d ON t.term <% lower(d.title)
+    ),
+    summary_hits AS (
+        SELECT d.id AS doc_id, word_similarity(t.term, lower(d.summary)) AS score
+        FROM terms t
+        JOIN documents d ON d.summary IS NOT NULL AND t.term <% lower(d.summary)
+    ),
+    chunk_hits AS (
+        -- Nearest chunks per term, read in distance order from the GiST index
+        -- and stopped after chunk_matches_per_term rows; a common term cannot
+        -- flood the candidate set
+        SELECT hit.document_id AS doc_id, hit.score
+        FROM terms t
+        CROSS JOIN LATERAL (
+            SELECT c.document_id, (1 - (t.term <<-> c.content))::real AS score
+            FROM chunks c
+            WHERE t.term <% c.content
+            ORDER BY t.term <<-> c.content
+            LIMIT chunk_matches_per_term
+        ) hit
+    ),
+    title_scores AS (
+        SELECT doc_id, MAX(score) AS best, SUM(verbatim) AS verbatim_terms
+        FROM title_hits
+        GROUP BY doc_id
+    ),
+    body_scores AS (
+        SELECT b.doc_id, MAX(b.score) AS best
+        FROM (
+            SELECT * FROM summary_hits
+            UNION ALL
+            SELECT * FROM chunk_hits
+        ) b
+        GROUP BY b.doc_id
+    ),
+    scored AS (
+        SELECT
+            d.id,
+            LEAST(
+                1.0,
+                0.6 * GREATEST(
+                    similarity(q, lower(d.title)),
+                    word_similarity(lower(d.title), q),
+                    COALESCE(ts.best, 0)
+                )
+                + 0.1 * COALESCE(ts.verbatim_terms, 0)
+                + 0.3 * COALESCE(bs.best, 0)
+            )::float AS relevance
+        FROM (
+            SELECT doc_id FROM title_scores
+            UNION
+            SELECT doc_id FROM body_scores
+        ) cand
+        JOIN documents d ON d.id = cand.doc_id
+        LEFT JOIN title_scores ts ON ts.doc_id = cand.doc_id
+        LEFT JOIN body_scores bs ON bs.doc_id = cand.doc_id
+    )
+    SELECT
+        d.id,
+        d.title,
+        d.source_type,
+        d.created_at,
+        d.summary,
+        s.relevance
+    FROM scored s
+    JOIN documents d ON d.id = s.id
+    WHERE s.relevance >= min_relevance
+    ORDER BY s.relevance DESC, d.created_at DESC
+    LIMIT match_count;
+END;
+$$;
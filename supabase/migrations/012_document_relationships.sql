@@ -0,0 +1,44 @@
+-- Materialised cross-document relationship graph
+-- CrossContextReasoner used to rediscover relationships on every chat turn:
+-- concept extraction twice per adjacent document pair, two ILIKE queries per
+-- primary x related pair and a regexp scan over every chunk of every document.
+-- Relationships are now computed once per document at ingest and read back with
+-- a single primary-key prefix lookup.
+
+-- What ingest extracted from each document; overlaps are answered by GIN indexes
+CREATE TABLE document_profiles (
+    document_id UUID PRIMARY KEY REFERENCES documents(id) ON DELETE CASCADE,
+    speakers TEXT[] NOT NULL DEFAULT '{}',
+    concepts TEXT[] NOT NULL DEFAULT '{}',
+    technologies TEXT[] NOT NULL DEFAULT '{}',
+    has_problems BOOLEAN NOT NULL DEFAULT FALSE,
+    has_solutions BOOLEAN NOT NULL DEFAULT FALSE,
+    updated_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE INDEX idx_document_profiles_speakers ON document_profiles USING GIN (speakers);
+CREATE INDEX idx_document_profiles_concepts ON document_profiles USING GIN (concepts);
+
+-- Edges. Symmetric relationships ('people', 'topic', 'temporal', 'similarity',
+-- 'technology') are stored in both directions; 'solution_match' points from the
+-- document stating a need to the one offering a solution. evidence holds the raw
+-- shared items (speakers, concepts, technologies), not prose. built_by lists the
+-- documents whose build produced the edge: a rebuild withdraws only its own
+-- claim, so edges other documents found against it (e.g. their nearest
+-- 'temporal' neighbour) survive, and an edge is removed once nobody claims it.
+CREATE TABLE document_relationships (
+    source_id UUID NOT NULL REFERENCES documents(id) ON DELETE CASCADE,
+    target_id UUID NOT NULL REFERENCES documents(id) ON DELETE CASCADE,
+    relationship_type TEXT NOT NULL CHECK (
+        relationship_type IN ('people', 'topic', 'temporal', 'similarity', 'solution_match', 'technology')
+    ),
+    confidence FLOAT NOT NULL,
+    evidence TEXT[] NOT NULL DEFAULT '{}',
+    built_by UUID[] NOT NULL DEFAULT '{}',
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    PRIMARY KEY (source_id, relationship_type, target_id),
+    CHECK (source_id <> target_id)
+);
+
+-- Rebuilding a document revisits the edges pointing at it as well
+CREATE INDEX idx_document_relationships_target ON document_relationships (target_id);